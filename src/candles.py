@@ -0,0 +1,401 @@
+"""
+candles.py — incremental OHLCV store per (instrument, tf).
+
+Each series keeps its closed bars in NumPy arrays (t in seconds, o, h, l, c, v)
+plus the still-forming bar. A refresh only asks the exchange for bars from
+the last closed one onward: new closed bars are appended, the forming bar is
+patched in place. Older history is backfilled only when a caller asks for a
+longer window than what is held.
+
+Higher TFs are derived from one 1-minute base series per instrument when
+the base covers the window (resample_rows: vectorized reduceat buckets,
+cached per TF and extended only past the last closed bucket); longer
+windows fall back to a native fetch of that TF.
+
+Closed bars are also written to a memory-mapped .npy file (one per series)
+so a restart comes back warm. Rows live in a ring keyed by bar number
+(t // tf_sec % capacity): a write touches one row, never the whole file.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+TF_SEC = {"1": 60, "5": 5 * 60, "15": 15 * 60, "60": 60 * 60, "240": 4 * 60 * 60, "1D": 24 * 60 * 60}
+COLS = ("t", "o", "h", "l", "c", "v")
+
+
+def tf_seconds(tf: str) -> int:
+    return TF_SEC.get(str(tf), 24 * 60 * 60)
+
+
+def norm_tf(tf: str) -> str:
+    return str(tf) if str(tf) in TF_SEC else "1D"
+
+
+def chart_to_rows(chart: Dict[str, Any]) -> np.ndarray:
+    """Deribit TradingView chart payload -> (n, 6) float array, t in seconds."""
+    t = chart.get("ticks") or chart.get("t") or []
+    o = chart.get("open") or chart.get("o") or []
+    h = chart.get("high") or chart.get("h") or []
+    l = chart.get("low") or chart.get("l") or []
+    c = chart.get("close") or chart.get("c") or []
+    v = chart.get("volume") or chart.get("v") or []
+    n = min(len(t), len(o), len(h), len(l), len(c))
+    if n <= 0:
+        return np.zeros((0, 6), dtype=float)
+    rows = np.zeros((n, 6), dtype=float)
+    rows[:, 0] = np.asarray(t[:n], dtype=float)
+    for j, col in enumerate((o, h, l, c), start=1):
+        rows[:, j] = np.asarray([float(x or 0.0) for x in col[:n]], dtype=float)
+    if len(v) >= n:
+        rows[:, 5] = np.asarray([float(x or 0.0) for x in v[:n]], dtype=float)
+    if rows[-1, 0] > 1e11:  # ms -> sec
+        rows[:, 0] /= 1000.0
+    return rows
+
+
+class CandleSeries:
+    def __init__(self, instrument: str, tf: str, capacity: int = 4096, path: Optional[str] = None):
+        self.instrument = instrument
+        self.tf = norm_tf(tf)
+        self.tf_sec = tf_seconds(self.tf)
+        self.capacity = int(capacity)
+        self.rows = np.zeros((0, 6), dtype=float)  # closed bars, ascending t
+        self.forming: Optional[np.ndarray] = None   # shape (6,)
+        self.fetched_at = 0.0
+        self.floor_t: Optional[float] = None  # exchange has nothing older than this (no re-backfill)
+        self.version = 0  # bumped whenever rows/forming change
+        self._mm = None
+        if path:
+            self._open_mm(path)
+
+    # ---------------- persistence ----------------
+    def _open_mm(self, path: str):
+        try:
+            mm = None
+            if os.path.exists(path):
+                try:
+                    mm = np.lib.format.open_memmap(path, mode="r+")
+                    if mm.shape != (self.capacity, 6) or mm.dtype != np.float64:
+                        mm = None
+                except Exception:
+                    mm = None
+            if mm is None:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                mm = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(self.capacity, 6))
+            self._mm = mm
+            rows = np.array(mm[mm[:, 0] > 0])
+            if rows.size:
+                # keep only rows that sit in their own slot (drops leftovers from a different tf/capacity)
+                slot = (rows[:, 0] // self.tf_sec).astype(np.int64) % self.capacity
+                rows = rows[slot == np.nonzero(mm[:, 0] > 0)[0]]
+                rows = rows[np.argsort(rows[:, 0], kind="stable")]
+                rows = rows[rows[:, 0] + self.tf_sec <= time.time()]
+                self.rows = self._contiguous_tail(rows)
+        except Exception:
+            self._mm = None
+
+    def _contiguous_tail(self, rows: np.ndarray) -> np.ndarray:
+        """Longest tail without holes (a hole = process was down); the rest is refetched."""
+        if rows.shape[0] < 2:
+            return rows
+        gaps = np.nonzero(np.diff(rows[:, 0]) > self.tf_sec * 1.5)[0]
+        return rows[gaps[-1] + 1:] if gaps.size else rows
+
+    def _persist(self, rows: np.ndarray):
+        if self._mm is None or not rows.size:
+            return
+        try:
+            slot = (rows[:, 0] // self.tf_sec).astype(np.int64) % self.capacity
+            self._mm[slot] = rows
+            self._mm.flush()
+        except Exception:
+            pass
+
+    # ---------------- merge ----------------
+    @property
+    def last_closed_t(self) -> Optional[float]:
+        return float(self.rows[-1, 0]) if self.rows.shape[0] else None
+
+    @property
+    def first_t(self) -> Optional[float]:
+        return float(self.rows[0, 0]) if self.rows.shape[0] else None
+
+    def merge(self, fetched: np.ndarray, now: float):
+        """Append closed bars newer than the last closed one, patch the forming bar, prepend backfill."""
+        if not fetched.size:
+            return
+        fetched = fetched[np.argsort(fetched[:, 0], kind="stable")]
+        closed_mask = fetched[:, 0] + self.tf_sec <= now
+        closed = fetched[closed_mask]
+        forming = fetched[~closed_mask]
+
+        changed = False
+        if closed.size:
+            last = self.last_closed_t
+            first = self.first_t
+            if last is None:
+                new = closed
+                older = closed[:0]
+            else:
+                new = closed[closed[:, 0] > last]
+                older = closed[closed[:, 0] < first]
+            if older.size:
+                self.rows = np.vstack([older, self.rows])
+                changed = True
+            if new.size:
+                self.rows = np.vstack([self.rows, new]) if self.rows.size else new
+                self._persist(new)
+                changed = True
+            if self.rows.shape[0] > self.capacity:
+                self.rows = self.rows[-self.capacity:]
+            if older.size:
+                self._persist(older)
+
+        f = forming[-1] if forming.size else None
+        if f is not None and (self.forming is None or not np.array_equal(f, self.forming)):
+            self.forming = np.array(f)
+            changed = True
+        elif f is None and self.forming is not None and self.last_closed_t is not None and self.forming[0] <= self.last_closed_t:
+            self.forming = None  # forming bar closed and came back as a closed bar
+            changed = True
+        if changed:
+            self.version += 1
+
+    def window(self, candles: int, since: Optional[float] = None) -> np.ndarray:
+        """Last `candles` bars (closed + forming); with since, only bars with t >= since."""
+        rows = self.rows
+        if self.forming is not None and (not rows.shape[0] or self.forming[0] > rows[-1, 0]):
+            rows = np.vstack([rows, self.forming[None, :]]) if rows.size else self.forming[None, :]
+        rows = rows[-int(candles):] if candles > 0 else rows
+        if since:
+            rows = rows[int(np.searchsorted(rows[:, 0], float(since), side="left")):]
+        return rows
+
+    def iter_closed(self, after_t: Optional[float] = None) -> Iterable[Tuple[float, float, float, float, float]]:
+        rows = self.rows
+        if after_t is not None and rows.shape[0]:
+            rows = rows[int(np.searchsorted(rows[:, 0], float(after_t), side="right")):]
+        for r in rows:
+            yield (float(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]))
+
+
+def rows_to_ohlc(rows: np.ndarray) -> Dict[str, list]:
+    return {k: rows[:, j].tolist() for j, k in enumerate(COLS)}
+
+
+def resample_rows(rows: np.ndarray, tf_sec: int, cover_end: float) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Aggregate ascending base rows into tf_sec buckets (vectorized, reduceat).
+
+    A bucket is closed only when the base covers it to the end (start + tf_sec
+    <= cover_end); the last open bucket comes back as the forming bar.
+    """
+    if not rows.shape[0]:
+        return rows[:0], None
+    b = (rows[:, 0] // tf_sec) * tf_sec
+    starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    ends = np.r_[starts[1:], rows.shape[0]]
+    out = np.empty((starts.size, 6), dtype=float)
+    out[:, 0] = b[starts]
+    out[:, 1] = rows[starts, 1]
+    out[:, 2] = np.maximum.reduceat(rows[:, 2], starts)
+    out[:, 3] = np.minimum.reduceat(rows[:, 3], starts)
+    out[:, 4] = rows[ends - 1, 4]
+    out[:, 5] = np.add.reduceat(rows[:, 5], starts)
+    closed = out[:, 0] + tf_sec <= cover_end
+    forming = out[~closed]
+    return out[closed], (forming[-1] if forming.shape[0] else None)
+
+
+Fetcher = Callable[[str, str, int, int], np.ndarray]
+
+
+class CandleStore:
+    """Incremental candle series per (instrument, tf).
+
+    With resample=True every TF above 1m is derived from one 1-minute base
+    series per instrument whenever the base can cover the requested window
+    (base_capacity minutes); otherwise the TF is fetched natively.
+    resample="warm" derives only from a base that already covers the window
+    and serves a cold TF natively (one request instead of a paged 1m
+    backfill) — for rate-limited sources such as the altcoin endpoint.
+    """
+
+    BASE_TF = "1"
+    max_bars_per_call = 5000
+
+    def __init__(
+        self,
+        client: Any = None,
+        data_dir: Optional[str] = None,
+        capacity: int = 4096,
+        min_refresh_sec: float = 2.0,
+        fetcher: Optional[Fetcher] = None,
+        resample: Any = True,
+        base_capacity: int = 20160,
+    ):
+        self._client = client
+        self.data_dir = data_dir
+        self.capacity = int(capacity)
+        self.min_refresh_sec = float(min_refresh_sec)
+        self.fetcher = fetcher
+        self.resample = bool(resample)
+        self.warm_only = resample == "warm"
+        self.base_capacity = max(self.capacity, int(base_capacity))
+        self._series: Dict[Tuple[str, str], CandleSeries] = {}
+        self._derived: Dict[Tuple[str, str], CandleSeries] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from .deribit_api import DeribitPublicClient
+            self._client = DeribitPublicClient(timeout=7.0)
+        return self._client
+
+    def _path(self, instrument: str, tf: str) -> Optional[str]:
+        if not self.data_dir:
+            return None
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", instrument)
+        return os.path.join(self.data_dir, f"{safe}_{tf}.npy")
+
+    def _get_series(self, instrument: str, tf: str) -> CandleSeries:
+        key = (instrument, tf)
+        s = self._series.get(key)
+        if s is None:
+            cap = self.base_capacity if (self.resample and tf == self.BASE_TF) else self.capacity
+            s = self._series[key] = CandleSeries(instrument, tf, capacity=cap, path=self._path(instrument, tf))
+        return s
+
+    def _fetch(self, instrument: str, tf: str, start_ms: int, end_ms: int) -> np.ndarray:
+        if self.fetcher is not None:
+            return self.fetcher(instrument, tf, start_ms, end_ms)
+        # long spans (1m base backfill) go in chunks the chart endpoint accepts
+        step_ms = self.max_bars_per_call * tf_seconds(tf) * 1000
+        parts = []
+        a = int(start_ms)
+        while a <= end_ms:
+            b = min(int(end_ms), a + step_ms - 1)
+            chart, _ = self.client.get_tradingview_chart_data(instrument, tf, a, b)
+            parts.append(chart_to_rows(chart or {}))
+            a = b + 1
+        rows = np.vstack(parts) if parts else np.zeros((0, 6), dtype=float)
+        if rows.shape[0] > 1:
+            rows = rows[np.unique(rows[:, 0], return_index=True)[1]]
+        return rows
+
+    def _base_minutes(self, tf: str, candles: int) -> Optional[int]:
+        """1m bars needed to derive `candles` bars of tf (+1 bucket of slack), None if not resampled."""
+        if not self.resample or tf == self.BASE_TF:
+            return None
+        need = (int(candles) + 1) * (tf_seconds(tf) // 60)
+        return need if need <= self.base_capacity else None
+
+    def _base_covers(self, instrument: str, need: int) -> Optional[CandleSeries]:
+        base = self._series.get((instrument, self.BASE_TF))
+        if base is not None and base.first_t is not None and base.first_t <= time.time() - need * 60 + 60:
+            return base
+        return None
+
+    def _native(self, instrument: str, tf: str, candles: int, force: bool = False) -> CandleSeries:
+        with self._lock:
+            s = self._get_series(instrument, tf)
+            candles = max(1, min(s.capacity, int(candles)))
+            now = time.time()
+            now_ms = int(now * 1000)
+            want_start = now - candles * s.tf_sec
+
+            if s.first_t is None or (s.last_closed_t is not None and now - s.last_closed_t > s.capacity * s.tf_sec):
+                s.rows = s.rows[:0]
+                s.forming = None
+                s.merge(self._fetch(instrument, tf, int(want_start * 1000), now_ms), now)
+                s.fetched_at = now
+                s.floor_t = want_start
+                return s
+
+            if s.first_t > want_start + s.tf_sec and (s.floor_t is None or want_start < s.floor_t):
+                # caller wants a longer window than held: backfill the head once
+                s.merge(self._fetch(instrument, tf, int(want_start * 1000), int(s.first_t * 1000) - 1), now)
+                s.floor_t = want_start
+
+            if force or (now - s.fetched_at) >= self.min_refresh_sec:
+                # tail: from the last closed bar (inclusive, cheap overlap) to now
+                s.merge(self._fetch(instrument, tf, int(s.last_closed_t * 1000), now_ms), now)
+                s.fetched_at = now
+            return s
+
+    def _derive(self, instrument: str, tf: str, base: CandleSeries) -> CandleSeries:
+        """Bring the cached tf series in line with the base; only buckets after the last closed one are re-aggregated."""
+        with self._lock:
+            key = (instrument, tf)
+            d = self._derived.get(key)
+            if d is None:
+                d = self._derived[key] = CandleSeries(instrument, tf, capacity=self.base_capacity)
+                d.base_first = None
+                d.base_version = -1
+            if d.base_version == base.version and d.base_first == base.first_t:
+                return d
+            rows = base.rows
+            if base.forming is not None:
+                rows = np.vstack([rows, base.forming[None, :]]) if rows.size else base.forming[None, :]
+            cover_end = (base.last_closed_t + base.tf_sec) if base.last_closed_t is not None else 0.0
+
+            if d.base_first is not None and base.first_t is not None and d.last_closed_t is not None and base.first_t > d.base_first:
+                # base ring rolled its head: drop buckets it no longer fully covers, keep going incrementally
+                d.rows = d.rows[d.rows[:, 0] >= base.first_t]
+                d.base_first = base.first_t
+            if d.base_first != base.first_t or d.last_closed_t is None:
+                # full pass (first time / base head moved); drop a head bucket the base only partly covers
+                closed, forming = resample_rows(rows, d.tf_sec, cover_end)
+                if closed.shape[0] and base.first_t is not None and closed[0, 0] < base.first_t:
+                    closed = closed[1:]
+                d.rows = closed
+            else:
+                tail = rows[int(np.searchsorted(rows[:, 0], d.last_closed_t + d.tf_sec, side="left")):]
+                closed, forming = resample_rows(tail, d.tf_sec, cover_end)
+                if closed.shape[0]:
+                    d.rows = np.vstack([d.rows, closed])
+            d.forming = forming
+            d.base_first, d.base_version = base.first_t, base.version
+            d.fetched_at = base.fetched_at
+            d.version += 1
+            return d
+
+    def series(self, instrument: str, tf: str, candles: int = 300, force: bool = False) -> CandleSeries:
+        """Series holding at least `candles` bars (when the exchange has them), refreshed tail-only."""
+        tf = norm_tf(tf)
+        need = self._base_minutes(tf, candles)
+        if need is not None and self.warm_only:
+            with self._lock:
+                if self._base_covers(instrument, need) is None:
+                    need = None
+        if need is None:
+            return self._native(instrument, tf, candles, force=force)
+        base = self._native(instrument, self.BASE_TF, need, force=force)
+        return self._derive(instrument, tf, base)
+
+    def cached(self, instrument: str, tf: str, candles: int = 300) -> Optional[CandleSeries]:
+        """Series for tf without touching the exchange (None when nothing held covers it)."""
+        tf = norm_tf(tf)
+        with self._lock:
+            need = self._base_minutes(tf, candles)
+            base = self._base_covers(instrument, need) if need is not None else None
+            if base is not None:
+                return self._derive(instrument, tf, base)
+            s = self._series.get((instrument, tf))
+            return s if (s is not None and s.first_t is not None) else None
+
+    def rows(self, instrument: str, tf: str, candles: int = 300, since: Optional[float] = None) -> np.ndarray:
+        s = self.series(instrument, tf, candles)
+        with self._lock:
+            return s.window(candles, since=since)
+
+    def ohlc(self, instrument: str, tf: str, candles: int = 300, since: Optional[float] = None) -> Dict[str, list]:
+        return rows_to_ohlc(self.rows(instrument, tf, candles, since=since))
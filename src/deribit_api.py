@@ -1,6 +1,5 @@
 from __future__ import annotations
 import time
-import requests
 from typing import Dict, Any, Tuple, List
 
 BASE_URL = "https://www.deribit.com/api/v2"
@@ -8,8 +7,17 @@ BASE_URL = "https://www.deribit.com/api/v2"
 class DeribitPublicClient:
     def __init__(self, timeout: float = 6.0):
         self.timeout = timeout
-        self.sess = requests.Session()
-        self.sess.headers.update({"User-Agent":"gex-desk-pro/7.7"})
+        self._sess = None
+
+    @property
+    def sess(self):
+        # requests is imported on first use (a worker thread on the desk), not at startup
+        if self._sess is None:
+            import requests
+            sess = requests.Session()
+            sess.headers.update({"User-Agent":"gex-desk-pro/7.7"})
+            self._sess = sess
+        return self._sess
 
     def _get(self, path: str, params: Dict[str, Any]):
         url = BASE_URL + path
@@ -26,6 +34,10 @@ class DeribitPublicClient:
         res, lat = self._get("/public/ticker", {"instrument_name": instrument_name})
         return (res or {}), lat
 
+    def get_book_summary_by_currency(self, currency: str = "BTC", kind: str = "option"):
+        res, lat = self._get("/public/get_book_summary_by_currency", {"currency": currency, "kind": kind})
+        return (res or []), lat
+
     def get_instruments(self, currency: str = "BTC", kind: str = "option", expired: bool = False):
         res, lat = self._get("/public/get_instruments", {"currency": currency, "kind": kind, "expired": str(expired).lower()})
         return (res or []), lat
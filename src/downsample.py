@@ -0,0 +1,179 @@
+"""
+downsample.py — cut OHLC series down to what a chart can actually show.
+
+  - minmax_ohlc: time-aligned buckets of k bars -> one OHLC bar each
+    (open first, high max, low min, close last, volume sum). Extremes are
+    kept exactly and bucket starts are stable across refreshes, so since=
+    deltas still line up.
+  - lttb_indices: Largest-Triangle-Three-Buckets over (t, close); picks
+    representative bars for line-style views.
+
+Rows are (n, 6) arrays: t, o, h, l, c, v (see candles.py).
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Tuple
+
+import numpy as np
+
+from .candles import resample_rows
+
+
+def bucket_factor(n: int, max_points: int) -> int:
+    """Bars per bucket so that n bars fit in max_points (+1 for a partial head bucket)."""
+    if max_points <= 1 or n <= max_points:
+        return 1
+    return int(math.ceil(n / float(max_points - 1)))
+
+
+def minmax_ohlc(rows: np.ndarray, max_points: int, tf_sec: int) -> Tuple[np.ndarray, int]:
+    """OHLC-preserving downsample; returns (rows, bars_per_bucket)."""
+    n = int(rows.shape[0])
+    k = bucket_factor(n, max_points)
+    if k <= 1:
+        return rows, 1
+    out, _ = resample_rows(rows, tf_sec * k, float("inf"))
+    return out, k
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices picked by LTTB (first and last point always kept)."""
+    n = int(x.shape[0])
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out-2 inner buckets over [1, n-1)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i] + 1, edges[i + 1])
+        # average of the next bucket (or the last point)
+        if i + 2 < edges.size:
+            nlo, nhi = edges[i + 1], max(edges[i + 1] + 1, edges[i + 2])
+            ax, ay = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        else:
+            ax, ay = x[-1], y[-1]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - ax) * (by - y[a]) - (x[a] - bx) * (ay - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def lttb_rows(rows: np.ndarray, max_points: int) -> np.ndarray:
+    if rows.shape[0] <= max_points:
+        return rows
+    return rows[lttb_indices(rows[:, 0], rows[:, 4], max_points)]
+
+
+def downsample(rows: np.ndarray, max_points: int, tf_sec: int, mode: str = "ohlc") -> Tuple[np.ndarray, int]:
+    """mode 'ohlc' (min/max buckets, default) or 'lttb'; returns (rows, bars_per_point)."""
+    if max_points <= 0 or rows.shape[0] <= max_points:
+        return rows, 1
+    if (mode or "ohlc").lower() == "lttb":
+        out = lttb_rows(rows, max_points)
+        return out, int(math.ceil(rows.shape[0] / float(max(1, out.shape[0]))))
+    return minmax_ohlc(rows, max_points, tf_sec)
+
+
+class OhlcPyramid:
+    """
+    Level-of-detail pyramid over (n, 5) bars in chart order t, o, c, l, h.
+
+    Level 0 is the bars themselves; level k merges 2**k consecutive bars (t/open
+    of the first, close of the last, min low, max high). Buckets are aligned to
+    the global bar index (base + i), so dropping bars from the front or changing
+    the tail only recomputes the first and the trailing entries of each level:
+    O(levels + changed) instead of O(n).
+    """
+
+    def __init__(self, bars: np.ndarray = None):
+        self.base = 0
+        self.levels: list = []  # levels[k]: (m, 5) array; row j is global bucket j0(k) + j
+        self.set(np.zeros((0, 5)) if bars is None else bars)
+
+    def j0(self, k: int) -> int:
+        """Global bucket index of levels[k][0]."""
+        return self.base >> k
+
+    def set(self, bars: np.ndarray, base: int = 0):
+        self.base = int(base)
+        self.levels = [np.asarray(bars, dtype=float).reshape(-1, 5)]
+        self._extend_from(1, {})
+
+    def splice(self, bars: np.ndarray, drop: int, first_changed: int):
+        """bars = previous bars minus `drop` head rows, unchanged before local index first_changed."""
+        old = self.levels
+        old_base = self.base
+        self.base += int(drop)
+        self.levels = [np.asarray(bars, dtype=float).reshape(-1, 5)]
+        g_changed = self.base + max(0, int(first_changed))
+        keep = {}
+        for k in range(1, len(old)):
+            keep[k] = (old[k], old_base >> k, g_changed >> k, self.base != old_base)
+        self._extend_from(1, keep)
+
+    def _extend_from(self, k0: int, keep: dict):
+        k = k0
+        while self.levels[k - 1].shape[0] > 1:
+            prev, p0 = self.levels[k - 1], self.j0(k - 1)
+            j0, j1 = p0 >> 1, (p0 + prev.shape[0] - 1) >> 1
+            if k in keep:
+                arr, old_j0, j_from, dropped = keep[k]
+                if old_j0 == j0 and arr.shape[0] == j1 - j0 + 1 and j_from <= j1:
+                    # same buckets (live update of the last bar): rewrite head/tail in place
+                    i = max(0, j_from - j0)
+                    if dropped:
+                        arr = arr.copy()  # old view may still be painted
+                        arr[0] = _merge_pairs(prev, p0, j0, j0)[0]
+                    arr[i:] = _merge_pairs(prev, p0, j0 + i, j1)
+                    self.levels.append(arr)
+                    k += 1
+                    continue
+                j_from = max(j_from, j0 + 1)
+                lo, hi = j0 + 1 - old_j0, min(j_from, old_j0 + arr.shape[0]) - old_j0
+                if lo >= 0 and hi > lo:
+                    # head bucket (may have lost bars) + untouched middle + recomputed tail
+                    mid = arr[lo:hi]
+                    parts = [_merge_pairs(prev, p0, j0, j0), mid]
+                    if j0 + 1 + mid.shape[0] <= j1:
+                        parts.append(_merge_pairs(prev, p0, j0 + 1 + mid.shape[0], j1))
+                    self.levels.append(np.concatenate(parts))
+                    k += 1
+                    continue
+            self.levels.append(_merge_pairs(prev, p0, j0, j1))
+            k += 1
+
+    def level_for(self, px_per_bar: float, min_px: float = 3.0) -> int:
+        """Smallest level whose buckets are at least min_px wide on screen."""
+        if px_per_bar <= 0 or not math.isfinite(px_per_bar):
+            return len(self.levels) - 1
+        k = int(math.ceil(math.log2(max(1.0, min_px / px_per_bar))))
+        return max(0, min(len(self.levels) - 1, k))
+
+    def extremes(self):
+        """(low, high) of all bars, from the top level (O(1))."""
+        top = self.levels[-1]
+        if not top.shape[0]:
+            return None
+        return float(top[:, 3].min()), float(top[:, 4].max())
+
+
+def _merge_pairs(prev: np.ndarray, p0: int, j_from: int, j_to: int) -> np.ndarray:
+    """Level-k rows for global buckets j_from..j_to from level k-1 rows (first global bucket p0)."""
+    if j_to < j_from:
+        return np.zeros((0, 5))
+    js = np.arange(j_from, j_to + 1)
+    m = prev.shape[0]
+    a = np.clip(2 * js - p0, 0, m - 1)
+    b = np.clip(2 * js + 1 - p0, 0, m - 1)
+    out = np.empty((js.size, 5))
+    out[:, 0] = prev[a, 0]
+    out[:, 1] = prev[a, 1]
+    out[:, 2] = prev[b, 2]
+    out[:, 3] = np.minimum(prev[a, 3], prev[b, 3])
+    out[:, 4] = np.maximum(prev[a, 4], prev[b, 4])
+    return out
@@ -2,6 +2,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, Any, List, Tuple, Optional
 
+import numpy as np
+
 @dataclass
 class GexRow:
     instrument_name: str
@@ -66,3 +68,14 @@ def regime_text(strike_net: Dict[float,float], flip: float = None) -> str:
     if net_total > 0: return "GAMMA+ (mean-revert)"
     if net_total < 0: return "GAMMA- (direcional)"
     return "NEUTRO"
+
+def strike_expiry_grid(rows_by_expiry: Dict[str, List[GexRow]]) -> Tuple[List[float], List[str], np.ndarray]:
+    """Net GEX matrix [expiry, strike] over the union of strikes; expiries keep the dict order."""
+    expiries = [e for e, rows in rows_by_expiry.items() if rows]
+    strikes = sorted({r.strike for e in expiries for r in rows_by_expiry[e]})
+    col = {k: j for j, k in enumerate(strikes)}
+    m = np.zeros((len(expiries), len(strikes)), dtype=float)
+    for i, e in enumerate(expiries):
+        for r in rows_by_expiry[e]:
+            m[i, col[r.strike]] += r.gex
+    return strikes, expiries, m
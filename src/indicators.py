@@ -0,0 +1,183 @@
+"""
+indicators.py — rolling OHLC indicators updated in O(1) per new bar.
+
+RollingIndicators keeps running state for:
+  - ATR  : simple mean of the last n true ranges (same definition the bot used)
+  - EMA  : exponential moving average of close
+  - RSI  : Wilder RSI
+  - RV   : realized vol = stdev of log returns over n bars (per bar + annualized)
+
+Closed bars are committed with push(); the still-forming bar is only
+"peeked" (values(forming=...)) so it never pollutes the running state.
+
+IndicatorService reads closed bars from a CandleStore (tail-only fetches)
+and pushes into each RollingIndicators only the bars it has not seen yet.
+Backend (bot ATR gate, /api/desk/ohlc) and the Qt desk share it.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from .candles import CandleSeries, CandleStore, norm_tf
+
+Bar = Tuple[float, float, float, float, float]  # t(sec), o, h, l, c
+
+
+class RollingIndicators:
+    def __init__(self, atr_n: int = 14, ema_n: int = 21, rsi_n: int = 14, rv_n: int = 30, tf_sec: int = 60):
+        self.atr_n = max(2, int(atr_n))
+        self.ema_n = max(2, int(ema_n))
+        self.rsi_n = max(2, int(rsi_n))
+        self.rv_n = max(2, int(rv_n))
+        self.bars_per_year = (365.0 * 24 * 3600) / float(max(1, tf_sec))
+
+        self.n_bars = 0
+        self.last_close: Optional[float] = None
+        self.last_t: Optional[float] = None
+
+        self._tr: deque = deque(maxlen=self.atr_n)
+        self._tr_sum = 0.0
+
+        self._ema: Optional[float] = None
+        self._ema_seed: list[float] = []
+
+        self._rsi_gain: Optional[float] = None
+        self._rsi_loss: Optional[float] = None
+        self._rsi_seed: list[Tuple[float, float]] = []
+
+        self._lr: deque = deque(maxlen=self.rv_n)
+        self._lr_sum = 0.0
+        self._lr_sq = 0.0
+
+    # ---------------- commit a closed bar ----------------
+    def push(self, bar: Bar):
+        t, o, h, l, c = (float(x) for x in bar)
+        pc = self.last_close
+        if pc is not None:
+            tr = max(h - l, abs(h - pc), abs(l - pc))
+            if len(self._tr) == self._tr.maxlen:
+                self._tr_sum -= self._tr[0]
+            self._tr.append(tr)
+            self._tr_sum += tr
+
+            d = c - pc
+            g, lo = max(d, 0.0), max(-d, 0.0)
+            if self._rsi_gain is None:
+                self._rsi_seed.append((g, lo))
+                if len(self._rsi_seed) == self.rsi_n:
+                    self._rsi_gain = sum(x[0] for x in self._rsi_seed) / self.rsi_n
+                    self._rsi_loss = sum(x[1] for x in self._rsi_seed) / self.rsi_n
+                    self._rsi_seed = []
+            else:
+                self._rsi_gain = (self._rsi_gain * (self.rsi_n - 1) + g) / self.rsi_n
+                self._rsi_loss = (self._rsi_loss * (self.rsi_n - 1) + lo) / self.rsi_n
+
+            if pc > 0 and c > 0:
+                r = math.log(c / pc)
+                if len(self._lr) == self._lr.maxlen:
+                    old = self._lr[0]
+                    self._lr_sum -= old
+                    self._lr_sq -= old * old
+                self._lr.append(r)
+                self._lr_sum += r
+                self._lr_sq += r * r
+
+        if self._ema is None:
+            self._ema_seed.append(c)
+            if len(self._ema_seed) == self.ema_n:
+                self._ema = sum(self._ema_seed) / self.ema_n
+                self._ema_seed = []
+        else:
+            a = 2.0 / (self.ema_n + 1.0)
+            self._ema = self._ema + a * (c - self._ema)
+
+        self.last_close = c
+        self.last_t = t
+        self.n_bars += 1
+
+    # ---------------- read (optionally peeking a forming bar) ----------------
+    def values(self, forming: Optional[Bar] = None) -> Dict[str, Any]:
+        close = self.last_close
+        tr_sum, tr_len = self._tr_sum, len(self._tr)
+        ema = self._ema
+        gain, loss = self._rsi_gain, self._rsi_loss
+        lr_sum, lr_sq, lr_len = self._lr_sum, self._lr_sq, len(self._lr)
+
+        if forming is not None and self.last_close is not None:
+            _, _, h, l, c = (float(x) for x in forming)
+            pc = self.last_close
+            tr = max(h - l, abs(h - pc), abs(l - pc))
+            if tr_len == self.atr_n:
+                tr_sum -= self._tr[0]
+            else:
+                tr_len += 1
+            tr_sum += tr
+            if ema is not None:
+                ema = ema + 2.0 / (self.ema_n + 1.0) * (c - ema)
+            if gain is not None:
+                d = c - pc
+                gain = (gain * (self.rsi_n - 1) + max(d, 0.0)) / self.rsi_n
+                loss = (loss * (self.rsi_n - 1) + max(-d, 0.0)) / self.rsi_n
+            if pc > 0 and c > 0:
+                r = math.log(c / pc)
+                if lr_len == self.rv_n:
+                    old = self._lr[0]
+                    lr_sum -= old
+                    lr_sq -= old * old
+                else:
+                    lr_len += 1
+                lr_sum += r
+                lr_sq += r * r
+            close = c
+
+        atr = (tr_sum / self.atr_n) if tr_len >= self.atr_n else None
+        rsi = None
+        if gain is not None and loss is not None:
+            rsi = 100.0 if loss == 0 else 100.0 - 100.0 / (1.0 + gain / loss)
+        rv = None
+        if lr_len >= self.rv_n:
+            mean = lr_sum / lr_len
+            var = max(0.0, lr_sq / lr_len - mean * mean)
+            rv = math.sqrt(var)
+        return {
+            "close": close,
+            "atr": atr,
+            "atr_pct": (atr / close * 100.0) if (atr is not None and close) else None,
+            "ema": ema,
+            "rsi": rsi,
+            "rv_pct": (rv * 100.0) if rv is not None else None,
+            "rv_ann_pct": (rv * math.sqrt(self.bars_per_year) * 100.0) if rv is not None else None,
+            "bars": self.n_bars,
+        }
+
+
+class IndicatorService:
+    def __init__(self, store: Optional[CandleStore] = None, client: Any = None):
+        self.store = store if store is not None else CandleStore(client)
+        self._ind: Dict[tuple, RollingIndicators] = {}
+        self._lock = threading.Lock()
+
+    def _feed(self, key: tuple, params: tuple, s: CandleSeries) -> RollingIndicators:
+        ri = self._ind.get(key)
+        if ri is not None and ri.last_t is not None and s.first_t is not None and ri.last_t < s.first_t - s.tf_sec:
+            ri = None  # series was reset (gap): reseed
+        if ri is None:
+            ri = self._ind[key] = RollingIndicators(*params, tf_sec=s.tf_sec)
+        for b in s.iter_closed(after_t=ri.last_t):
+            ri.push(b)
+        return ri
+
+    def snapshot(self, instrument: str, tf: str, atr_n: int = 14, ema_n: int = 21, rsi_n: int = 14, rv_n: int = 30) -> Dict[str, Any]:
+        tf = norm_tf(tf)
+        warmup = max(120, atr_n + 50, ema_n * 4, rsi_n * 4, rv_n + 10)
+        s = self.store.series(instrument, tf, candles=warmup)
+        params = (int(atr_n), int(ema_n), int(rsi_n), int(rv_n))
+        with self._lock:
+            ri = self._feed((instrument, tf) + params, params, s)
+            forming = tuple(float(x) for x in s.forming[:5]) if s.forming is not None else None
+            vals = ri.values(forming=forming)
+        return {"instrument": instrument, "tf": tf, "atr_n": params[0], "ema_n": params[1], "rsi_n": params[2], "rv_n": params[3], **vals}
@@ -0,0 +1,145 @@
+"""
+log_tail.py — incremental tail of logs/app.log for the Qt Logs tab.
+
+  - LogTailer remembers (file identity, byte offset) and each poll() reads only
+    what was appended since the last one; a partial last line is kept until its
+    newline arrives.
+  - rotation / truncation: a different inode, a file smaller than the offset
+    or changed bytes just before the offset (copy-truncate then regrown)
+    restart from the new file's tail. An unchanged file costs one stat().
+  - cost is bounded by the tail, not the file: the first open reads at most
+    tail_bytes from the end, a poll reads at most max_read bytes (a burst
+    bigger than that skips ahead), and at most max_lines parsed lines are kept.
+  - lines are parsed once (util.py format: "[ts] [LEVEL] [module] msg"; older
+    lines without level/module count as INFO/app), so level/module/text filters
+    run over memory without touching the file.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Iterable, List, Optional, Set, Tuple
+
+LEVELS = ("INFO", "WARN", "ERROR")
+_RANK = {lv: i for i, lv in enumerate(LEVELS)}
+_LINE_RE = re.compile(r"^\[([^\]]*)\] (?:\[(INFO|WARN|ERROR)\] \[([^\]]*)\] )?(.*)$")
+
+
+@dataclass(frozen=True)
+class LogLine:
+    text: str
+    level: str = "INFO"
+    module: str = "app"
+
+
+def parse_line(text: str) -> LogLine:
+    m = _LINE_RE.match(text)
+    if not m:
+        return LogLine(text)  # continuation / foreign line
+    return LogLine(text, m.group(2) or "INFO", m.group(3) or "app")
+
+
+def line_filter(min_level: str = "INFO", module: str = "", query: str = ""):
+    """Predicate over LogLine: level >= min_level, exact module ('' = any), substring (case-insensitive)."""
+    rank = _RANK.get(min_level, 0)
+    q = (query or "").strip().lower()
+
+    def keep(ln: LogLine) -> bool:
+        if _RANK.get(ln.level, 0) < rank:
+            return False
+        if module and ln.module != module:
+            return False
+        return not q or q in ln.text.lower()
+    return keep
+
+
+class LogTailer:
+    def __init__(self, path: str, max_lines: int = 5000, tail_bytes: int = 256 * 1024, max_read: int = 4 * 1024 * 1024):
+        self.path = path
+        self.max_lines = int(max_lines)
+        self.tail_bytes = int(tail_bytes)
+        self.max_read = int(max_read)
+        self.lines: Deque[LogLine] = deque(maxlen=self.max_lines)
+        self.modules: Set[str] = set()
+        self.offset = 0
+        self.rotations = 0
+        self._ident: Optional[Tuple[int, int]] = None
+        self._partial = b""
+        self._skip_first = False
+        self._mtime = 0
+        self._mark = b""  # last bytes before offset, to notice a rewritten file
+
+    def reset(self):
+        """Forget everything; the next poll() re-reads the tail."""
+        self.lines.clear()
+        self.modules.clear()
+        self.offset = 0
+        self._ident = None
+        self._partial = b""
+        self._skip_first = False
+        self._mtime = 0
+        self._mark = b""
+
+    def poll(self) -> List[LogLine]:
+        """New complete lines since the last call ([] when nothing changed or the file is missing)."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return []
+        ident = (st.st_dev, st.st_ino)
+        size = st.st_size
+        if ident == self._ident and size == self.offset and st.st_mtime_ns == self._mtime:
+            return []
+        self._mtime = st.st_mtime_ns
+
+        with open(self.path, "rb") as f:
+            if self._ident is not None and ident == self._ident and size >= self.offset and self._mark:
+                f.seek(self.offset - len(self._mark))
+                rewritten = f.read(len(self._mark)) != self._mark
+            else:
+                rewritten = size < self.offset
+            if self._ident is None or ident != self._ident or rewritten:
+                if self._ident is not None:
+                    self.rotations += 1
+                self._ident = ident
+                self._partial = b""
+                self._seek_tail(size)
+            if size == self.offset:
+                return []
+            if size - self.offset > self.max_read:
+                self._partial = b""
+                self._seek_tail(size, self.max_read)
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        self.offset += len(data)
+        self._mark = (self._mark + data)[-64:]
+        if self._skip_first:
+            # started mid-file: the first line is partial
+            cut = data.find(b"\n")
+            data = b"" if cut < 0 else data[cut + 1:]
+            self._skip_first = cut < 0
+        data = self._partial + data
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            self._partial = data
+            return []
+        self._partial = data[cut + 1:]
+        out = [parse_line(t.rstrip("\r")) for t in data[:cut].decode("utf-8", errors="replace").split("\n")]
+        self.lines.extend(out)
+        self.modules.update(ln.module for ln in out)
+        return out
+
+    def _seek_tail(self, size: int, limit: Optional[int] = None):
+        limit = self.tail_bytes if limit is None else limit
+        self.offset = max(0, size - limit)
+        self._skip_first = self.offset > 0
+        self._mark = b""
+
+    def select(self, keep=None, limit: Optional[int] = None) -> List[LogLine]:
+        """Buffered lines passing keep (newest last), at most limit of them."""
+        src: Iterable[LogLine] = self.lines if keep is None else (ln for ln in self.lines if keep(ln))
+        out = list(src)
+        return out[-limit:] if limit else out
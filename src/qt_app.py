@@ -1,22 +1,42 @@
 from __future__ import annotations
 
+import os
 import time
 import math
 import json
 from dataclasses import dataclass
 from typing import Dict, Any, List, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+_T0 = time.perf_counter()  # startup trace origin (before numpy/Qt/pyqtgraph)
 
 import numpy as np
 from PySide6 import QtCore, QtGui, QtWidgets
 import pyqtgraph as pg
-import requests
 
-from .util import log, crash, now_str, parse_deribit_expiry, days_to_expiry
+from .util import log, crash, now_str, parse_deribit_expiry, days_to_expiry, LOG_DIR, APP_LOG
 from .deribit_api import DeribitPublicClient
+from .candles import CandleStore, rows_to_ohlc
+from .indicators import IndicatorService
 from .testdata import gen_ohlc, gen_options_chain
-from .gex import compute_gex_rows, aggregate_by_strike, gamma_flip, top_walls, regime_text, GexRow
+from .downsample import OhlcPyramid
+from .gex import compute_gex_rows, aggregate_by_strike, gamma_flip, top_walls, regime_text, strike_expiry_grid, GexRow
 from .strategy import build_action_context, plan_from_selected_level
+from .workers import JobCancelled, JobRunner
+from .table_models import FilterProxy, NewsModel, OptionsModel, SUGGEST_TABLE
+from .session_snapshot import default_path as snapshot_path, load_snapshot, save_snapshot
+from .log_tail import LEVELS, LogTailer, line_filter
+
+
+# -------------------- startup trace --------------------
+_STARTUP: Dict[str, float] = {}
+
+
+def _startup_mark(stage: str):
+    """Log ms since this module started importing, once per stage (import, ui, first_paint, first_live)."""
+    if stage in _STARTUP:
+        return
+    _STARTUP[stage] = (time.perf_counter() - _T0) * 1000.0
+    log(f"startup {stage} +{_STARTUP[stage]:.0f}ms")
 
 
 # -------------------- small helpers --------------------
@@ -40,6 +60,25 @@ def make_card(title: str) -> QtWidgets.QFrame:
     return f
 
 
+def make_table(model: QtCore.QAbstractItemModel, sort_column: int = -1, order=QtCore.Qt.AscendingOrder) -> Tuple[QtWidgets.QTableView, FilterProxy]:
+    """Read-only, sortable table view over model (through a FilterProxy); sort_column -1 keeps the model order."""
+    proxy = FilterProxy()
+    proxy.setSourceModel(model)
+    tv = QtWidgets.QTableView()
+    tv.setModel(proxy)
+    tv.setSortingEnabled(True)
+    tv.setWordWrap(False)
+    tv.horizontalHeader().setStretchLastSection(True)
+    tv.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)  # uniform rows: cheap scrolling
+    tv.verticalHeader().setDefaultSectionSize(24)
+    tv.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+    tv.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+    tv.sortByColumn(sort_column, order)
+    proxy.setParent(tv)
+    model.setParent(tv)
+    return tv, proxy
+
+
 class SmartViewBox(pg.ViewBox):
     """
     TradingView-like usability:
@@ -105,61 +144,178 @@ class SmartViewBox(pg.ViewBox):
 
 
 class CandlestickItem(pg.GraphicsObject):
+    """
+    Candles backed by NumPy columns (t, o, c, l, h) with level-of-detail.
+
+    An OhlcPyramid keeps min/max OHLC merges of 2**k bars; paint() picks the
+    level from the current pixel width (buckets >= MIN_PX wide) and draws only
+    the chunks overlapping the visible x-range. Each chunk (CHUNK entries of one
+    level) holds one wick path and one body path per color, built lazily and
+    cached. setData() diffs against what is loaded: a live refresh that only moved
+    the last bar (or slid the window by a few bars) invalidates just the chunks it
+    touched. Bounds come from the pyramid top level (O(1)).
+    """
+    CHUNK = 512
+    MIN_PX = 3.0
+    UP = "#25d695"
+    DOWN = "#ff4d6d"
+
     def __init__(self):
         super().__init__()
-        self.data: List[Tuple[float,float,float,float,float]] = []
-        self.picture = None
+        self._a = np.zeros((0, 5), dtype=float)  # t, o, c, l, h
+        self._lod = OhlcPyramid()
+        self._chunks: Dict[Tuple[int, int], Tuple[Any, ...]] = {}  # (level, global chunk id) -> paths
+        self._bounds = QtCore.QRectF()
+        self._dt = 1.0  # median bar spacing
         self._w = 0.6
+        self.level = 0  # level used by the last paint
+        self._pens = {up: pg.mkPen(self.UP if up else self.DOWN, width=1) for up in (True, False)}
+        self._brushes = {up: pg.mkBrush(self.UP if up else self.DOWN) for up in (True, False)}
+
+    # ---------------- data ----------------
+    @property
+    def n(self) -> int:
+        return int(self._a.shape[0])
+
+    def rows(self) -> np.ndarray:
+        return self._a
+
+    def setData(self, data):
+        """data: (n, 5) array or list of (t, o, c, l, h); unchanged bars are not redrawn."""
+        a = np.asarray(data, dtype=float).reshape(-1, 5) if len(data) else np.zeros((0, 5), dtype=float)
+        old = self._a
+        n0, n1 = old.shape[0], a.shape[0]
+        if n0 >= 2 and n1 >= 2:
+            # window start moved forward by k bars (or not at all)?
+            k = int(np.searchsorted(old[:, 0], a[0, 0]))
+            keep = n0 - 1 - k  # old bars that must match exactly (the old last bar may have changed)
+            if k < n0 and old[k, 0] == a[0, 0] and keep <= n1 and (keep <= 0 or np.array_equal(old[k:k + keep], a[:keep])):
+                self._splice(a, drop=k, first_changed=max(0, keep))
+                return
+        self._reset(a)
 
-    def setData(self, data: List[Tuple[float,float,float,float,float]]):
-        self.data = data
-        # Dynamic candle width (depends on time spacing)
-        try:
-            if len(self.data) >= 2:
-                xs = [d[0] for d in self.data]
-                diffs = [abs(xs[i+1] - xs[i]) for i in range(len(xs)-1) if xs[i+1] != xs[i]]
-                if diffs:
-                    diffs.sort()
-                    self._w = max(0.25, diffs[len(diffs)//2] * 0.7)
-        except Exception:
-            self._w = 0.6
-        self._regen()
-        self.update()
+    def append_bar(self, t: float, o: float, c: float, l: float, h: float):
+        a = np.vstack([self._a, [[t, o, c, l, h]]])
+        self._splice(a, drop=0, first_changed=a.shape[0] - 1)
 
-    def _regen(self):
-        self.picture = QtGui.QPicture()
-        p = QtGui.QPainter(self.picture)
-        if not self.data:
-            p.end()
+    def update_last(self, o: float, c: float, l: float, h: float):
+        if not self.n:
             return
+        a = self._a.copy()
+        a[-1, 1:] = (o, c, l, h)
+        self._splice(a, drop=0, first_changed=a.shape[0] - 1)
+
+    def _reset(self, a: np.ndarray):
+        self._a = a
+        self._dt = self._bar_spacing(a[:, 0])
+        self._w = max(0.25, self._dt * 0.7)
+        self._lod.set(a)
+        self._chunks = {}
+        self._update_bounds()
+
+    def _splice(self, a: np.ndarray, drop: int, first_changed: int):
+        """a = old rows minus `drop` leading bars, identical up to local index first_changed."""
+        if self.n < 2 and a.shape[0] >= 2:
+            self._reset(a)
+            return
+        self._a = a
+        self._lod.splice(a, drop, first_changed)
+        g_changed = self._lod.base + max(0, first_changed)
+        for key in list(self._chunks):
+            k, cid = key
+            j0 = self._lod.j0(k)
+            lo_c, hi_c = j0 // self.CHUNK, (j0 + self._lod.levels[k].shape[0] - 1) // self.CHUNK if k < len(self._lod.levels) else -1
+            if cid < lo_c or cid > hi_c or cid >= (g_changed >> k) // self.CHUNK or (drop and cid == lo_c):
+                del self._chunks[key]
+        self._update_bounds()
+
+    @staticmethod
+    def _bar_spacing(t: np.ndarray) -> float:
+        # Dynamic candle width (depends on time spacing)
+        if t.size < 2:
+            return 1.0
+        d = np.abs(np.diff(t))
+        d = d[d > 0]
+        return float(np.median(d)) if d.size else 1.0
+
+    # ---------------- paths ----------------
+    def _chunk(self, k: int, cid: int):
+        key = (k, cid)
+        ch = self._chunks.get(key)
+        if ch is None:
+            lv, j0 = self._lod.levels[k], self._lod.j0(k)
+            seg = lv[max(0, cid * self.CHUNK - j0):max(0, (cid + 1) * self.CHUNK - j0)]
+            ch = self._build_chunk(seg, k)
+            self._chunks[key] = ch
+        return ch
+
+    def _build_chunk(self, seg: np.ndarray, k: int):
+        t, o, c, l, h = seg.T
+        span = float(1 << k)
+        x = t + (span - 1.0) * self._dt / 2.0  # center of the merged bucket
+        hw = self._w * span / 2.0
+        up = c >= o
+        return tuple(
+            (self._wick_path(x[m], l[m], h[m]), self._body_path(x[m], o[m], c[m], hw))
+            for m in (up, ~up)
+        )
+
+    @staticmethod
+    def _wick_path(t: np.ndarray, l: np.ndarray, h: np.ndarray):
+        if not t.size:
+            return QtGui.QPainterPath()
+        return pg.arrayToQPath(np.repeat(t, 2), np.column_stack([l, h]).ravel(), connect="pairs", finiteCheck=False)
+
+    @staticmethod
+    def _body_path(t: np.ndarray, o: np.ndarray, c: np.ndarray, hw: float):
+        if not t.size:
+            return QtGui.QPainterPath()
+        c = np.where(c == o, o + 0.0001, c)
+        # closed rectangle per bar: 5 points, connect inside, break after
+        xs = np.column_stack([t - hw, t + hw, t + hw, t - hw, t - hw]).ravel()
+        ys = np.column_stack([o, o, c, c, o]).ravel()
+        conn = np.tile(np.array([1, 1, 1, 1, 0], dtype=np.int32), t.size)
+        return pg.arrayToQPath(xs, ys, connect=conn, finiteCheck=False)
+
+    def _update_bounds(self):
+        self.prepareGeometryChange()
+        ext = self._lod.extremes() if self.n else None
+        if ext is None:
+            self._bounds = QtCore.QRectF()
+        else:
+            t = self._a[:, 0]
+            x0, x1 = float(t[0]) - self._w, float(t[-1]) + self._w
+            self._bounds = QtCore.QRectF(x0, ext[0], x1 - x0, ext[1] - ext[0])
+        self.update()
 
-        w = self._w
-        for (t, o, c, lo, hi) in self.data:
-            up = c >= o
-            col = QtGui.QColor("#25d695" if up else "#ff4d6d")
-            pen = QtGui.QPen(col); pen.setWidthF(1.0)
-            p.setPen(pen)
-            p.drawLine(QtCore.QPointF(t, lo), QtCore.QPointF(t, hi))
-            p.setBrush(QtGui.QBrush(col))
-            h = c - o
-            if h == 0:
-                h = 0.0001
-            rect = QtCore.QRectF(t - w/2, o, w, h)
-            p.drawRect(rect.normalized())
-
-        p.end()
-
+    def _visible_chunks(self):
+        """(level, chunk ids) for the current view; everything at the top level without one."""
+        px = self.pixelWidth() if self.getViewBox() is not None else 0.0
+        k = self._lod.level_for(self._dt / px if px > 0 else 0.0, self.MIN_PX)
+        lv, j0 = self._lod.levels[k], self._lod.j0(k)
+        vr = self.viewRect() if px > 0 else None
+        i0, i1 = 0, lv.shape[0] - 1
+        if vr is not None and lv.shape[0]:
+            span = (1 << k) * self._dt
+            i0 = max(0, int(np.searchsorted(lv[:, 0], vr.left() - span, side="left")) - 1)
+            i1 = min(lv.shape[0] - 1, int(np.searchsorted(lv[:, 0], vr.right(), side="right")))
+        return k, range((j0 + i0) // self.CHUNK, (j0 + i1) // self.CHUNK + 1)
+
+    # ---------------- Qt ----------------
     def paint(self, p, *args):
-        if self.picture:
-            p.drawPicture(0, 0, self.picture)
+        if not self.n:
+            return
+        k, cids = self._visible_chunks()
+        self.level = k
+        for cid in cids:
+            for up, (wick, body) in zip((True, False), self._chunk(k, cid)):
+                p.setPen(self._pens[up])
+                p.setBrush(self._brushes[up])
+                p.drawPath(wick)
+                p.drawPath(body)
 
     def boundingRect(self):
-        if not self.data:
-            return QtCore.QRectF()
-        xs = [d[0] for d in self.data]
-        lows = [d[3] for d in self.data]
-        highs = [d[4] for d in self.data]
-        return QtCore.QRectF(min(xs)-1, min(lows), (max(xs)-min(xs))+2, (max(highs)-min(lows)))
+        return QtCore.QRectF(self._bounds)
 
 
 # -------------------- News --------------------
@@ -225,6 +381,7 @@ def _tag_assets(title: str) -> Tuple[str, int]:
 
 def fetch_rss_items(url: str, timeout: float = 8.0) -> List[NewsItem]:
     # simple xml parse without extra deps
+    import requests
     try:
         r = requests.get(url, timeout=timeout, headers={"User-Agent":"gex-desk-pro/7.9"})
         r.raise_for_status()
@@ -289,6 +446,7 @@ BINANCE_TF = {"1":"1m","5":"5m","15":"15m","60":"1h","240":"4h","1D":"1d"}
 BYBIT_TF = {"1":"1","5":"5","15":"15","60":"60","240":"240","1D":"D"}
 
 def binance_klines(symbol: str, tf: str, limit: int = 300) -> List[Tuple[int,float,float,float,float,float]]:
+    import requests
     interval = BINANCE_TF.get(tf, "1m")
     url = BINANCE_BASE + "/api/v3/klines"
     r = requests.get(url, params={"symbol":symbol, "interval":interval, "limit":limit}, timeout=8)
@@ -301,6 +459,7 @@ def binance_klines(symbol: str, tf: str, limit: int = 300) -> List[Tuple[int,flo
     return out
 
 def binance_ticker(symbol: str) -> Dict[str, Any]:
+    import requests
     url = BINANCE_BASE + "/api/v3/ticker/24hr"
     r = requests.get(url, params={"symbol":symbol}, timeout=8)
     r.raise_for_status()
@@ -317,6 +476,7 @@ def binance_usdt_symbols(force: bool = False) -> List[str]:
     except Exception:
         pass
 
+    import requests
     url = BINANCE_BASE + "/api/v3/exchangeInfo"
     r = requests.get(url, timeout=12)
     r.raise_for_status()
@@ -348,6 +508,7 @@ def binance_usdt_symbols(force: bool = False) -> List[str]:
     return out
 
 def bybit_klines(symbol: str, tf: str, limit: int = 300) -> List[Tuple[int,float,float,float,float,float]]:
+    import requests
     interval = BYBIT_TF.get(tf, "1")
     url = BYBIT_BASE + "/v5/market/kline"
     params = {"category":"linear", "symbol":symbol.replace("USDT","USDT"), "interval":interval, "limit":limit}
@@ -362,15 +523,183 @@ def bybit_klines(symbol: str, tf: str, limit: int = 300) -> List[Tuple[int,float
         out.append((ts,o,c,l,h,v))
     return out
 
+# -------------------- worker results (built off-thread, read-only on the GUI thread) --------------------
+@dataclass(frozen=True)
+class ChainResult:
+    rows: Tuple[GexRow, ...]
+    strike_net: Dict[float, float]
+    flip: Optional[float]
+    walls: Tuple[Tuple[float, float], ...]
+    ts: float
+
+
+@dataclass(frozen=True)
+class RefreshResult:
+    mode: str
+    ohlc: Dict[str, Any]
+    spot: float
+    ind: Optional[Dict[str, Any]]
+    chain: Optional[ChainResult]  # None: chain not due, keep the cached one
+
+
+def _chain_result(raw_chain: List[Dict[str, Any]], n_walls: int) -> ChainResult:
+    rows = compute_gex_rows(raw_chain, scale=1e-6)
+    strike_net = aggregate_by_strike(rows)
+    return ChainResult(
+        rows=tuple(rows),
+        strike_net=strike_net,
+        flip=gamma_flip(strike_net),
+        walls=tuple(top_walls(strike_net, n=n_walls)),
+        ts=time.time(),
+    )
+
+
+def _window_candidates(insts: List[Dict[str, Any]], spot: float, pct: float, expiry_ts: Any, max_n: int) -> List[Dict[str, Any]]:
+    """Options of one expiry with strikes within pct of spot, nearest strikes first (at most max_n)."""
+    candidates = []
+    for it in insts:
+        name = it.get("instrument_name")
+        if not name:
+            continue
+        if expiry_ts and it.get("expiration_timestamp") != expiry_ts:
+            continue
+        strike = float(it.get("strike") or 0.0)
+        if strike <= 0:
+            continue
+        if abs(strike - spot) / max(spot,1.0) > pct:
+            continue
+        candidates.append(it)
+    return sorted(candidates, key=lambda x: abs(float(x.get("strike") or 0.0) - spot))[:max_n]
+
+
+def _fetch_test(p: Dict[str, Any], cancelled=lambda: False) -> RefreshResult:
+    tf = p["tf"]
+    step = 60 if tf in ("1","5","15") else (60*60 if tf in ("60",) else (4*60*60 if tf in ("240",) else 24*60*60))
+    ohlc = gen_ohlc(n=p["candles_n"], start_price=70000.0 if "BTC" in p["instrument"] else 3500.0, step_sec=step)
+    spot = float(ohlc["c"][-1])
+    raw_chain = gen_options_chain(spot=spot, center_strike=int(round(spot/1000)*1000))
+    return RefreshResult(mode="TEST", ohlc=ohlc, spot=spot, ind=None, chain=_chain_result(raw_chain, n_walls=14))
+
+@dataclass(frozen=True)
+class AltResult:
+    exchange: str
+    symbol: str
+    tf: str
+    bars: Tuple[Tuple[float, float, float, float, float], ...]  # (ts, o, c, l, h) as CandlestickItem wants
+    last: float
+    chg: float
+    vol: float
+
+
+def _fetch_alt(exchange: str, sym: str, tf: str, limit: int) -> AltResult:
+    if exchange == "Binance":
+        ohlc = binance_klines(sym, tf, limit=limit)
+        tick = binance_ticker(sym)
+        last = float(tick.get("lastPrice") or 0.0)
+        chg = float(tick.get("priceChangePercent") or 0.0)
+        vol = float(tick.get("quoteVolume") or 0.0)
+    else:
+        ohlc = bybit_klines(sym, tf, limit=limit)
+        last = float(ohlc[-1][2]) if ohlc else 0.0
+        chg = 0.0
+        vol = 0.0
+    bars = tuple((float(ts), float(o), float(c), float(l), float(h)) for (ts, o, c, l, h, v) in ohlc)
+    return AltResult(exchange=exchange, symbol=sym, tf=tf, bars=bars, last=last, chg=chg, vol=vol)
+
+
+def _fetch_alt_symbols(exchange: str) -> Tuple[str, ...]:
+    if exchange == "Binance":
+        return tuple(binance_usdt_symbols(force=True))
+    # TODO: implementar lista completa da Bybit (endpoint instruments). Por enquanto, usa a lista padrão.
+    return tuple(ALTCOINS_DEFAULT)
+
+
+def _fetch_news(cancelled=lambda: False) -> Tuple[NewsItem, ...]:
+    items: List[NewsItem] = []
+    for cat, name, url in NEWS_FEEDS:
+        if cancelled():
+            raise JobCancelled()
+        got = fetch_rss_items(url)
+        for it in got:
+            it.source = f"{cat} | {name}"
+        items.extend(got)
+    # de-dup by title
+    seen = set()
+    uniq = []
+    for it in items:
+        key = it.title.lower().strip()
+        if key and key not in seen:
+            seen.add(key)
+            uniq.append(it)
+    return tuple(uniq)
+
+# -------------------- crosshair lookup --------------------
+class HoverIndex:
+    """
+    Lookup tables for the crosshair, built once per data refresh: bar times and
+    key levels (flip + walls), both sorted, so hover/click/fit are searchsorted
+    calls instead of scans.
+    """
+
+    def __init__(self, bars: np.ndarray, flip: Optional[float] = None, walls: Optional[List[Tuple[float, float]]] = None):
+        bars = np.asarray(bars, dtype=float).reshape(-1, 5)  # t, o, c, l, h (CandlestickItem order)
+        if bars.shape[0] > 1 and np.any(np.diff(bars[:, 0]) < 0):
+            bars = bars[np.argsort(bars[:, 0], kind="stable")]
+        self.bars = bars
+        self.t = bars[:, 0]
+        levels = ([("FLIP", float(flip))] if flip else []) + [("WALL", float(s)) for s, _ in (walls or [])]
+        order = sorted(range(len(levels)), key=lambda i: levels[i][1])  # stable: FLIP wins ties
+        self.lv = np.array([levels[i][1] for i in order], dtype=float)
+        self.lv_name = [levels[i][0] for i in order]
+
+    def bar_at(self, x: float) -> Optional[int]:
+        """Index of the bar nearest to x."""
+        n = self.t.size
+        if not n:
+            return None
+        i = int(np.searchsorted(self.t, x))
+        if i >= n:
+            return n - 1
+        if i > 0 and (x - self.t[i - 1]) <= (self.t[i] - x):
+            return i - 1
+        return i
+
+    def level_near(self, y: float, tol: float) -> Optional[Tuple[str, float]]:
+        """Nearest level to y within tol."""
+        n = self.lv.size
+        if not n:
+            return None
+        i = int(np.searchsorted(self.lv, y))
+        best = None
+        for j in (i - 1, i):
+            if 0 <= j < n and (best is None or abs(self.lv[j] - y) < abs(self.lv[best] - y)):
+                best = j
+        if best is None or abs(self.lv[best] - y) > tol:
+            return None
+        return self.lv_name[best], float(self.lv[best])
+
+    def y_range(self, x0: float, x1: float) -> Optional[Tuple[float, float]]:
+        """(low, high) of the bars with x0 <= t <= x1."""
+        i0 = int(np.searchsorted(self.t, x0, side="left"))
+        i1 = int(np.searchsorted(self.t, x1, side="right"))
+        if i1 <= i0:
+            return None
+        seg = self.bars[i0:i1]
+        return float(seg[:, 3].min()), float(seg[:, 4].max())
+
 
 # -------------------- Main Window --------------------
 class DeskWindow(QtWidgets.QMainWindow):
+    LOG_VIEW_LINES = 3000  # lines kept in the Logs view (the tailer buffers 4x for re-filtering)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Deribit GEX Desk PRO v7.9 (DESK+ALT+NEWS)")
         self.resize(1780, 1000)
 
         self.client = DeribitPublicClient(timeout=7.0)
+        self.candles = CandleStore(self.client, data_dir=os.environ.get("MESA_CANDLE_DIR", os.path.join("cache", "candles")))
+        self.indicators = IndicatorService(self.candles)  # rolling ATR/EMA/RSI/RV (same service as the bot)
 
         # config
         self.mode = "LIVE"
@@ -406,18 +735,44 @@ class DeskWindow(QtWidgets.QMainWindow):
 
         # news state
         self.news_items: List[NewsItem] = []
+        self._news_ts = 0.0  # last live fetch (0: none yet / restored from the snapshot)
+
+        # GEX Map state
+        self._heat_rows: Dict[str, Tuple[GexRow, ...]] = {}  # expiry -> rows, in arrival (near -> far) order
+        self._heat_grid: Tuple[List[float], List[str], np.ndarray] = ([], [], np.zeros((0, 0)))
+        self._heat_ts = 0.0
+
+        # crosshair lookup (rebuilt on every candle repaint)
+        self._hover = HoverIndex(np.zeros((0, 5)))
+
+        # background jobs: fetch/compute off the GUI thread, results applied via queued signals
+        self.jobs = JobRunner(self, max_threads=4)
+        self.jobs.timing.connect(self._on_job_timing)
+
+        # last-session snapshot: painted at startup (marked stale) until live data lands
+        self._snapshot_path = snapshot_path()
+        self._stale_since: Optional[float] = None
 
         self._build_ui()
         self._apply_theme()
+        self._restore_snapshot()
 
         self.timer = QtCore.QTimer(self)
         self.timer.timeout.connect(self._auto_loop)
         self.timer.start(1000)
 
-        QtCore.QTimer.singleShot(250, self.refresh_all)
-        # Load extra tabs soon after boot so the UI doesn't look "empty".
-        QtCore.QTimer.singleShot(700, self.refresh_altcoins)
-        QtCore.QTimer.singleShot(900, self.refresh_news)
+        self.snap_timer = QtCore.QTimer(self)
+        self.snap_timer.timeout.connect(self._save_snapshot)
+        self.snap_timer.start(60_000)
+
+        # the refresh runs in the background: no reason to delay it
+        QtCore.QTimer.singleShot(0, self.refresh_all)
+        # Altcoins/News/GEX Map fetch on first activation (_on_tab_changed), restored news included
+        _startup_mark("ui")
+
+    def paintEvent(self, ev):
+        super().paintEvent(ev)
+        _startup_mark("first_paint")
 
     # ---------------- UI ----------------
     def _apply_theme(self):
@@ -436,7 +791,7 @@ class DeskWindow(QtWidgets.QMainWindow):
             QLabel#KPI { font-size: 22px; font-weight: 800; color: #e8eaee; }
             QLabel#Small { color: #aeb4be; }
             QTextEdit { background: #0b0f17; border: 1px solid #232a36; border-radius: 8px; }
-            QTableWidget { background: #0b0f17; border: 1px solid #232a36; gridline-color: #1a2230; }
+            QTableWidget, QTableView { background: #0b0f17; border: 1px solid #232a36; gridline-color: #1a2230; }
             QHeaderView::section { background: #121824; border: 1px solid #232a36; padding: 6px; color: #aeb4be; }
         """)
 
@@ -462,6 +817,7 @@ class DeskWindow(QtWidgets.QMainWindow):
         self.lbl_last = QtWidgets.QLabel("Última: —"); self.lbl_last.setObjectName("Small")
         self.lbl_lat = QtWidgets.QLabel("Lat: —"); self.lbl_lat.setObjectName("Small")
         self.lbl_hover = QtWidgets.QLabel("—"); self.lbl_hover.setObjectName("Small")
+        self.lbl_jobs = QtWidgets.QLabel("Jobs: —"); self.lbl_jobs.setObjectName("Small")
 
         bar.addWidget(QtWidgets.QLabel("Modo:")); bar.addWidget(self.cb_mode)
         bar.addSpacing(8)
@@ -480,12 +836,13 @@ class DeskWindow(QtWidgets.QMainWindow):
         bar.addWidget(self.lbl_hover); bar.addSpacing(12)
         bar.addWidget(self.lbl_status); bar.addSpacing(12)
         bar.addWidget(self.lbl_lat); bar.addSpacing(12)
+        bar.addWidget(self.lbl_jobs); bar.addSpacing(12)
         bar.addWidget(self.lbl_last)
 
         self.btn_refresh.clicked.connect(self.refresh_all)
         self.cb_mode.currentTextChanged.connect(self._on_cfg_change)
         self.cb_inst.currentTextChanged.connect(self._on_cfg_change)
-        self.cb_tf.currentTextChanged.connect(self._on_cfg_change)
+        self.cb_tf.currentTextChanged.connect(self._on_tf_change)
         self.cb_scope.currentTextChanged.connect(self._on_cfg_change)
         self.sp_candles.valueChanged.connect(self._on_cfg_change)
         self.sp_auto.valueChanged.connect(self._on_cfg_change)
@@ -498,22 +855,41 @@ class DeskWindow(QtWidgets.QMainWindow):
         self.tab_alt = QtWidgets.QWidget()
         self.tab_news = QtWidgets.QWidget()
         self.tab_options = QtWidgets.QWidget()
+        self.tab_heat = QtWidgets.QWidget()
         self.tab_logs = QtWidgets.QWidget()
 
         self.tabs.addTab(self.tab_desk, "Desk")
         self.tabs.addTab(self.tab_alt, "Altcoins")
         self.tabs.addTab(self.tab_news, "News")
         self.tabs.addTab(self.tab_options, "Options")
+        self.tabs.addTab(self.tab_heat, "GEX Map")
         self.tabs.addTab(self.tab_logs, "Logs")
 
-        # Lazy refresh: if user opens Altcoins/News and it's empty, fetch immediately.
+        # Lazy tabs: only the Desk is built up front; the others on first activation (_ensure_tab),
+        # which also fetches their data if empty.
+        self._tab_builders = {
+            "Altcoins": self._build_altcoins,
+            "News": self._build_news,
+            "Options": self._build_options,
+            "GEX Map": self._build_heatmap,
+            "Logs": self._build_logs,
+        }
+        self._tabs_built = {"Desk"}
         self.tabs.currentChanged.connect(self._on_tab_changed)
 
         self._build_desk()
-        self._build_altcoins()
-        self._build_news()
-        self._build_options()
-        self._build_logs()
+
+    def _ensure_tab(self, name: str) -> bool:
+        if name in self._tabs_built:
+            return True
+        build = self._tab_builders.get(name)
+        if build is None:
+            return False
+        t0 = time.perf_counter()
+        self._tabs_built.add(name)
+        build()
+        log(f"tab {name} built in {(time.perf_counter()-t0)*1000:.0f}ms")
+        return True
 
     def _build_desk(self):
         lay = QtWidgets.QVBoxLayout(self.tab_desk)
@@ -615,7 +991,13 @@ class DeskWindow(QtWidgets.QMainWindow):
         self.hline = pg.InfiniteLine(angle=0, movable=False, pen=pg.mkPen("#2c7dff", width=1))
         self.candle_plot.addItem(self.vline, ignoreBounds=True)
         self.candle_plot.addItem(self.hline, ignoreBounds=True)
-        self._proxy = pg.SignalProxy(self.candle_plot.scene().sigMouseMoved, rateLimit=60, slot=self._on_mouse_move)
+        # mouse moves are coalesced: keep the latest position, handle it once per frame
+        self._hover_pos: Optional[QtCore.QPointF] = None
+        self._hover_timer = QtCore.QTimer(self)
+        self._hover_timer.setSingleShot(True)
+        self._hover_timer.setInterval(16)
+        self._hover_timer.timeout.connect(self._flush_hover)
+        self.candle_plot.scene().sigMouseMoved.connect(self._on_mouse_move)
         self.candle_plot.scene().sigMouseClicked.connect(self._on_candle_click)
 
         self.split_charts.addWidget(self.candle_plot)
@@ -629,7 +1011,12 @@ class DeskWindow(QtWidgets.QMainWindow):
         self.gex_plot.setMouseEnabled(x=True, y=True)
         self.gex_plot.scene().sigMouseClicked.connect(self._on_gex_click)
         self.split_charts.addWidget(self.gex_plot)
-        self.gex_bars = None
+        # long-lived items: refreshes update them in place (setOpts), the view range is left alone
+        self.gex_bars = pg.BarGraphItem(x=np.zeros(0), height=np.zeros(0), width=1.0, brush=pg.mkBrush("#2c7dff"))
+        self.gex_plot.addItem(self.gex_bars)
+        self.gex_plot.addLine(y=0, pen=pg.mkPen("#4b5563", width=1))
+        self._gex_x = np.zeros(0)  # sorted strikes currently drawn
+        self._gex_span: Optional[Tuple[float, float]] = None
 
         self.split_main.addWidget(left)
 
@@ -676,11 +1063,8 @@ class DeskWindow(QtWidgets.QMainWindow):
         grid.addWidget(self.btn_calc, 1,2)
         grid.addWidget(self.lbl_rr, 2,2)
 
-        self.tbl_sug = QtWidgets.QTableWidget(0, 9)
-        self.tbl_sug.setHorizontalHeaderLabels(["instrument","type","strike","expiry","dte","gex","bid","ask","oi"])
-        self.tbl_sug.horizontalHeader().setStretchLastSection(True)
-        self.tbl_sug.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
-        self.tbl_sug.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.sug_model = OptionsModel(SUGGEST_TABLE)
+        self.tbl_sug, self.sug_proxy = make_table(self.sug_model)
         self.tbl_sug.setMinimumHeight(160)
         self.card_plan.layout().addWidget(self.tbl_sug)
 
@@ -697,9 +1081,13 @@ class DeskWindow(QtWidgets.QMainWindow):
         self.split_main.setSizes([650, 1250])  # mesa default: mais espaço para cards
         self.split_charts.setSizes([330, 170])  # mesa default: compactar charts
 
-        # level lines store
-        self._level_lines: List[pg.InfiniteLine] = []
-        self._selected_line: Optional[pg.InfiniteLine] = None
+        # level lines: pooled, repositioned on refresh (extra ones hidden)
+        self._level_pool: List[pg.InfiniteLine] = []
+        self._level_keys: List[Optional[Tuple[str, int]]] = []  # pen currently set on each pooled line
+        self._level_pens: Dict[Tuple[str, int], Any] = {}
+        self._selected_line = pg.InfiniteLine(pos=0.0, angle=0, movable=False, pen=pg.mkPen("#ffb020", width=2))
+        self._selected_line.hide()
+        self.candle_plot.addItem(self._selected_line, ignoreBounds=True)
 
     def _build_altcoins(self):
         lay = QtWidgets.QVBoxLayout(self.tab_alt)
@@ -712,7 +1100,7 @@ class DeskWindow(QtWidgets.QMainWindow):
         self.cb_alt_ex = QtWidgets.QComboBox(); self.cb_alt_ex.addItems(["Binance","Bybit"])
         self.cb_alt_tf = QtWidgets.QComboBox(); self.cb_alt_tf.addItems(["1","5","15","60","240","1D"]); self.cb_alt_tf.setCurrentText(self.alt_tf)
         self.sp_alt_candles = QtWidgets.QSpinBox(); self.sp_alt_candles.setRange(120, 3000); self.sp_alt_candles.setValue(900)
-        self.cb_alt_sym = QtWidgets.QComboBox(); self.cb_alt_sym.addItems(ALTCOINS_DEFAULT)
+        self.cb_alt_sym = QtWidgets.QComboBox(); self.cb_alt_sym.addItems(self._alt_all_symbols)
         self.ed_alt_filter = QtWidgets.QLineEdit(); self.ed_alt_filter.setPlaceholderText("Filtrar (ex: SOL)")
         self.btn_alt_load = QtWidgets.QPushButton("Carregar lista")
         self.btn_alt = QtWidgets.QPushButton("Atualizar Alt")
@@ -796,12 +1184,9 @@ class DeskWindow(QtWidgets.QMainWindow):
         self.cb_news.currentTextChanged.connect(self._paint_news)
         self.ed_news.textChanged.connect(self._paint_news)
 
-        self.tbl_news = QtWidgets.QTableWidget(0, 5)
-        self.tbl_news.setHorizontalHeaderLabels(["score","assets","source","title","link"])
-        self.tbl_news.horizontalHeader().setStretchLastSection(True)
-        self.tbl_news.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
-        self.tbl_news.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
-        self.tbl_news.cellDoubleClicked.connect(self._open_news_link)
+        self.news_model = NewsModel()
+        self.tbl_news, self.news_proxy = make_table(self.news_model, 0, QtCore.Qt.DescendingOrder)  # by score
+        self.tbl_news.doubleClicked.connect(self._open_news_link)
 
         lay.addWidget(self.tbl_news, 1)
 
@@ -809,6 +1194,9 @@ class DeskWindow(QtWidgets.QMainWindow):
         hint.setObjectName("Small"); hint.setWordWrap(True)
         lay.addWidget(hint)
 
+        if self.news_items:
+            self._paint_news()
+
     def _build_options(self):
         lay = QtWidgets.QVBoxLayout(self.tab_options)
         lay.setContentsMargins(0,0,0,0)
@@ -824,21 +1212,86 @@ class DeskWindow(QtWidgets.QMainWindow):
         top.addStretch(1)
         top.addWidget(self.lbl_exp)
 
-        self.tbl_opt = QtWidgets.QTableWidget(0, 11)
-        self.tbl_opt.setHorizontalHeaderLabels(["instrument","type","strike","expiry","dte","oi","gamma","gex","bid","ask","iv"])
-        self.tbl_opt.horizontalHeader().setStretchLastSection(True)
-        self.tbl_opt.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
-        self.tbl_opt.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.opt_model = OptionsModel()
+        self.tbl_opt, self.opt_proxy = make_table(self.opt_model, 2)  # by strike (then type: model order)
+        self.cb_filter.currentTextChanged.connect(self._paint_options)
         lay.addWidget(self.tbl_opt, 1)
 
+        if self.rows:
+            self._paint_options()
+
+    def _build_heatmap(self):
+        lay = QtWidgets.QVBoxLayout(self.tab_heat)
+        lay.setContentsMargins(0,0,0,0)
+        lay.setSpacing(10)
+
+        top = QtWidgets.QHBoxLayout()
+        lay.addLayout(top)
+        self.btn_heat = QtWidgets.QPushButton("Atualizar")
+        self.sp_heat_exp = QtWidgets.QSpinBox(); self.sp_heat_exp.setRange(2, 24); self.sp_heat_exp.setValue(8)
+        self.lbl_heat = QtWidgets.QLabel("—"); self.lbl_heat.setObjectName("Small")
+        self.lbl_heat_hover = QtWidgets.QLabel("—"); self.lbl_heat_hover.setObjectName("Small")
+        self.btn_heat.clicked.connect(self.refresh_heatmap)
+        top.addWidget(self.btn_heat)
+        top.addWidget(QtWidgets.QLabel("Expiries:")); top.addWidget(self.sp_heat_exp)
+        top.addWidget(self.lbl_heat)
+        top.addStretch(1)
+        top.addWidget(self.lbl_heat_hover)
+
+        # x = expiry column (near -> far), y = strike row; axes carry the labels
+        self.heat_plot = pg.PlotWidget()
+        self.heat_plot.setBackground("#0f1520")
+        self.heat_plot.setLabel("left", "strike")
+        self.heat_plot.setLabel("bottom", "expiry")
+        self.heat_img = pg.ImageItem(axisOrder="col-major")
+        self.heat_img.setLookupTable(pg.ColorMap([0.0, 0.5, 1.0], ["#ff4d6d", "#0b0f17", "#2c7dff"]).getLookupTable(nPts=256))
+        self.heat_plot.addItem(self.heat_img)
+        self.heat_sel = pg.ScatterPlotItem(size=14, pen=pg.mkPen("#ffb020", width=2), brush=None, symbol="s")
+        self.heat_plot.addItem(self.heat_sel)
+        self.heat_plot.scene().sigMouseMoved.connect(self._on_heat_move)
+        self.heat_plot.scene().sigMouseClicked.connect(self._on_heat_click)
+        lay.addWidget(self.heat_plot, 1)
+
+
     def _build_logs(self):
         lay = QtWidgets.QVBoxLayout(self.tab_logs)
-        self.log_box = QtWidgets.QTextEdit()
+        lay.setContentsMargins(0,0,0,0)
+        lay.setSpacing(10)
+
+        top = QtWidgets.QHBoxLayout()
+        lay.addLayout(top)
+        self.cb_log_level = QtWidgets.QComboBox(); self.cb_log_level.addItems(list(LEVELS))
+        self.cb_log_module = QtWidgets.QComboBox(); self.cb_log_module.addItem("ALL")
+        self.ed_log = QtWidgets.QLineEdit(); self.ed_log.setPlaceholderText("Filtrar texto")
+        self.chk_log_follow = QtWidgets.QCheckBox("Seguir"); self.chk_log_follow.setChecked(True)
+        self.lbl_log = QtWidgets.QLabel("—"); self.lbl_log.setObjectName("Small")
+        btn = QtWidgets.QPushButton("Recarregar logs")
+        top.addWidget(QtWidgets.QLabel("Nível ≥")); top.addWidget(self.cb_log_level)
+        top.addWidget(QtWidgets.QLabel("Módulo:")); top.addWidget(self.cb_log_module)
+        top.addWidget(self.ed_log, 1)
+        top.addWidget(self.chk_log_follow)
+        top.addWidget(btn)
+        top.addWidget(self.lbl_log)
+
+        # plain text + block cap: appending is O(new lines), old lines fall off the top
+        self.log_box = QtWidgets.QPlainTextEdit()
         self.log_box.setReadOnly(True)
+        self.log_box.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+        self.log_box.setMaximumBlockCount(self.LOG_VIEW_LINES)
         lay.addWidget(self.log_box, 1)
-        btn = QtWidgets.QPushButton("Recarregar logs")
+
+        # the file is read incrementally (only appended bytes); filters work on the buffered lines
+        self.log_tail = LogTailer(os.path.join(LOG_DIR, APP_LOG), max_lines=self.LOG_VIEW_LINES * 4)
+        self._log_keep = line_filter()
+        self.log_timer = QtCore.QTimer(self)
+        self.log_timer.timeout.connect(self._poll_logs)
+        self.log_timer.start(1000)
+
         btn.clicked.connect(self._reload_logs)
-        lay.addWidget(btn)
+        self.cb_log_level.currentTextChanged.connect(self._refilter_logs)
+        self.cb_log_module.currentTextChanged.connect(self._refilter_logs)
+        self.ed_log.textChanged.connect(self._refilter_logs)
+        self._poll_logs()
 
     # ---------------- Events ----------------
     def _on_cfg_change(self, *_):
@@ -858,6 +1311,27 @@ class DeskWindow(QtWidgets.QMainWindow):
             self.gex_window_pct = 0.65
             self.gex_max_instruments = 520
 
+    def _on_tf_change(self, *_):
+        self._on_cfg_change()
+        if self.mode != "LIVE" or not self.payload:
+            return
+        # TF switch: repaint right away from the 1m base (resampled locally) when it covers the window
+        try:
+            n = int(getattr(self, "candles_n", 900) or 900)
+            s = self.candles.cached(self.instrument, self.tf, n)
+            if s is None:
+                return
+            ohlc = rows_to_ohlc(s.window(n))
+            if not ohlc["t"]:
+                return
+            self.payload = {**self.payload, "ohlc": ohlc, "ind": None}
+            self._paint_candles(ohlc)
+            self._update_cards()
+            if self.cb_autoy.currentText().endswith("ON"):
+                self._fit_y_visible()
+        except Exception as e:
+            log(f"tf switch repaint failed: {e}")
+
     def _apply_ratio(self, val: int):
         # charts% slider affects horizontal splitter sizes
         try:
@@ -878,28 +1352,26 @@ class DeskWindow(QtWidgets.QMainWindow):
 
     def _fit_y_visible(self):
         try:
-            if not self.payload:
-                return
-            ohlc = self.payload.get("ohlc") or {}
-            t = ohlc.get("t") or []
-            h = ohlc.get("h") or []
-            l = ohlc.get("l") or []
-            if not t:
-                return
             vr = self.candle_plot.plotItem.vb.viewRange()
             x0, x1 = vr[0]
-            idxs = [i for i, xv in enumerate(t) if x0 <= float(xv) <= x1]
-            if not idxs:
+            yr = self._hover.y_range(x0, x1)
+            if yr is None:
                 return
-            lo = min(float(l[i]) for i in idxs)
-            hi = max(float(h[i]) for i in idxs)
+            lo, hi = yr
             pad = (hi - lo) * 0.08 if hi > lo else max(1.0, hi*0.002)
             self.candle_plot.setYRange(lo-pad, hi+pad, padding=0)
         except Exception:
             pass
 
-    def _on_mouse_move(self, evt):
-        pos = evt[0]
+    def _on_mouse_move(self, pos):
+        self._hover_pos = pos
+        if not self._hover_timer.isActive():
+            self._hover_timer.start()
+
+    def _flush_hover(self):
+        pos, self._hover_pos = self._hover_pos, None
+        if pos is None:
+            return
         if self.candle_plot.sceneBoundingRect().contains(pos):
             mp = self.candle_plot.plotItem.vb.mapSceneToView(pos)
             self.vline.setPos(mp.x())
@@ -911,29 +1383,18 @@ class DeskWindow(QtWidgets.QMainWindow):
         try:
             if not self.payload:
                 return
-            ohlc = self.payload.get("ohlc") or {}
-            t = ohlc.get("t") or []
-            if not t:
-                return
             # nearest candle by time
-            arr = np.array(t, dtype=float)
-            i = int(np.argmin(np.abs(arr - float(x))))
-            o = float((ohlc.get("o") or [0])[i])
-            c = float((ohlc.get("c") or [0])[i])
-            h = float((ohlc.get("h") or [0])[i])
-            l = float((ohlc.get("l") or [0])[i])
+            i = self._hover.bar_at(float(x))
+            if i is None:
+                return
+            _, o, c, l, h = self._hover.bars[i]
             hint = f"O:{o:.1f} H:{h:.1f} L:{l:.1f} C:{c:.1f}"
             # nearest level
             spot = float(self.payload.get("spot") or 0.0)
-            levels = []
-            if self.flip:
-                levels.append(("FLIP", float(self.flip)))
-            for s, _ in (self.walls or []):
-                levels.append(("WALL", float(s)))
-            if levels:
-                name, lv = min(levels, key=lambda kv: abs(kv[1]-y))
-                if abs(lv - y) <= max(spot*0.003, 140.0):
-                    hint += f" | near {name} {lv:,.0f}"
+            near = self._hover.level_near(float(y), max(spot*0.003, 140.0))
+            if near is not None:
+                name, lv = near
+                hint += f" | near {name} {lv:,.0f}"
             self.lbl_hover.setText(hint)
         except Exception:
             pass
@@ -949,16 +1410,9 @@ class DeskWindow(QtWidgets.QMainWindow):
         spot = float(self.payload.get("spot") or 0.0)
 
         # choose nearest wall/flip based on y
-        candidates = []
-        if self.flip is not None:
-            candidates.append(("FLIP", float(self.flip)))
-        for s, net in (self.walls or []):
-            candidates.append(("WALL", float(s)))
-        if not candidates:
-            return
-        name, lv = min(candidates, key=lambda kv: abs(kv[1]-y))
-        tol = max(spot*0.004, 180.0)
-        if abs(lv - y) <= tol:
+        near = self._hover.level_near(y, max(spot*0.004, 180.0))
+        if near is not None:
+            name, lv = near
             self.selected_level = lv
             # snap to strike for options lookup
             self.selected_strike = lv
@@ -974,10 +1428,12 @@ class DeskWindow(QtWidgets.QMainWindow):
         mp = self.gex_plot.plotItem.vb.mapSceneToView(pos)
         x = float(mp.x())
 
-        strikes = np.array(list(self.strike_net.keys()), dtype=float)
+        strikes = self._gex_x
         if strikes.size == 0:
             return
-        i = int(np.argmin(np.abs(strikes - x)))
+        i = int(np.clip(np.searchsorted(strikes, x), 1, max(1, strikes.size - 1)))
+        if strikes.size == 1 or abs(strikes[i - 1] - x) <= abs(strikes[i] - x):
+            i -= 1
         sel = float(strikes[i])
         self.selected_strike = sel
         self.selected_level = sel
@@ -985,34 +1441,53 @@ class DeskWindow(QtWidgets.QMainWindow):
         self._highlight_level(sel)
 
     def _highlight_level(self, lv: float):
-        try:
-            if self._selected_line is not None:
-                self.candle_plot.removeItem(self._selected_line)
-        except Exception:
-            pass
-        self._selected_line = pg.InfiniteLine(pos=lv, angle=0, movable=False, pen=pg.mkPen("#ffb020", width=2))
-        self.candle_plot.addItem(self._selected_line, ignoreBounds=True)
+        self._selected_line.setPos(float(lv))
+        self._selected_line.show()
 
     # ---------------- Data fetch & refresh ----------------
     def refresh_all(self):
         self._last_refresh = time.time()
         self.lbl_status.setText("Atualizando...")
         self._on_cfg_change()
-        QtCore.QTimer.singleShot(10, self._refresh_worker)
-
-    def _refresh_worker(self):
+        p = self._refresh_params()
+        fetch = _fetch_test if p["mode"] == "TEST" else self._fetch_live
+        self.jobs.submit("refresh", lambda cancelled: fetch(p, cancelled), self._apply_refresh, self._refresh_failed)
+
+    def _refresh_params(self) -> Dict[str, Any]:
+        """Snapshot of everything the fetch needs (read on the GUI thread, passed by value)."""
+        need_chain = time.time() - self._last_chain_ts >= float(self.chain_refresh_sec) or not self.rows
+        return {
+            "mode": self.mode,
+            "instrument": self.instrument,
+            "tf": self.tf,
+            "candles_n": int(getattr(self, "candles_n", 900) or 900),
+            "need_chain": need_chain,
+            "gex_scope": self.gex_scope,
+            "gex_window_pct": float(self.gex_window_pct),
+            "gex_max_instruments": int(self.gex_max_instruments),
+        }
+
+    def _apply_refresh(self, res: RefreshResult, ms: float):
         try:
-            t0 = time.time()
-            payload = self._fetch_test() if self.mode == "TEST" else self._fetch_live()
-            self._last_latency_ms = (time.time() - t0) * 1000.0
-            self.payload = payload
+            self._last_latency_ms = ms
+            if res.chain is not None:
+                self.rows = list(res.chain.rows)
+                self.strike_net = dict(res.chain.strike_net)
+                self.flip = res.chain.flip
+                self.walls = list(res.chain.walls)
+                self._last_chain_ts = res.chain.ts
+            self.payload = {"mode": res.mode, "ohlc": res.ohlc, "spot": res.spot, "ind": res.ind}
 
             self.lbl_last.setText(f"Última: {now_str()}")
             self.lbl_lat.setText(f"Lat: {self._last_latency_ms:.0f} ms")
-            self.lbl_status.setText("OK")
+            self.lbl_status.setText("OK" if res.mode == self.mode else f"OK ({res.mode})")
+            if self._stale_since is not None:
+                self._stale_since = None
+                self.lbl_status.setStyleSheet("")
 
+            t0 = time.perf_counter()
             self._update_cards()
-            self._paint_candles(payload["ohlc"])
+            self._paint_candles(res.ohlc)
             self._paint_gex()
             self._paint_options()
 
@@ -1022,143 +1497,207 @@ class DeskWindow(QtWidgets.QMainWindow):
             # auto-fit y if enabled
             if self.cb_autoy.currentText().endswith("ON"):
                 self._fit_y_visible()
+            paint_ms = (time.perf_counter() - t0) * 1000.0
 
-            log(f"Refresh OK mode={self.mode} inst={self.instrument} tf={self.tf} scope={self.gex_scope} latency={self._last_latency_ms:.0f}ms")
+            log(f"Refresh OK mode={res.mode} inst={self.instrument} tf={self.tf} scope={self.gex_scope} fetch={ms:.0f}ms paint={paint_ms:.0f}ms chain={'new' if res.chain is not None else 'cached'}")
+            _startup_mark("first_live" if res.mode == "LIVE" else "first_data")
         except Exception as e:
             crash(e)
-            self.lbl_status.setText(f"ERRO ({e}) -> TEST")
-            try:
-                payload = self._fetch_test()
-                self.mode = "TEST"
-                self.cb_mode.setCurrentText("TEST")
-                self.payload = payload
-                self.lbl_last.setText(f"Última: {now_str()}")
-                self._update_cards()
-                self._paint_candles(payload["ohlc"])
-                self._paint_gex()
-                self._paint_options()
-            except Exception as e2:
-                crash(e2)
-
-    def _fetch_test(self):
-        step = 60 if self.tf in ("1","5","15") else (60*60 if self.tf in ("60",) else (4*60*60 if self.tf in ("240",) else 24*60*60))
-        n = int(getattr(self, "candles_n", 900) or 900)
-        ohlc = gen_ohlc(n=n, start_price=70000.0 if "BTC" in self.instrument else 3500.0, step_sec=step)
-        spot = float(ohlc["c"][-1])
-        raw_chain = gen_options_chain(spot=spot, center_strike=int(round(spot/1000)*1000))
-        rows = compute_gex_rows(raw_chain, scale=1e-6)
-        self.rows = rows
-        self.strike_net = aggregate_by_strike(rows)
-        self.flip = gamma_flip(self.strike_net)
-        self.walls = top_walls(self.strike_net, n=14)
-        self._last_chain_ts = time.time()
-        return {"mode":"TEST","ohlc":ohlc,"spot":spot}
-
-    def _fetch_live(self):
-        inst = self.instrument
-        tf = self.tf
-
-        now_ms = int(time.time() * 1000)
-        # Candle history span is user-controlled (candles_n)
-        n = int(getattr(self, "candles_n", 900) or 900)
-        tf_sec = 60
-        if tf == "1": tf_sec = 60
-        elif tf == "5": tf_sec = 5 * 60
-        elif tf == "15": tf_sec = 15 * 60
-        elif tf == "60": tf_sec = 60 * 60
-        elif tf == "240": tf_sec = 4 * 60 * 60
-        else: tf_sec = 24 * 60 * 60  # 1D
-
-        span = n * tf_sec * 1000
-        start_ms = now_ms - span
-
-        chart, _ = self.client.get_tradingview_chart_data(inst, tf, start_ms, now_ms)
-        t = chart.get("ticks") or chart.get("t") or []
-        o = chart.get("open") or chart.get("o") or []
-        h = chart.get("high") or chart.get("h") or []
-        l = chart.get("low") or chart.get("l") or []
-        c = chart.get("close") or chart.get("c") or []
-        v = chart.get("volume") or chart.get("v") or []
-        # Normalize timestamps: Deribit returns milliseconds; DateAxisItem expects seconds.
-        try:
-            if t and float(t[-1]) > 1e11:
-                t = [float(x) / 1000.0 for x in t]
-        except Exception:
-            pass
-        ohlc = {"t":t,"o":o,"h":h,"l":l,"c":c,"v":v}
+            self.lbl_status.setText(f"ERRO: {e}")
+
+    def _refresh_failed(self, e: BaseException, ms: float):
+        crash(e)
+        self.lbl_status.setText(f"ERRO ({e}) -> TEST")
+        self.mode = "TEST"
+        self.cb_mode.blockSignals(True)
+        self.cb_mode.setCurrentText("TEST")
+        self.cb_mode.blockSignals(False)
+        p = self._refresh_params()
+        p["need_chain"] = True
+        self.jobs.submit("refresh", lambda cancelled: _fetch_test(p, cancelled), self._apply_refresh, lambda e2, _ms: crash(e2))
+
+    def _fetch_live(self, p: Dict[str, Any], cancelled) -> RefreshResult:
+        """Worker thread: candles, ticker, indicators and (when due) the option chain. No widget access."""
+        inst = p["instrument"]
+        tf = p["tf"]
+
+        # Candle history span is user-controlled (candles_n); the store only fetches the tail after the first load
+        n = p["candles_n"]
+        ohlc = self.candles.ohlc(inst, tf, n)
+        c = ohlc["c"]
 
         ticker, _ = self.client.get_ticker(inst)
         spot = float(ticker.get("last_price") or ticker.get("index_price") or (c[-1] if c else 0.0) or 0.0)
 
+        ind = None
+        try:
+            ind = self.indicators.snapshot(inst, tf)
+        except Exception as e:
+            log(f"indicators failed: {e}")
+
         # Chain heavy part with caching
-        if time.time() - self._last_chain_ts >= float(self.chain_refresh_sec) or not self.rows:
+        chain = None
+        if p["need_chain"]:
+            if cancelled():
+                raise JobCancelled()
             currency = "BTC" if "BTC" in inst else "ETH"
             insts, _ = self.client.get_instruments(currency=currency, kind="option", expired=False)
 
             expiries = sorted({i.get("expiration_timestamp") for i in insts if i.get("expiration_timestamp")})
             target_exp = expiries[0] if expiries else None
 
-            # window
-            pct = float(self.gex_window_pct)
-            candidates = []
-            for it in insts:
-                name = it.get("instrument_name")
-                if not name:
-                    continue
-                if target_exp and it.get("expiration_timestamp") != target_exp:
-                    continue
-                strike = float(it.get("strike") or 0.0)
-                if strike <= 0:
-                    continue
-                if abs(strike - spot) / max(spot,1.0) > pct:
-                    continue
-                candidates.append(it)
-
-            # keep more instruments (scope)
-            candidates = sorted(candidates, key=lambda x: abs(float(x.get("strike") or 0.0) - spot))[:int(self.gex_max_instruments)]
-
-            raw_chain: List[Dict[str, Any]] = []
-
-            def fetch_one(it):
-                name = it["instrument_name"]
-                tick, _ = self.client.get_ticker(name)
-                greeks = tick.get("greeks") or {}
-                parts = name.split("-")
-                expiry_code = parts[1] if len(parts) >= 3 else ""
-                return {
-                    "instrument_name": name,
-                    "strike": float(it.get("strike") or 0.0),
-                    "option_type": "call" if str(it.get("option_type","")).lower().startswith("c") else "put",
-                    "open_interest": float(tick.get("open_interest") or 0.0),
-                    "gamma": float(greeks.get("gamma") or 0.0),
-                    "bid_price": float(tick.get("best_bid_price") or 0.0),
-                    "ask_price": float(tick.get("best_ask_price") or 0.0),
-                    "mark_iv": float(tick.get("mark_iv") or 0.0),
-                    "underlying_price": float(spot),
-                    "expiry": expiry_code,
-                }
-
-            workers = 14 if self.gex_scope != "ULTRA" else 18
-            timeout = 16 if self.gex_scope != "ULTRA" else 24
-            with ThreadPoolExecutor(max_workers=workers) as ex:
-                futs = [ex.submit(fetch_one, it) for it in candidates]
-                for f in as_completed(futs, timeout=timeout):
-                    try:
-                        raw_chain.append(f.result())
-                    except Exception:
-                        pass
-
-            rows = compute_gex_rows(raw_chain, scale=1e-6)
-            self.rows = rows
-            self.strike_net = aggregate_by_strike(rows)
-            self.flip = gamma_flip(self.strike_net)
-            self.walls = top_walls(self.strike_net, n=16)
-            self._last_chain_ts = time.time()
-
-        return {"mode":"LIVE","ohlc":ohlc,"spot":spot}
+            # window; keep more instruments (scope)
+            candidates = _window_candidates(insts, spot, float(p["gex_window_pct"]), target_exp, int(p["gex_max_instruments"]))
+            raw_chain = self._fetch_option_rows(candidates, spot, p["gex_scope"], cancelled)
+            if cancelled():
+                raise JobCancelled()
+            chain = _chain_result(raw_chain, n_walls=16)
+
+        return RefreshResult(mode="LIVE", ohlc=ohlc, spot=spot, ind=ind, chain=chain)
+
+    def _fetch_option_rows(self, candidates: List[Dict[str, Any]], spot: float, scope: str, cancelled) -> List[Dict[str, Any]]:
+        """Ticker fan-out for the candidate options (worker thread); rows in compute_gex_rows shape."""
+        raw_chain: List[Dict[str, Any]] = []
+
+        def fetch_one(it):
+            if cancelled():
+                return None  # superseded: skip the queued requests
+            name = it["instrument_name"]
+            tick, _ = self.client.get_ticker(name)
+            greeks = tick.get("greeks") or {}
+            parts = name.split("-")
+            expiry_code = parts[1] if len(parts) >= 3 else ""
+            return {
+                "instrument_name": name,
+                "strike": float(it.get("strike") or 0.0),
+                "option_type": "call" if str(it.get("option_type","")).lower().startswith("c") else "put",
+                "open_interest": float(tick.get("open_interest") or 0.0),
+                "gamma": float(greeks.get("gamma") or 0.0),
+                "bid_price": float(tick.get("best_bid_price") or 0.0),
+                "ask_price": float(tick.get("best_ask_price") or 0.0),
+                "mark_iv": float(tick.get("mark_iv") or 0.0),
+                "underlying_price": float(spot),
+                "expiry": expiry_code,
+            }
+
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        workers = 14 if scope != "ULTRA" else 18
+        timeout = 16 if scope != "ULTRA" else 24
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futs = [ex.submit(fetch_one, it) for it in candidates]
+            for f in as_completed(futs, timeout=timeout):
+                try:
+                    r = f.result()
+                    if r is not None:
+                        raw_chain.append(r)
+                except Exception:
+                    pass
+        return raw_chain
+
+    def _fetch_heatmap(self, p: Dict[str, Any], cancelled, progress) -> int:
+        """Worker thread: one expiry at a time, nearest first; each one goes out via progress()."""
+        if p["mode"] == "TEST":
+            for i in range(int(p["max_expiries"])):
+                raw = gen_options_chain(spot=p["spot"], center_strike=int(round(p["spot"]/1000)*1000))
+                for r in raw:
+                    r["expiry"] = f"T+{i}"
+                    r["gamma"] /= math.sqrt(i + 1.0)  # far expiries carry less gamma
+                progress((f"T+{i}", tuple(compute_gex_rows(raw, scale=1e-6))))
+            return int(p["max_expiries"])
+
+        insts, _ = self.client.get_instruments(currency=p["currency"], kind="option", expired=False)
+        expiries = sorted({i.get("expiration_timestamp") for i in insts if i.get("expiration_timestamp")})[:int(p["max_expiries"])]
+        for exp_ts in expiries:
+            if cancelled():
+                raise JobCancelled()
+            candidates = _window_candidates(insts, p["spot"], float(p["gex_window_pct"]), exp_ts, int(p["per_expiry"]))
+            rows = compute_gex_rows(self._fetch_option_rows(candidates, p["spot"], p["gex_scope"], cancelled), scale=1e-6)
+            code = rows[0].expiry if rows else str(exp_ts)
+            progress((code, tuple(rows)))
+        return len(expiries)
+
+    def _on_job_timing(self, key: str, ms: float):
+        t = self.jobs.timings
+        self.lbl_jobs.setText("Jobs: " + " ".join(f"{k}={t[k]:.0f}ms" for k in sorted(t)))
+
+    def closeEvent(self, ev):
+        self._save_snapshot(wait=True)
+        try:
+            self.jobs.shutdown()
+        except Exception:
+            pass
+        super().closeEvent(ev)
+
+    # ---------------- Session snapshot ----------------
+    def _restore_snapshot(self):
+        t0 = time.perf_counter()
+        snap = load_snapshot(self._snapshot_path)
+        if not snap or snap["meta"].get("mode") != "LIVE":
+            return
+        try:
+            meta = snap["meta"]
+            for cb, key in ((self.cb_inst, "instrument"), (self.cb_tf, "tf")):
+                v = meta.get(key)
+                if v and cb.findText(v) >= 0:
+                    cb.blockSignals(True)
+                    cb.setCurrentText(v)
+                    cb.blockSignals(False)
+            self._on_cfg_change()
+
+            self.rows = snap["rows"]
+            self.strike_net = aggregate_by_strike(self.rows)
+            self.walls = snap["walls"]
+            self.flip = meta.get("flip")
+            self.payload = {"mode": "LIVE", "ohlc": snap["ohlc"], "spot": float(meta.get("spot") or 0.0), "ind": meta.get("ind")}
+            self.news_items = [NewsItem(**d) for d in snap["news"]]
+            if snap["alt_symbols"]:
+                self._alt_all_symbols = list(snap["alt_symbols"])  # Altcoins combo is filled when the tab is built
+
+            self._update_cards()
+            self._paint_candles(snap["ohlc"])
+            self._paint_gex()
+            self._paint_options()
+            if self.news_items:
+                self._paint_news()
+
+            self._stale_since = float(meta.get("saved_ts") or 0.0)
+            saved = time.strftime("%d/%m %H:%M", time.localtime(self._stale_since))
+            self.lbl_status.setText(f"STALE (snapshot {saved})")
+            self.lbl_status.setStyleSheet("color: #ffb020;")
+            self.lbl_last.setText(f"Última: {saved}")
+            log(f"snapshot restored age={time.time() - self._stale_since:.0f}s bars={len(snap['ohlc']['t'])} rows={len(self.rows)} news={len(self.news_items)} in {(time.perf_counter()-t0)*1000:.0f}ms")
+        except Exception as e:
+            crash(e)
+
+    def _save_snapshot(self, wait: bool = False):
+        """Persist the live payload (only real data; nothing new while the snapshot is still on screen)."""
+        if not self.payload or self.payload.get("mode") != "LIVE" or self._stale_since is not None:
+            return
+        kw = dict(
+            meta={
+                "mode": "LIVE",
+                "instrument": self.instrument,
+                "tf": self.tf,
+                "spot": self.payload.get("spot"),
+                "flip": self.flip,
+                "ind": self.payload.get("ind"),
+            },
+            ohlc=self.payload.get("ohlc") or {},
+            rows=list(self.rows or []),
+            walls=list(self.walls or []),
+            news=list(self.news_items),
+            alt_symbols=list(self._alt_all_symbols or []),
+        )
+        path = self._snapshot_path
+        if wait:
+            save_snapshot(path, **kw)
+        else:
+            self.jobs.submit("snapshot", lambda cancelled: save_snapshot(path, **kw), lambda ok, ms: None)
 
     def _auto_loop(self):
-        if self.mode == "LIVE":
+        # a slow refresh (chain fan-out can take 16-24 s) must finish, not be superseded by the next tick
+        if self.mode == "LIVE" and not self.jobs.busy("refresh"):
             if time.time() - self._last_refresh >= float(self.auto_sec):
                 self.refresh_all()
 
@@ -1167,110 +1706,100 @@ class DeskWindow(QtWidgets.QMainWindow):
             name = self.tabs.tabText(idx)
         except Exception:
             return
+        if not self._ensure_tab(name):
+            return
         if name == "Altcoins":
             if self.alt_last is None:
                 self.refresh_altcoins()
         elif name == "News":
-            if not self.news_items:
+            if not self.news_items or not self._news_ts:
                 self.refresh_news()
+        elif name == "GEX Map":
+            if not self._heat_rows or time.time() - self._heat_ts > 10 * float(self.chain_refresh_sec):
+                self.refresh_heatmap()
 
     # ---------------- Paint ----------------
     def _paint_candles(self, ohlc: Dict[str, Any]):
-        t = ohlc.get("t") or []
-        o = ohlc.get("o") or []
-        h = ohlc.get("h") or []
-        l = ohlc.get("l") or []
-        c = ohlc.get("c") or []
-        data = []
-        for i in range(min(len(t), len(o), len(c), len(l), len(h))):
-            # Deribit chart timestamps usually come in milliseconds.
-            x = float(t[i])
-            if x > 1e11:
-                x = x / 1000.0
-            data.append((x, float(o[i]), float(c[i]), float(l[i]), float(h[i])))
+        cols = [ohlc.get(k) or [] for k in ("t", "o", "c", "l", "h")]
+        n = min(len(x) for x in cols)
+        data = np.column_stack([np.asarray(x[:n], dtype=float) for x in cols]) if n else np.zeros((0, 5))
+        # Deribit chart timestamps usually come in milliseconds.
+        ms = data[:, 0] > 1e11
+        data[ms, 0] /= 1000.0
         self.candle_item.setData(data)
+        self._hover = HoverIndex(self.candle_item.rows(), self.flip, self.walls)
 
         # keep some padding on x
-        if data:
-            xs = [d[0] for d in data]
-            self.candle_plot.setXRange(min(xs), max(xs), padding=0.02)
+        if n:
+            self.candle_plot.setXRange(float(data[:, 0].min()), float(data[:, 0].max()), padding=0.02)
 
         # rebuild level lines
         self._paint_levels()
 
     def _paint_levels(self):
-        # remove old lines
-        for ln in self._level_lines:
-            try:
-                self.candle_plot.removeItem(ln)
-            except Exception:
-                pass
-        self._level_lines = []
-
-        if not self.payload:
-            return
-
-        # walls
-        for strike, net in (self.walls or []):
-            w = 2 if abs(net) >= 80 else 1
-            col = "#2c7dff"
-            ln = pg.InfiniteLine(pos=float(strike), angle=0, movable=False, pen=pg.mkPen(col, width=w))
-            self.candle_plot.addItem(ln, ignoreBounds=True)
-            self._level_lines.append(ln)
-
-        # flip
-        if self.flip is not None:
-            ln = pg.InfiniteLine(pos=float(self.flip), angle=0, movable=False, pen=pg.mkPen("#b16cff", width=2))
+        specs: List[Tuple[float, str, int]] = []
+        if self.payload:
+            # walls
+            for strike, net in (self.walls or []):
+                specs.append((float(strike), "#2c7dff", 2 if abs(net) >= 80 else 1))
+            # flip
+            if self.flip is not None:
+                specs.append((float(self.flip), "#b16cff", 2))
+
+        while len(self._level_pool) < len(specs):
+            ln = pg.InfiniteLine(pos=0.0, angle=0, movable=False)
             self.candle_plot.addItem(ln, ignoreBounds=True)
-            self._level_lines.append(ln)
+            self._level_pool.append(ln)
+            self._level_keys.append(None)
+        for i, (pos, col, w) in enumerate(specs):
+            ln = self._level_pool[i]
+            if self._level_keys[i] != (col, w):
+                pen = self._level_pens.get((col, w))
+                if pen is None:
+                    pen = self._level_pens[(col, w)] = pg.mkPen(col, width=w)
+                ln.setPen(pen)
+                self._level_keys[i] = (col, w)
+            if ln.value() != pos:
+                ln.setPos(pos)
+            ln.show()
+        for ln in self._level_pool[len(specs):]:
+            ln.hide()
 
     def _paint_gex(self):
-        self.gex_plot.clear()
-        self.gex_bars = None
         if not self.strike_net:
+            self.gex_bars.setOpts(x=np.zeros(0), height=np.zeros(0))
+            self._gex_x = np.zeros(0)
             return
 
-        strikes = np.array(list(self.strike_net.keys()), dtype=float)
-        vals = np.array([self.strike_net[s] for s in strikes], dtype=float)
+        strikes = np.fromiter(self.strike_net.keys(), dtype=float, count=len(self.strike_net))
+        strikes.sort()
+        vals = np.fromiter((self.strike_net[s] for s in strikes), dtype=float, count=strikes.size)
 
-        # bar graph
-        bg = pg.BarGraphItem(x=strikes, height=vals, width=0.8*(np.min(np.diff(np.sort(strikes))) if len(strikes)>1 else 100.0), brush=pg.mkBrush("#2c7dff"))
-        self.gex_plot.addItem(bg)
-        self.gex_bars = bg
-        self.gex_plot.addLine(y=0, pen=pg.mkPen("#4b5563", width=1))
+        # bar graph (same item, new heights)
+        width = 0.8*(np.min(np.diff(strikes)) if len(strikes)>1 else 100.0)
+        self.gex_bars.setOpts(x=strikes, height=vals, width=width)
+        self._gex_x = strikes
 
-        # show wider x-range with padding
-        x0, x1 = float(np.min(strikes)), float(np.max(strikes))
-        pad = (x1 - x0) * 0.10 if x1 > x0 else max(500.0, x0*0.05)
-        self.gex_plot.setXRange(x0 - pad, x1 + pad, padding=0)
+        # show wider x-range with padding, only when the strike span changed (keeps the user's pan/zoom)
+        x0, x1 = float(strikes[0]), float(strikes[-1])
+        if self._gex_span != (x0, x1):
+            self._gex_span = (x0, x1)
+            pad = (x1 - x0) * 0.10 if x1 > x0 else max(500.0, x0*0.05)
+            self.gex_plot.setXRange(x0 - pad, x1 + pad, padding=0)
 
     def _paint_options(self):
+        if "Options" not in self._tabs_built:
+            return  # painted when the tab is built
+        # the model diffs by instrument: an unchanged chain repaints nothing, a live one only its changed rows
+        self.opt_model.set_chain(self.rows or [])
         filt = self.cb_filter.currentText()
-        rows = self.rows or []
-        if filt == "CALL":
-            rows = [r for r in rows if r.option_type == "call"]
-        elif filt == "PUT":
-            rows = [r for r in rows if r.option_type == "put"]
-
-        # sort
-        rows = sorted(rows, key=lambda r: (r.strike, r.option_type))
-        self.tbl_opt.setRowCount(len(rows))
-        exp_any = None
-        for i, r in enumerate(rows):
-            exp = getattr(r, "expiry", "") or ""
-            if exp and exp_any is None:
-                exp_any = exp
-            dte = days_to_expiry(exp) if exp else None
-            cells = [
-                r.instrument_name, r.option_type, f"{r.strike:,.0f}",
-                exp or "—", str(dte) if dte is not None else "—",
-                fmt_num(r.open_interest,0), fmt_num(r.gamma,6), fmt_num(r.gex,2),
-                fmt_num(r.bid_price,4), fmt_num(r.ask_price,4), fmt_num(r.mark_iv,2)
-            ]
-            for j, v in enumerate(cells):
-                it = QtWidgets.QTableWidgetItem(str(v))
-                self.tbl_opt.setItem(i, j, it)
+        if filt in ("CALL", "PUT"):
+            want = filt.lower()
+            self.opt_proxy.set_predicate(lambda m, r: m.value(r, "type") == want)
+        else:
+            self.opt_proxy.set_predicate(None)
 
+        exp_any = self.opt_model.expiries[0] if self.opt_model.expiries else None
         if exp_any:
             dte = days_to_expiry(exp_any)
             self.lbl_exp.setText(f"Expiry: {exp_any} | DTE: {dte if dte is not None else '—'}")
@@ -1278,30 +1807,28 @@ class DeskWindow(QtWidgets.QMainWindow):
             self.lbl_exp.setText("Expiry: —")
 
     def _paint_news(self):
+        if "News" not in self._tabs_built:
+            return
         cat = self.cb_news.currentText()
         q = (self.ed_news.text() or "").strip().lower()
 
-        items = self.news_items[:]
-        if cat != "ALL":
-            # feed category is embedded in source label prefix
-            if cat == "Crypto":
-                items = [it for it in items if "crypto" in it.source.lower() or "google: crypto" in it.source.lower() or "bitcoin" in it.source.lower()]
-            else:
-                items = [it for it in items if "fed" in it.source.lower() or "cpi" in it.source.lower() or "risk" in it.source.lower()]
-
-        if q:
-            items = [it for it in items if q in it.title.lower() or q in it.assets.lower()]
-
-        items = sorted(items, key=lambda it: it.score, reverse=True)[:80]
-        self.tbl_news.setRowCount(len(items))
-        for i, it in enumerate(items):
-            cells = [str(it.score), it.assets, it.source, it.title, it.link]
-            for j, v in enumerate(cells):
-                cell = QtWidgets.QTableWidgetItem(str(v))
-                if j == 0:
-                    cell.setTextAlignment(QtCore.Qt.AlignCenter)
-                self.tbl_news.setItem(i, j, cell)
-        self.lbl_news.setText(f"{len(items)} itens")
+        self.news_model.set_items(self.news_items)
+
+        def keep(m, r) -> bool:
+            if cat != "ALL":
+                # feed category is embedded in source label prefix
+                src = m.value(r, "source").lower()
+                if cat == "Crypto":
+                    if not ("crypto" in src or "bitcoin" in src):
+                        return False
+                elif not ("fed" in src or "cpi" in src or "risk" in src):
+                    return False
+            if q:
+                return q in m.value(r, "title").lower() or q in m.value(r, "assets").lower()
+            return True
+
+        self.news_proxy.set_predicate(keep if (cat != "ALL" or q) else None)
+        self.lbl_news.setText(f"{self.news_proxy.rowCount()} itens")
 
     # ---------------- Cards update ----------------
     def _update_cards(self):
@@ -1324,7 +1851,13 @@ class DeskWindow(QtWidgets.QMainWindow):
         ctx = build_action_context(spot=spot, regime=reg, flip=self.flip, walls=self.walls)
         self.k_action.setText(ctx.get("action_text","—"))
 
-        self.k_health.setText(f"Mode: {self.mode}\nLatency: {self._last_latency_ms:.0f} ms\nScope: {self.gex_scope} (±{int(self.gex_window_pct*100)}%)")
+        health = f"Mode: {self.mode}\nLatency: {self._last_latency_ms:.0f} ms\nScope: {self.gex_scope} (±{int(self.gex_window_pct*100)}%)"
+        ind = self.payload.get("ind") or {}
+        if ind.get("atr_pct") is not None:
+            rsi = ind.get("rsi")
+            rv = ind.get("rv_ann_pct")
+            health += f"\nATR{ind.get('atr_n')}: {ind['atr_pct']:.2f}% | RSI: {fmt_num(rsi,0) if rsi is not None else '—'} | RV: {fmt_num(rv,0) + '%' if rv is not None else '—'}"
+        self.k_health.setText(health)
 
         # context text
         top_lines = []
@@ -1346,7 +1879,7 @@ class DeskWindow(QtWidgets.QMainWindow):
         above = min([s for s in strikes if s >= spot], default=None)
         return (f"{below:,.0f}" if below is not None else None, f"{above:,.0f}" if above is not None else None)
 
-    def _update_selection_cards(self, source: str = "GEX"):
+    def _update_selection_cards(self, source: str = "GEX", rows: Optional[List[GexRow]] = None):
         if not self.payload:
             return
         spot = float(self.payload.get("spot") or 0.0)
@@ -1371,23 +1904,14 @@ class DeskWindow(QtWidgets.QMainWindow):
         lines.append("")
         lines.append("Top options (by |gex|) at this strike:")
 
-        opts = [r for r in (self.rows or []) if abs(r.strike - lv) < 1e-6]
+        opts = [r for r in ((self.rows or []) if rows is None else rows) if abs(r.strike - lv) < 1e-6]
         opts = sorted(opts, key=lambda r: abs(r.gex), reverse=True)[:6]
-        self.tbl_sug.setRowCount(len(opts))
+        self.sug_model.set_chain(opts, sort=False)
         for i, r in enumerate(opts):
-            dte = days_to_expiry(getattr(r,"expiry","") or "")
-            lines.append(f"  - {r.instrument_name} ({r.option_type}) gex={r.gex:.2f} bid/ask={r.bid_price:.4f}/{r.ask_price:.4f} oi={r.open_interest:.0f} expiry={getattr(r,'expiry','')} dte={dte}")
-            cells = [
-                r.instrument_name, r.option_type, f"{r.strike:,.0f}",
-                getattr(r,"expiry","") or "—",
-                str(dte) if dte is not None else "—",
-                fmt_num(r.gex,2), fmt_num(r.bid_price,4), fmt_num(r.ask_price,4), fmt_num(r.open_interest,0)
-            ]
-            for j, v in enumerate(cells):
-                self.tbl_sug.setItem(i, j, QtWidgets.QTableWidgetItem(str(v)))
+            dte = self.sug_model.value(i, "dte")
+            lines.append(f"  - {r.instrument_name} ({r.option_type}) gex={r.gex:.2f} bid/ask={r.bid_price:.4f}/{r.ask_price:.4f} oi={r.open_interest:.0f} expiry={getattr(r,'expiry','')} dte={dte if dte >= 0 else None}")
 
         if not opts:
-            self.tbl_sug.setRowCount(0)
             lines.append("  (no options loaded for this strike yet)")
 
         self.level_text.setPlainText("\n".join(lines))
@@ -1442,45 +1966,38 @@ class DeskWindow(QtWidgets.QMainWindow):
         self.alt_symbol = self.cb_alt_sym.currentText()
         self.alt_tf = self.cb_alt_tf.currentText()
         self.lbl_alt.setText("Atualizando...")
-        QtCore.QTimer.singleShot(10, self._alt_worker)
+        lim = int(self.sp_alt_candles.value()) if hasattr(self, "sp_alt_candles") else 900
+        lim = max(120, min(3000, int(lim)))
+        ex, sym, tf = self.alt_exchange, self.alt_symbol, self.alt_tf
+        self.jobs.submit("alt", lambda cancelled: _fetch_alt(ex, sym, tf, lim), self._apply_alt, self._alt_failed)
 
-    def _alt_worker(self):
-        try:
-            sym = self.alt_symbol
-            tf = self.alt_tf
-            lim = int(getattr(self, 'sp_alt_candles', None).value()) if hasattr(self, 'sp_alt_candles') else 900
-            lim = max(120, min(3000, int(lim)))
-            if self.alt_exchange == "Binance":
-                ohlc = binance_klines(sym, tf, limit=lim)
-                tick = binance_ticker(sym)
-                last = float(tick.get("lastPrice") or 0.0)
-                chg = float(tick.get("priceChangePercent") or 0.0)
-                vol = float(tick.get("quoteVolume") or 0.0)
-            else:
-                ohlc = bybit_klines(sym, tf, limit=lim)
-                last = float(ohlc[-1][2]) if ohlc else 0.0
-                chg = 0.0
-                vol = 0.0
+    def _alt_failed(self, e: BaseException, ms: float):
+        crash(e)
+        self.lbl_alt.setText(f"ERRO: {e}")
 
-            if not ohlc:
+    def _apply_alt(self, res: AltResult, ms: float):
+        try:
+            sym = res.symbol
+            tf = res.tf
+            if not res.bars:
                 self.alt_item.setData([])
-                self.lbl_alt.setText(f"SEM DADOS ({self.alt_exchange}) | {now_str()}")
-                self.alt_ctx.setPlainText(f"Sem OHLC para {sym} ({self.alt_exchange}) em {tf}.\n\n- Tente trocar o exchange (Binance/Bybit)\n- Tente TF menor\n- Verifique conexão/limites de API")
+                self.lbl_alt.setText(f"SEM DADOS ({res.exchange}) | {now_str()}")
+                self.alt_ctx.setPlainText(f"Sem OHLC para {sym} ({res.exchange}) em {tf}.\n\n- Tente trocar o exchange (Binance/Bybit)\n- Tente TF menor\n- Verifique conexão/limites de API")
                 return
 
             # paint
-            data = [(float(ts), float(o), float(c), float(l), float(h)) for (ts,o,c,l,h,v) in ohlc]
+            data = list(res.bars)
             self.alt_item.setData(data)
-            if data:
-                xs = [d[0] for d in data]
-                self.alt_plot.setXRange(min(xs), max(xs), padding=0.02)
+            xs = [d[0] for d in data]
+            self.alt_plot.setXRange(min(xs), max(xs), padding=0.02)
+            self.alt_last = {"exchange": res.exchange, "symbol": sym, "tf": tf, "last": res.last}
 
             meta = ALT_META.get(sym, {"name":sym, "sector":"—", "launch":"—"})
             self.alt_ctx.setPlainText(
-                f"Symbol: {sym} ({self.alt_exchange})\n"
-                f"Last: {last:,.6f}\n"
-                f"24h%: {chg:.2f}%\n"
-                f"QuoteVol: {vol:,.0f}\n"
+                f"Symbol: {sym} ({res.exchange})\n"
+                f"Last: {res.last:,.6f}\n"
+                f"24h%: {res.chg:.2f}%\n"
+                f"QuoteVol: {res.vol:,.0f}\n"
                 f"TF: {tf}\n"
             )
             self.alt_life.setPlainText(
@@ -1499,7 +2016,7 @@ class DeskWindow(QtWidgets.QMainWindow):
                 "3) Direção do BTC/ETH ajudando ou atrapalhando?\n"
                 "4) Níveis (suportes/resistências) no TF maior.\n"
             )
-            self.lbl_alt.setText(f"OK | {now_str()}")
+            self.lbl_alt.setText(f"OK | {now_str()} | {ms:.0f} ms")
         except Exception as e:
             crash(e)
             self.lbl_alt.setText(f"ERRO: {e}")
@@ -1507,16 +2024,16 @@ class DeskWindow(QtWidgets.QMainWindow):
     # ---------------- News ----------------
     def _load_altcoins_list(self):
         """Load a full symbol list (best-effort)."""
-        try:
-            ex = self.cb_alt_ex.currentText()
-            self.lbl_alt.setText("Carregando lista...")
-            syms: List[str] = []
-            if ex == "Binance":
-                syms = binance_usdt_symbols(force=True)
-            else:
-                # TODO: implementar lista completa da Bybit (endpoint instruments). Por enquanto, usa a lista padrão.
-                syms = list(ALTCOINS_DEFAULT)
+        ex = self.cb_alt_ex.currentText()
+        self.lbl_alt.setText("Carregando lista...")
+        self.jobs.submit("alt_list", lambda cancelled: _fetch_alt_symbols(ex), self._apply_alt_list, self._alt_list_failed)
 
+    def _alt_list_failed(self, e: BaseException, ms: float):
+        crash(e)
+        self.lbl_alt.setText(f"ERRO lista: {e}")
+
+    def _apply_alt_list(self, syms: Tuple[str, ...], ms: float):
+        try:
             if not syms:
                 self.lbl_alt.setText("Lista vazia")
                 return
@@ -1555,60 +2072,166 @@ class DeskWindow(QtWidgets.QMainWindow):
 
     def refresh_news(self):
         self.lbl_news.setText("Atualizando...")
-        QtCore.QTimer.singleShot(10, self._news_worker)
+        self.jobs.submit("news", _fetch_news, self._apply_news, self._news_failed)
+
+    def _news_failed(self, e: BaseException, ms: float):
+        crash(e)
+        self.lbl_news.setText(f"ERRO: {e}")
 
-    def _news_worker(self):
+    def _apply_news(self, items: Tuple[NewsItem, ...], ms: float):
         try:
-            items: List[NewsItem] = []
-            for cat, name, url in NEWS_FEEDS:
-                got = fetch_rss_items(url)
-                for it in got:
-                    it.source = f"{cat} | {name}"
-                items.extend(got)
-            # de-dup by title
-            seen = set()
-            uniq = []
-            for it in items:
-                key = it.title.lower().strip()
-                if key and key not in seen:
-                    seen.add(key)
-                    uniq.append(it)
-            self.news_items = uniq
+            self.news_items = list(items)
+            self._news_ts = time.time()
             if not self.news_items:
-                self.tbl_news.setRowCount(0)
+                self.news_model.set_items([])
                 self.lbl_news.setText(f"SEM NOTÍCIAS | {now_str()}")
                 return
             self._paint_news()
-            self.lbl_news.setText(f"OK ({len(self.news_items)}) | {now_str()}")
+            self.lbl_news.setText(f"OK ({len(self.news_items)}) | {now_str()} | {ms:.0f} ms")
         except Exception as e:
             crash(e)
             self.lbl_news.setText(f"ERRO: {e}")
 
-    def _open_news_link(self, row: int, col: int):
+    def _open_news_link(self, index: QtCore.QModelIndex):
         try:
-            link_item = self.tbl_news.item(row, 4)
-            if not link_item:
+            if not index.isValid():
                 return
-            url = link_item.text().strip()
+            url = str(self.news_model.value(self.news_proxy.source_row(index), "link") or "").strip()
             if not url:
                 return
             QtGui.QDesktopServices.openUrl(QtCore.QUrl(url))
         except Exception:
             pass
 
+    # ---------------- GEX heatmap ----------------
+    def refresh_heatmap(self):
+        if not self.payload:
+            self.lbl_heat.setText("sem spot ainda")
+            return
+        p = {
+            "mode": self.mode,
+            "currency": "BTC" if "BTC" in self.instrument else "ETH",
+            "spot": float(self.payload.get("spot") or 0.0),
+            "max_expiries": int(self.sp_heat_exp.value()),
+            "per_expiry": max(40, int(self.gex_max_instruments) // 2),
+            "gex_window_pct": float(self.gex_window_pct),
+            "gex_scope": self.gex_scope,
+        }
+        self._heat_rows = {}
+        self._heat_ts = time.time()
+        self.lbl_heat.setText("Carregando...")
+        self.jobs.submit(
+            "heatmap",
+            lambda cancelled, progress: self._fetch_heatmap(p, cancelled, progress),
+            self._heat_done,
+            self._heat_failed,
+            on_progress=self._heat_add,
+        )
+
+    def _heat_add(self, part: Tuple[str, Tuple[GexRow, ...]]):
+        code, rows = part
+        self._heat_rows[code] = rows
+        strikes, expiries, m = strike_expiry_grid(self._heat_rows)
+        self._heat_grid = (strikes, expiries, m)
+        if not strikes:
+            return
+        lim = float(np.max(np.abs(m))) or 1.0
+        self.heat_img.setImage(m, levels=(-lim, lim), autoLevels=False)
+        self.heat_img.setRect(QtCore.QRectF(-0.5, -0.5, len(expiries), len(strikes)))
+        self.heat_plot.getAxis("bottom").setTicks([[(i, e) for i, e in enumerate(expiries)]])
+        step = max(1, len(strikes) // 16)
+        self.heat_plot.getAxis("left").setTicks([[(j, f"{k:,.0f}") for j, k in enumerate(strikes) if j % step == 0], []])
+        self.lbl_heat.setText(f"{len(expiries)} expiries x {len(strikes)} strikes ...")
+
+    def _heat_done(self, n: int, ms: float):
+        strikes, expiries, _ = self._heat_grid
+        self.lbl_heat.setText(f"OK {len(expiries)} expiries x {len(strikes)} strikes | {now_str()} | {ms:.0f} ms")
+
+    def _heat_failed(self, e: BaseException, ms: float):
+        crash(e)
+        self.lbl_heat.setText(f"ERRO: {e}")
+
+    def _heat_cell(self, pos) -> Optional[Tuple[int, int]]:
+        strikes, expiries, _ = self._heat_grid
+        if not strikes or not self.heat_plot.sceneBoundingRect().contains(pos):
+            return None
+        mp = self.heat_plot.plotItem.vb.mapSceneToView(pos)
+        i, j = int(round(mp.x())), int(round(mp.y()))
+        if 0 <= i < len(expiries) and 0 <= j < len(strikes):
+            return i, j
+        return None
+
+    def _on_heat_move(self, pos):
+        cell = self._heat_cell(pos)
+        if cell is None:
+            return
+        strikes, expiries, m = self._heat_grid
+        i, j = cell
+        self.lbl_heat_hover.setText(f"{expiries[i]} | strike {strikes[j]:,.0f} | net gex {m[i, j]:+.2f}")
+
+    def _on_heat_click(self, event):
+        cell = self._heat_cell(event.scenePos())
+        if cell is None:
+            return
+        strikes, expiries, _ = self._heat_grid
+        i, j = cell
+        lv = float(strikes[j])
+        self.heat_sel.setData([i], [j])
+        self.selected_strike = lv
+        self.selected_level = lv
+        self._highlight_level(lv)
+        self._update_selection_cards(source=f"HEAT {expiries[i]}", rows=list(self._heat_rows.get(expiries[i]) or ()))
+
     # ---------------- Logs ----------------
-    def _reload_logs(self):
+    def _poll_logs(self):
+        # only while the tab is on screen; offsets persist, so nothing is lost meanwhile
+        if self.tabs.currentWidget() is not self.tab_logs:
+            return
         try:
-            from pathlib import Path
-            p = Path("logs/app.log")
-            txt = p.read_text(encoding="utf-8") if p.exists() else "(sem logs ainda)"
-            self.log_box.setPlainText(txt[-12000:])
+            new = self.log_tail.poll()
         except Exception as e:
-            self.log_box.setPlainText(str(e))
+            self.lbl_log.setText(f"ERRO: {e}")
+            return
+        if not new:
+            return
+        mods = sorted(self.log_tail.modules)
+        if self.cb_log_module.count() - 1 != len(mods):
+            cur = self.cb_log_module.currentText()
+            self.cb_log_module.blockSignals(True)
+            self.cb_log_module.clear()
+            self.cb_log_module.addItems(["ALL"] + mods)
+            self.cb_log_module.setCurrentText(cur)
+            self.cb_log_module.blockSignals(False)
+        shown = [ln.text for ln in new if self._log_keep(ln)][-self.LOG_VIEW_LINES:]
+        if shown:
+            sb = self.log_box.verticalScrollBar()
+            at_end = sb.value() >= sb.maximum() - 2
+            self.log_box.appendPlainText("\n".join(shown))
+            if self.chk_log_follow.isChecked() and at_end:
+                sb.setValue(sb.maximum())
+        self._log_status()
+
+    def _refilter_logs(self, *_):
+        mod = self.cb_log_module.currentText()
+        self._log_keep = line_filter(self.cb_log_level.currentText(), "" if mod == "ALL" else mod, self.ed_log.text())
+        shown = self.log_tail.select(self._log_keep, limit=self.LOG_VIEW_LINES)
+        self.log_box.setPlainText("\n".join(ln.text for ln in shown) if shown else "(nenhuma linha)")
+        self.log_box.verticalScrollBar().setValue(self.log_box.verticalScrollBar().maximum())
+        self._log_status()
+
+    def _log_status(self):
+        t = self.log_tail
+        self.lbl_log.setText(f"{len(t.lines)} linhas em memória | offset {t.offset / 1e6:,.1f} MB" + (f" | rotações {t.rotations}" if t.rotations else ""))
+
+    def _reload_logs(self):
+        self.log_tail.reset()
+        self.log_box.clear()
+        self._poll_logs()
 
 
 def main():
     try:
+        _startup_mark("import")
         app = QtWidgets.QApplication([])
         pg.setConfigOptions(antialias=True)
         w = DeskWindow()
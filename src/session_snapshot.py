@@ -0,0 +1,102 @@
+"""
+session_snapshot.py — last-session snapshot for the Qt desk (paint something real at startup).
+
+One compressed .npz: candles and the option chain as columns (no per-row
+objects, loads in milliseconds), walls as an (n, 2) array, and a small JSON
+blob for the rest (mode/instrument/tf, spot, flip, indicators, news, altcoin
+symbols, saved_ts). Writes go to a temp file + os.replace, so a crash mid-save
+keeps the previous snapshot.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .gex import GexRow
+
+VERSION = 1
+_OHLC = ("t", "o", "h", "l", "c", "v")
+_CHAIN_NUM = ("strike", "open_interest", "gamma", "bid_price", "ask_price", "mark_iv", "underlying_price", "gex")
+
+
+def default_path() -> str:
+    return os.environ.get("MESA_SNAPSHOT", os.path.join("cache", "session.npz"))
+
+
+def save_snapshot(
+    path: str,
+    *,
+    meta: Dict[str, Any],
+    ohlc: Dict[str, Sequence[float]],
+    rows: Sequence[GexRow],
+    walls: Sequence[Sequence[float]],
+    news: Sequence[Any] = (),
+    alt_symbols: Sequence[str] = (),
+) -> bool:
+    try:
+        n = min(len(ohlc.get(k) or []) for k in _OHLC[:5])
+        cols = [np.asarray((ohlc.get(k) or [0.0] * n)[:n], dtype=float) for k in _OHLC]
+        info = dict(meta)
+        info.update({
+            "version": VERSION,
+            "saved_ts": time.time(),
+            "news": [asdict(it) if hasattr(it, "__dataclass_fields__") else dict(it) for it in news],
+            "alt_symbols": list(alt_symbols),
+        })
+        arrays = {
+            "ohlc": np.column_stack(cols) if n else np.zeros((0, 6)),
+            "chain_num": np.array([[getattr(r, k) for k in _CHAIN_NUM] for r in rows], dtype=float).reshape(-1, len(_CHAIN_NUM)),
+            "chain_name": np.array([r.instrument_name for r in rows], dtype=str),
+            "chain_type": np.array([r.option_type for r in rows], dtype=str),
+            "chain_expiry": np.array([r.expiry for r in rows], dtype=str),
+            "walls": np.array([[float(s), float(v)] for s, v in walls], dtype=float).reshape(-1, 2),
+            "meta": np.array(json.dumps(info, ensure_ascii=False, default=str)),
+        }
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, path)
+        return True
+    except Exception:
+        return False
+
+
+def load_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    """Snapshot as plain data (ohlc dict of lists, GexRow list, walls, meta...), or None."""
+    try:
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(str(z["meta"]))
+            if int(meta.get("version") or 0) != VERSION:
+                return None
+            o = z["ohlc"]
+            num = z["chain_num"]
+            names, types, exps = z["chain_name"], z["chain_type"], z["chain_expiry"]
+            walls = [(float(s), float(v)) for s, v in z["walls"]]
+        rows: List[GexRow] = [
+            GexRow(
+                instrument_name=str(names[i]), option_type=str(types[i]), expiry=str(exps[i]),
+                **{k: float(num[i, j]) for j, k in enumerate(_CHAIN_NUM)},
+            )
+            for i in range(num.shape[0])
+        ]
+        return {
+            "meta": meta,
+            "ohlc": {k: o[:, j].tolist() for j, k in enumerate(_OHLC)},
+            "rows": rows,
+            "walls": walls,
+            "news": list(meta.pop("news", []) or []),
+            "alt_symbols": list(meta.pop("alt_symbols", []) or []),
+        }
+    except Exception:
+        return None
@@ -0,0 +1,224 @@
+"""
+table_models.py — model/view tables for the Qt desk (options chain, news, suggestions).
+
+  - ColumnTableModel keeps one array per column plus a row key. data()
+    formats only the cells the view asks for (the visible ones); SORT_ROLE
+    hands out the raw value, so sorting is numeric.
+  - set_rows() diffs against the loaded rows: when the row keys are the same,
+    only the rows whose values changed emit dataChanged (grouped in runs);
+    otherwise the model resets.
+  - FilterProxy sorts on SORT_ROLE and filters with a per-row predicate.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from PySide6 import QtCore
+
+from .util import days_to_expiry
+
+_LEFT = int(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
+_RIGHT = int(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+_CENTER = int(QtCore.Qt.AlignCenter)
+
+
+def _num(nd: int) -> Callable[[Any], str]:
+    def f(x: Any) -> str:
+        try:
+            return f"{float(x):,.{nd}f}"
+        except Exception:
+            return "—"
+    return f
+
+
+def _text(x: Any) -> str:
+    return str(x) if x is not None and x != "" else "—"
+
+
+def _dte(x: Any) -> str:
+    return str(int(x)) if x is not None and x >= 0 else "—"
+
+
+@dataclass(frozen=True)
+class Column:
+    key: str
+    header: str
+    fmt: Callable[[Any], str] = str
+    align: int = _LEFT
+
+
+class ColumnTableModel(QtCore.QAbstractTableModel):
+    SORT_ROLE = int(QtCore.Qt.UserRole) + 1
+
+    def __init__(self, columns: Sequence[Column], parent: Optional[QtCore.QObject] = None):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self._keys: List[str] = []
+        self._data: Dict[str, np.ndarray] = {c.key: np.zeros(0, dtype=object) for c in self.columns}
+
+    # ---------------- Qt API ----------------
+    def rowCount(self, parent=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._keys)
+
+    def columnCount(self, parent=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal and 0 <= section < len(self.columns):
+            return self.columns[section].header
+        return None
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        col = self.columns[index.column()]
+        if role == QtCore.Qt.DisplayRole:
+            return col.fmt(self.value(index.row(), col.key))
+        if role == self.SORT_ROLE:
+            return self.value(index.row(), col.key)
+        if role == QtCore.Qt.TextAlignmentRole:
+            return col.align
+        return None
+
+    # ---------------- data ----------------
+    def value(self, row: int, key: str) -> Any:
+        v = self._data[key][row]
+        return v.item() if isinstance(v, np.generic) else v
+
+    def key(self, row: int) -> str:
+        return self._keys[row]
+
+    def set_rows(self, keys: Sequence[str], data: Dict[str, Sequence[Any]]) -> int:
+        """Replace the rows; returns how many rows changed (-1: model reset)."""
+        keys = list(keys)
+        new = {c.key: np.asarray(data[c.key]) if len(keys) else np.zeros(0, dtype=object) for c in self.columns}
+        if keys != self._keys:
+            self.beginResetModel()
+            self._keys = keys
+            self._data = new
+            self.endResetModel()
+            return -1
+        changed = np.zeros(len(keys), dtype=bool)
+        for k, a in new.items():
+            changed |= _differs(self._data[k], a)
+        self._data = new
+        idx = np.flatnonzero(changed)
+        if idx.size:
+            # contiguous runs -> one dataChanged each
+            cuts = np.flatnonzero(np.diff(idx) > 1) + 1
+            last = len(self.columns) - 1
+            for run in np.split(idx, cuts):
+                self.dataChanged.emit(self.index(int(run[0]), 0), self.index(int(run[-1]), last))
+        return int(idx.size)
+
+
+def _differs(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if a.shape != b.shape:
+        return np.ones(b.shape, dtype=bool)
+    ne = a != b
+    if not isinstance(ne, np.ndarray):  # incomparable dtypes
+        return np.ones(b.shape, dtype=bool)
+    if a.dtype.kind == "f" and b.dtype.kind == "f":
+        ne &= ~(np.isnan(a) & np.isnan(b))
+    return ne
+
+
+class FilterProxy(QtCore.QSortFilterProxyModel):
+    """Sorts on the raw values; rows pass when predicate(model, source_row) is true."""
+
+    def __init__(self, parent: Optional[QtCore.QObject] = None):
+        super().__init__(parent)
+        self._pred: Optional[Callable[[ColumnTableModel, int], bool]] = None
+        self.setSortRole(ColumnTableModel.SORT_ROLE)
+        self.setDynamicSortFilter(True)
+
+    def set_predicate(self, pred: Optional[Callable[[ColumnTableModel, int], bool]]):
+        self._pred = pred
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, row: int, parent) -> bool:
+        if self._pred is None:
+            return True
+        try:
+            return bool(self._pred(self.sourceModel(), row))
+        except Exception:
+            return True
+
+    def source_row(self, index) -> int:
+        return self.mapToSource(index).row()
+
+
+# -------------------- options chain --------------------
+OPTION_COLUMNS: Dict[str, Column] = {c.key: c for c in (
+    Column("instrument", "instrument"),
+    Column("type", "type"),
+    Column("strike", "strike", _num(0), _RIGHT),
+    Column("expiry", "expiry", _text),
+    Column("dte", "dte", _dte, _RIGHT),
+    Column("oi", "oi", _num(0), _RIGHT),
+    Column("gamma", "gamma", _num(6), _RIGHT),
+    Column("gex", "gex", _num(2), _RIGHT),
+    Column("bid", "bid", _num(4), _RIGHT),
+    Column("ask", "ask", _num(4), _RIGHT),
+    Column("iv", "iv", _num(2), _RIGHT),
+)}
+
+OPTIONS_TABLE = ("instrument", "type", "strike", "expiry", "dte", "oi", "gamma", "gex", "bid", "ask", "iv")
+SUGGEST_TABLE = ("instrument", "type", "strike", "expiry", "dte", "gex", "bid", "ask", "oi")
+
+
+class OptionsModel(ColumnTableModel):
+    """GexRow chain as columns; DTE is computed once per expiry code, not per row."""
+
+    def __init__(self, keys: Sequence[str] = OPTIONS_TABLE, parent: Optional[QtCore.QObject] = None):
+        super().__init__([OPTION_COLUMNS[k] for k in keys], parent)
+        self.expiries: List[str] = []
+
+    def set_chain(self, rows: Sequence[Any], sort: bool = True) -> int:
+        if sort:
+            rows = sorted(rows, key=lambda r: (r.strike, r.option_type))
+        exp = [getattr(r, "expiry", "") or "" for r in rows]
+        dte_of = {e: days_to_expiry(e) if e else None for e in set(exp)}
+        self.expiries = sorted(e for e in dte_of if e)
+        cols = {
+            "instrument": [r.instrument_name for r in rows],
+            "type": [r.option_type for r in rows],
+            "strike": np.fromiter((r.strike for r in rows), float, len(rows)),
+            "expiry": exp,
+            "dte": np.fromiter((-1 if dte_of[e] is None else dte_of[e] for e in exp), np.int64, len(rows)),
+            "oi": np.fromiter((r.open_interest for r in rows), float, len(rows)),
+            "gamma": np.fromiter((r.gamma for r in rows), float, len(rows)),
+            "gex": np.fromiter((r.gex for r in rows), float, len(rows)),
+            "bid": np.fromiter((r.bid_price for r in rows), float, len(rows)),
+            "ask": np.fromiter((r.ask_price for r in rows), float, len(rows)),
+            "iv": np.fromiter((r.mark_iv for r in rows), float, len(rows)),
+        }
+        return self.set_rows([r.instrument_name for r in rows], cols)
+
+
+# -------------------- news --------------------
+NEWS_COLUMNS = (
+    Column("score", "score", str, _CENTER),
+    Column("assets", "assets"),
+    Column("source", "source"),
+    Column("title", "title"),
+    Column("link", "link"),
+)
+
+
+class NewsModel(ColumnTableModel):
+    def __init__(self, parent: Optional[QtCore.QObject] = None):
+        super().__init__(NEWS_COLUMNS, parent)
+
+    def set_items(self, items: Sequence[Any]) -> int:
+        cols = {
+            "score": np.fromiter((it.score for it in items), np.int64, len(items)),
+            "assets": [it.assets for it in items],
+            "source": [it.source for it in items],
+            "title": [it.title for it in items],
+            "link": [it.link for it in items],
+        }
+        return self.set_rows([it.link or it.title for it in items], cols)
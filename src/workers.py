@@ -0,0 +1,160 @@
+"""
+workers.py — background jobs for the Qt desk (network/compute off the GUI thread).
+
+  - JobRunner.submit(key, fn, on_done, on_error): fn(cancelled) runs on a
+    QThreadPool worker; its return value comes back to the GUI thread through
+    a queued signal and is handed to on_done(result, ms).
+  - one live job per key: submitting again bumps the key's generation and
+    sets the previous job's cancel flag. A superseded job that is still
+    queued never starts; one already running can poll cancelled() to stop
+    early, and whatever it returns is dropped.
+  - per-job timing (ms) is kept in runner.timings and announced via timing().
+  - progressive jobs (on_progress given) are called as fn(cancelled, progress);
+    every progress(value) reaches on_progress(value) on the GUI thread, in
+    order, unless the job has been superseded meanwhile.
+
+fn must not touch widgets: it gets plain parameters and returns a value that
+the GUI thread only reads (frozen dataclasses / tuples).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from PySide6 import QtCore
+
+from .util import log
+
+
+class JobCancelled(Exception):
+    """Raised by a job that noticed it was superseded (silently dropped)."""
+
+
+class _JobSignals(QtCore.QObject):
+    # key, generation, result / error text, elapsed ms
+    done = QtCore.Signal(str, int, object, float)
+    failed = QtCore.Signal(str, int, object, float)
+    progress = QtCore.Signal(str, int, object)
+
+
+class _Job(QtCore.QRunnable):
+    def __init__(self, key: str, gen: int, fn: Callable[..., Any], cancel: threading.Event, signals: _JobSignals, progressive: bool = False):
+        super().__init__()
+        self.setAutoDelete(True)
+        self.key = key
+        self.gen = gen
+        self.fn = fn
+        self.cancel = cancel
+        self.signals = signals
+        self.progressive = progressive
+
+    def _progress(self, value: Any):
+        if self.cancel.is_set():
+            raise JobCancelled()
+        self.signals.progress.emit(self.key, self.gen, value)
+
+    def run(self):
+        if self.cancel.is_set():
+            return
+        t0 = time.perf_counter()
+        try:
+            res = self.fn(self.cancel.is_set, self._progress) if self.progressive else self.fn(self.cancel.is_set)
+        except JobCancelled:
+            return
+        except BaseException as e:
+            self.signals.failed.emit(self.key, self.gen, e, (time.perf_counter() - t0) * 1000.0)
+            return
+        if not self.cancel.is_set():
+            self.signals.done.emit(self.key, self.gen, res, (time.perf_counter() - t0) * 1000.0)
+
+
+class JobRunner(QtCore.QObject):
+    timing = QtCore.Signal(str, float)  # key, ms (finished jobs only)
+
+    def __init__(self, parent: Optional[QtCore.QObject] = None, max_threads: int = 4):
+        super().__init__(parent)
+        self.pool = QtCore.QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, int(max_threads)))
+        self.timings: Dict[str, float] = {}
+        self._gen: Dict[str, int] = {}
+        self._cancel: Dict[str, threading.Event] = {}
+        self._cb: Dict[str, tuple] = {}
+        # signals are created here (GUI thread) -> emits from workers arrive queued
+        self._signals = _JobSignals()
+        self._signals.done.connect(self._on_done)
+        self._signals.failed.connect(self._on_failed)
+        self._signals.progress.connect(self._on_progress)
+
+    def submit(
+        self,
+        key: str,
+        fn: Callable[..., Any],
+        on_done: Callable[[Any, float], None],
+        on_error: Optional[Callable[[BaseException, float], None]] = None,
+        on_progress: Optional[Callable[[Any], None]] = None,
+    ) -> int:
+        """Start fn(cancelled[, progress]) in the pool; supersedes the previous job with the same key."""
+        self.cancel(key)
+        gen = self._gen.get(key, 0) + 1
+        ev = threading.Event()
+        self._gen[key] = gen
+        self._cancel[key] = ev
+        self._cb[key] = (on_done, on_error, on_progress)
+        self.pool.start(_Job(key, gen, fn, ev, self._signals, progressive=on_progress is not None))
+        return gen
+
+    def cancel(self, key: str):
+        ev = self._cancel.pop(key, None)
+        if ev is not None:
+            ev.set()
+
+    def cancel_all(self):
+        for key in list(self._cancel):
+            self.cancel(key)
+
+    def busy(self, key: str) -> bool:
+        return key in self._cancel
+
+    def shutdown(self, wait_ms: int = 2000):
+        self.cancel_all()
+        self.pool.clear()
+        self.pool.waitForDone(int(wait_ms))
+
+    # ---------------- GUI thread ----------------
+    def _current(self, key: str, gen: int) -> bool:
+        return self._gen.get(key) == gen and key in self._cancel
+
+    def _finish(self, key: str, ms: float):
+        self._cancel.pop(key, None)
+        self.timings[key] = ms
+        self.timing.emit(key, ms)
+
+    @QtCore.Slot(str, int, object, float)
+    def _on_done(self, key: str, gen: int, res: Any, ms: float):
+        if not self._current(key, gen):
+            return  # superseded while in flight
+        on_done = self._cb.get(key, (None, None, None))[0]
+        self._finish(key, ms)
+        if on_done is not None:
+            on_done(res, ms)
+
+    @QtCore.Slot(str, int, object, float)
+    def _on_failed(self, key: str, gen: int, err: Any, ms: float):
+        if not self._current(key, gen):
+            return
+        on_error = self._cb.get(key, (None, None, None))[1]
+        self._finish(key, ms)
+        if on_error is not None:
+            on_error(err, ms)
+        else:
+            log(f"job {key} failed after {ms:.0f}ms: {err}")
+
+    @QtCore.Slot(str, int, object)
+    def _on_progress(self, key: str, gen: int, value: Any):
+        if not self._current(key, gen):
+            return
+        on_progress = self._cb.get(key, (None, None, None))[2]
+        if on_progress is not None:
+            on_progress(value)
@@ -0,0 +1,191 @@
+"""
+audit_log.py — bot audit events: O(1) ring buffer for the live view + gzip JSONL spill.
+
+  - append() is a deque append (maxlen drops the oldest) plus a pending list;
+    pending records are flushed as one gzip member per batch (every
+    flush_every records or flush_sec seconds), so the file is append-only
+    and a crash loses at most one batch.
+  - one file per UTC day (audit-YYYY-MM-DD.jsonl.gz): a time-range query
+    only opens the days it covers.
+  - query()/stats() stream the day files + the unflushed tail; filters on
+    time range, event type and block reason.
+  - BLOCK records whose reason is in ring_only (the 2 s heartbeat states such
+    as DISABLED / AUTO_ENTRY_OFF) stay in the ring and never reach disk.
+  - day files older than retention_days are deleted (checked once per UTC
+    day, on flush); 0 keeps everything. The directory is created on the
+    first write.
+"""
+
+from __future__ import annotations
+
+import datetime
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Iterable, Iterator
+
+
+def _day(ts_ms: int) -> str:
+    return datetime.datetime.fromtimestamp(int(ts_ms) / 1000.0, datetime.timezone.utc).strftime("%Y-%m-%d")
+
+
+class AuditLog:
+    def __init__(
+        self,
+        directory: str = "",
+        maxlen: int = 200,
+        flush_every: int = 200,
+        flush_sec: float = 5.0,
+        retention_days: int = 0,
+        ring_only: Iterable[str] = (),
+    ):
+        self.dir = directory
+        self.ring: deque[dict] = deque(maxlen=max(1, int(maxlen)))
+        self.flush_every = max(1, int(flush_every))
+        self.flush_sec = float(flush_sec)
+        self.retention_days = max(0, int(retention_days))
+        self.ring_only = frozenset(str(r).upper() for r in ring_only)
+        self._pending: list[dict] = []
+        self._last_flush = time.monotonic()
+        self._pruned_day = ""
+        self._lock = threading.Lock()
+
+    # ---------------- write ----------------
+    def append(self, rec: dict):
+        with self._lock:
+            self.ring.append(rec)
+            if not self.dir:
+                return
+            if rec.get("event") == "BLOCK" and str(rec.get("reason") or "").upper() in self.ring_only:
+                return
+            self._pending.append(rec)
+            if len(self._pending) >= self.flush_every or (time.monotonic() - self._last_flush) >= self.flush_sec:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending or not self.dir:
+            return
+        by_day: dict[str, list[str]] = {}
+        for r in self._pending:
+            by_day.setdefault(_day(int(r.get("ts") or 0)), []).append(json.dumps(r, separators=(",", ":"), default=str))
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            for day, lines in by_day.items():
+                # "ab": every batch is its own gzip member; gzip.open reads them back as one stream
+                with gzip.open(self._path(day), "ab", compresslevel=6) as f:
+                    f.write(("\n".join(lines) + "\n").encode("utf-8"))
+            self._pending = []
+        except Exception:
+            pass  # keep pending; retried on the next flush
+        self._prune()
+
+    def _prune(self):
+        today = _day(int(time.time() * 1000))
+        if not self.retention_days or self._pruned_day == today:
+            return
+        self._pruned_day = today
+        cutoff = _day(int((time.time() - self.retention_days * 86400) * 1000))
+        try:
+            for name in os.listdir(self.dir):
+                if name.startswith("audit-") and name.endswith(".jsonl.gz") and name[6:16] < cutoff:
+                    os.remove(os.path.join(self.dir, name))
+        except OSError:
+            pass
+
+    def _path(self, day: str) -> str:
+        return os.path.join(self.dir, f"audit-{day}.jsonl.gz")
+
+    # ---------------- read ----------------
+    def recent(self, limit: int = 50) -> list[dict]:
+        """Newest first, from memory only."""
+        with self._lock:
+            n = min(int(limit), len(self.ring))
+            return [self.ring[-1 - i] for i in range(n)]
+
+    def _days(self, since_ms: int, until_ms: int) -> list[str]:
+        if not self.dir or not os.path.isdir(self.dir):
+            return []
+        lo = _day(since_ms) if since_ms else ""
+        hi = _day(until_ms) if until_ms else "9999-99-99"
+        days = []
+        for name in os.listdir(self.dir):
+            if name.startswith("audit-") and name.endswith(".jsonl.gz"):
+                d = name[6:16]
+                if lo <= d <= hi:
+                    days.append(d)
+        return sorted(days)
+
+    def _iter(self, since_ms: int = 0, until_ms: int = 0) -> Iterator[dict]:
+        """Oldest -> newest across day files, then the unflushed tail (or the ring when not spilling)."""
+        with self._lock:
+            tail = list(self._pending) if self.dir else list(self.ring)
+        for d in self._days(since_ms, until_ms):
+            try:
+                with gzip.open(self._path(d), "rt", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            yield json.loads(line)
+                        except Exception:
+                            continue
+            except (OSError, EOFError):
+                continue  # truncated last member after a crash: keep what was readable
+        yield from tail
+
+    def query(
+        self,
+        since_ms: int = 0,
+        until_ms: int = 0,
+        event: str = "",
+        reason: str = "",
+        limit: int = 500,
+    ) -> list[dict]:
+        """Matching events, newest first (at most `limit`)."""
+        events = {e.strip().upper() for e in (event or "").split(",") if e.strip()}
+        reasons = {r.strip().upper() for r in (reason or "").split(",") if r.strip()}
+        out: deque[dict] = deque(maxlen=max(1, int(limit)))
+        for r in self._iter(since_ms, until_ms):
+            if _match(r, since_ms, until_ms, events, reasons):
+                out.append(r)
+        return list(reversed(out))
+
+    def stats(self, since_ms: int = 0, until_ms: int = 0, event: str = "BLOCK", bucket: str = "day") -> dict[str, Any]:
+        """Counts per reason (BLOCK) or per event, overall and per day/hour bucket."""
+        events = {e.strip().upper() for e in (event or "").split(",") if e.strip()}
+        fmt = "%Y-%m-%d %H:00" if bucket == "hour" else "%Y-%m-%d"
+        total: Counter = Counter()
+        per: dict[str, Counter] = {}
+        n = 0
+        for r in self._iter(since_ms, until_ms):
+            if not _match(r, since_ms, until_ms, events, set()):
+                continue
+            key = str(r.get("reason") or r.get("event") or "?")
+            b = datetime.datetime.fromtimestamp(int(r.get("ts") or 0) / 1000.0, datetime.timezone.utc).strftime(fmt)
+            total[key] += 1
+            per.setdefault(b, Counter())[key] += 1
+            n += 1
+        return {
+            "n": n,
+            "total": dict(total.most_common()),
+            "buckets": [{"bucket": b, "counts": dict(c.most_common())} for b, c in sorted(per.items())],
+        }
+
+
+def _match(r: dict, since_ms: int, until_ms: int, events: set[str], reasons: set[str]) -> bool:
+    ts = int(r.get("ts") or 0)
+    if since_ms and ts < since_ms:
+        return False
+    if until_ms and ts > until_ms:
+        return False
+    if events and str(r.get("event") or "").upper() not in events:
+        return False
+    if reasons and str(r.get("reason") or "").upper() not in reasons:
+        return False
+    return True
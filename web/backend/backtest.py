@@ -0,0 +1,594 @@
+"""
+backtest.py — replay recorded spot ticks + chain/GEX snapshots through the
+wall-touch straddle rules (bot_rules.py, the same functions the live bot runs).
+
+Recording (live, optional): Recorder appends
+  - ticks.csv       ts_ms,index,last          (same format as the replay feed)
+  - snapshots.jsonl one line per levels refresh:
+      {"ts", "currency", "flip", "walls": [strike, ... ranked],
+       "expiries": {"YYYY-MM-DD": expiration_ms},
+       "chain": [[expiry, strike, c_bid, c_ask, c_mark, p_bid, p_ask, p_mark], ...]}
+
+Engine:
+  - stateless gates over the whole time axis in NumPy: wall touch/cross per
+    tick against the snapshot in force (top wall_rank_max walls), trade window,
+    near-flip, ATR% (perp bars rebuilt from the ticks, forming bar peeked the
+    way IndicatorService does);
+  - the path-dependent part (cooldown, max positions/risk, dup strike,
+    expiries by DTE, execution at the snapshot's ask) walks only the candidate
+    ticks, jumping over cooldown / full-book stretches with searchsorted;
+  - exits per position: TP = first tick with |move| >= tp_move_pct (chunked
+    vector scan), SL = first snapshot where marked PnL% <= sl_pnl_pct (marks are
+    what the recorder saw), SL checked first as in the live manage pass.
+
+Differences from live, by construction: SL is evaluated at snapshot cadence
+(live: every 2 s on 1 s-cached marks); ATR uses bars built from the recorded
+spot rather than the exchange's perp candles.
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+from bot_rules import (
+    bot_params,
+    cooldown_ok,
+    exit_reason,
+    move_pct,
+    near_flip_mask,
+    pick_expiries_by_dte,
+    touched_levels_matrix,
+    trade_window_mask,
+)
+from paper_report import PaperReport
+from src.candles import tf_seconds
+
+MAX_WALLS = 24
+LEG_COLS = ("c_bid", "c_ask", "c_mark", "p_bid", "p_ask", "p_mark")
+
+
+def _open_text(path: str, mode: str = "rt"):
+    return gzip.open(path, mode, encoding="utf-8") if path.endswith(".gz") else open(path, mode[0], encoding="utf-8", newline="")
+
+
+# -------------------- recording (live) --------------------
+class Recorder:
+    """Appends ticks / snapshots for later backtests. Buffered; flush() is cheap to call often."""
+
+    def __init__(self, directory: str, snap_every_sec: float = 60.0):
+        self.dir = directory
+        self.snap_every_sec = float(snap_every_sec)
+        self.ticks_path = os.path.join(directory, "ticks.csv")
+        self.snaps_path = os.path.join(directory, "snapshots.jsonl")
+        self._ticks: list[str] = []
+        self._last_snap = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def tick(self, ts_ms: int, index: float, last: float):
+        with self._lock:
+            self._ticks.append(f"{int(ts_ms)},{float(index)},{float(last)}\n")
+            if len(self._ticks) >= 500:
+                self._flush_ticks()
+
+    def _flush_ticks(self):
+        if not self._ticks:
+            return
+        with open(self.ticks_path, "a", encoding="utf-8") as f:
+            f.writelines(self._ticks)
+        self._ticks = []
+
+    def snapshot_due(self) -> bool:
+        return (time.time() - self._last_snap) >= self.snap_every_sec
+
+    def snapshot(self, rec: dict):
+        with self._lock:
+            self._flush_ticks()
+            with open(self.snaps_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+            self._last_snap = time.time()
+
+    def flush(self):
+        with self._lock:
+            self._flush_ticks()
+
+
+def snapshot_record(ts_ms: int, currency: str, walls: list[float], flip: float, instruments: list[dict], summary: list[dict], expiry_of, max_dte: float = 10.0) -> dict:
+    """One snapshots.jsonl line: ranked walls + flip + bid/ask/mark for the wall strikes of near expiries.
+
+    instruments: get_instruments(kind=option); summary: get_book_summary_by_currency(kind=option);
+    expiry_of: expiration ms -> 'YYYY-MM-DD'.
+    """
+    strikes = {float(k) for k in walls}
+    books = {str(r.get("instrument_name")): r for r in (summary or []) if r.get("instrument_name")}
+    expiries: dict[str, int] = {}
+    legs: dict[tuple[str, float], list[float]] = {}
+    for x in instruments or []:
+        try:
+            exp_ms = int(x.get("expiration_timestamp") or 0)
+            ex = expiry_of(exp_ms) if exp_ms else ""
+            if not ex:
+                continue
+            expiries[ex] = min(int(expiries.get(ex) or exp_ms), exp_ms)
+            k = float(x.get("strike") or 0.0)
+            if k not in strikes or (exp_ms - ts_ms) > max_dte * 86_400_000:
+                continue
+            b = books.get(str(x.get("instrument_name")))
+            if not b:
+                continue
+            row = legs.setdefault((ex, k), [0.0] * 6)
+            off = 0 if str(x.get("option_type") or "").lower().startswith("c") else 3
+            row[off:off + 3] = [float(b.get("bid_price") or 0.0), float(b.get("ask_price") or 0.0), float(b.get("mark_price") or 0.0)]
+        except Exception:
+            continue
+    return {
+        "ts": int(ts_ms),
+        "currency": currency,
+        "flip": float(flip or 0.0),
+        "walls": [float(k) for k in walls][:MAX_WALLS],
+        "expiries": expiries,
+        "chain": [[ex, k, *v] for (ex, k), v in sorted(legs.items())],
+    }
+
+
+# -------------------- market data (arrays only: cheap to share) --------------------
+class MarketData:
+    """Ticks + snapshots compiled into NumPy arrays.
+
+    ts (n,) int64 ms, index/last (n,) float
+    snap_ts (S,) int64, flip (S,), walls (S, 24) ranked strikes (NaN padded)
+    exp_ms (E,) + exp_names, exp_avail (S, E) bool
+    legs CSR: leg_key (L, 2) = (expiry idx, strike), leg_ptr (L+1,),
+              leg_snap (M,) snapshot idx, leg_vals (M, 6) LEG_COLS
+    """
+
+    ARRAYS = ("ts", "index", "last", "snap_ts", "flip", "walls", "exp_ms", "exp_avail", "leg_key", "leg_ptr", "leg_snap", "leg_vals")
+
+    def __init__(self, arrays: dict[str, np.ndarray], exp_names: list[str], currency: str = "BTC"):
+        for k in self.ARRAYS:
+            setattr(self, k, arrays[k])
+        self.exp_names = list(exp_names)
+        self.currency = currency
+        self._leg_idx = {(int(e), float(k)): i for i, (e, k) in enumerate(self.leg_key.tolist())}
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {k: getattr(self, k) for k in self.ARRAYS}
+
+    def spot(self, src: str = "index") -> np.ndarray:
+        if src == "last":
+            return np.where(self.last > 0, self.last, self.index)
+        return np.where(self.index > 0, self.index, self.last)
+
+    @classmethod
+    def load(cls, ticks_path: str, snaps_path: str, cache: bool = True) -> "MarketData":
+        """Parse the recordings; the compiled arrays are kept in <snapshots>.npz (reused while both files are unchanged)."""
+        stamp = np.array([os.path.getsize(ticks_path), os.path.getmtime(ticks_path), os.path.getsize(snaps_path), os.path.getmtime(snaps_path)])
+        npz = snaps_path + ".npz"
+        if cache and os.path.exists(npz):
+            try:
+                with np.load(npz, allow_pickle=False) as z:
+                    if np.array_equal(z["stamp"], stamp):
+                        meta = json.loads(str(z["meta"]))
+                        return cls({k: z[k] for k in cls.ARRAYS}, meta["exp_names"], currency=meta["currency"])
+            except Exception:
+                pass
+        ts, idx, last = _load_ticks(ticks_path)
+        arrays, exp_names, cur = _compile_snapshots(_iter_jsonl(snaps_path))
+        arrays.update({"ts": ts, "index": idx, "last": last})
+        if cache:
+            try:
+                tmp = npz + ".tmp.npz"
+                np.savez(tmp, stamp=stamp, meta=np.array(json.dumps({"exp_names": exp_names, "currency": cur})), **arrays)
+                os.replace(tmp, npz)
+            except Exception:
+                pass
+        return cls(arrays, exp_names, currency=cur)
+
+    def leg(self, exp_i: int, strike: float, snap_i: int) -> Optional[np.ndarray]:
+        """Recorded (c_bid, c_ask, c_mark, p_bid, p_ask, p_mark) for expiry/strike at snapshot snap_i."""
+        li = self._leg_idx.get((int(exp_i), float(strike)))
+        if li is None:
+            return None
+        a, b = int(self.leg_ptr[li]), int(self.leg_ptr[li + 1])
+        j = a + int(np.searchsorted(self.leg_snap[a:b], snap_i))
+        if j < b and int(self.leg_snap[j]) == snap_i:
+            return self.leg_vals[j]
+        return None
+
+    def leg_series(self, exp_i: int, strike: float) -> tuple[np.ndarray, np.ndarray]:
+        li = self._leg_idx.get((int(exp_i), float(strike)))
+        if li is None:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, 6))
+        a, b = int(self.leg_ptr[li]), int(self.leg_ptr[li + 1])
+        return self.leg_snap[a:b], self.leg_vals[a:b]
+
+
+def _load_ticks(path: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    with _open_text(path) as f:
+        text = f.read()
+    try:
+        # fast path: every line is ts,index,last
+        arr = np.array(text.replace("\n", ",").split(",")[:-1] if text.endswith("\n") else text.replace("\n", ",").split(","), dtype=float).reshape(-1, 3)
+    except ValueError:
+        rows: list[tuple[float, float, float]] = []
+        for row in csv.reader(text.splitlines()):
+            try:
+                rows.append((float(row[0]), float(row[1]), float(row[2] if len(row) > 2 else row[1])))
+            except (ValueError, IndexError):
+                continue  # header / junk (same rule as the replay feed)
+        arr = np.asarray(rows, dtype=float).reshape(-1, 3)
+    arr = arr[np.argsort(arr[:, 0], kind="stable")]
+    return arr[:, 0].astype(np.int64), arr[:, 1].copy(), arr[:, 2].copy()
+
+
+def _iter_jsonl(path: str) -> Iterable[dict]:
+    with _open_text(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except Exception:
+                continue
+
+
+def _compile_snapshots(recs: Iterable[dict]) -> tuple[dict[str, np.ndarray], list[str], str]:
+    snaps = sorted(recs, key=lambda r: int(r.get("ts") or 0))
+    S = len(snaps)
+    cur = str((snaps[0].get("currency") if snaps else "") or "BTC").upper()
+    snap_ts = np.array([int(r.get("ts") or 0) for r in snaps], dtype=np.int64)
+    flip = np.array([float(r.get("flip") or 0.0) for r in snaps], dtype=float)
+    walls = np.full((S, MAX_WALLS), np.nan)
+    exp_ms_map: dict[str, int] = {}
+    for i, r in enumerate(snaps):
+        w = [float(x) for x in (r.get("walls") or []) if float(x) > 0][:MAX_WALLS]
+        walls[i, :len(w)] = w
+        for ex, ms in (r.get("expiries") or {}).items():
+            exp_ms_map[str(ex)] = int(ms)
+    exp_names = sorted(exp_ms_map, key=lambda e: exp_ms_map[e])
+    exp_pos = {e: j for j, e in enumerate(exp_names)}
+    exp_ms = np.array([exp_ms_map[e] for e in exp_names], dtype=np.int64)
+    exp_avail = np.zeros((S, len(exp_names)), dtype=bool)
+
+    exp_of: list[np.ndarray] = []
+    snap_of: list[np.ndarray] = []
+    vals: list[np.ndarray] = []
+    for i, r in enumerate(snaps):
+        for ex in (r.get("expiries") or {}):
+            exp_avail[i, exp_pos[str(ex)]] = True
+        chain = [row for row in (r.get("chain") or []) if len(row) >= 8 and str(row[0]) in exp_pos]
+        if not chain:
+            continue
+        try:
+            v = np.array([row[1:8] for row in chain], dtype=float)
+        except Exception:
+            continue
+        exp_of.append(np.array([exp_pos[str(row[0])] for row in chain], dtype=np.int64))
+        snap_of.append(np.full(len(chain), i, dtype=np.int64))
+        vals.append(np.nan_to_num(v))
+
+    if vals:
+        e_arr = np.concatenate(exp_of)
+        snap_arr = np.concatenate(snap_of)
+        v_arr = np.concatenate(vals)
+        order = np.lexsort((snap_arr, v_arr[:, 0], e_arr))
+        e_arr, snap_arr, v_arr = e_arr[order], snap_arr[order], v_arr[order]
+        new_leg = np.r_[True, (e_arr[1:] != e_arr[:-1]) | (v_arr[1:, 0] != v_arr[:-1, 0])]
+        starts = np.flatnonzero(new_leg)
+        leg_key = np.c_[e_arr[starts].astype(float), v_arr[starts, 0]]
+        leg_ptr = np.r_[starts, e_arr.size].astype(np.int64)
+        leg_vals = v_arr[:, 1:7].copy()
+    else:
+        snap_arr = np.zeros(0, dtype=np.int64)
+        leg_key = np.zeros((0, 2))
+        leg_ptr = np.zeros(1, dtype=np.int64)
+        leg_vals = np.zeros((0, 6))
+    arrays = {
+        "snap_ts": snap_ts,
+        "flip": flip,
+        "walls": walls,
+        "exp_ms": exp_ms,
+        "exp_avail": exp_avail,
+        "leg_key": leg_key,
+        "leg_ptr": leg_ptr,
+        "leg_snap": snap_arr,
+        "leg_vals": leg_vals,
+    }
+    return arrays, exp_names, cur
+
+
+# -------------------- vector pieces --------------------
+def segment_running(x: np.ndarray, group: np.ndarray, op: str) -> np.ndarray:
+    """Running max/min of x restarting at every change of the (non-decreasing) group id."""
+    rank = np.cumsum(np.r_[0, (np.diff(group) != 0).astype(np.int64)]).astype(float)
+    span = float(np.nanmax(x) - np.nanmin(x)) * 2.0 + 1.0 if x.size else 1.0
+    if op == "max":
+        return np.maximum.accumulate(x + rank * span) - rank * span
+    return -(np.maximum.accumulate(-x + rank * span) - rank * span)
+
+
+def atr_pct_series(ts_ms: np.ndarray, s: np.ndarray, tf_sec: int, n: int) -> np.ndarray:
+    """ATR% per tick: mean of the last n-1 closed true ranges + the forming bar's (IndicatorService peek)."""
+    out = np.full(s.shape, np.nan)
+    if s.size < 2:
+        return out
+    bar = (ts_ms // 1000) // tf_sec
+    starts = np.flatnonzero(np.r_[True, bar[1:] != bar[:-1]])
+    ends = np.r_[starts[1:], s.size]
+    h = np.maximum.reduceat(s, starts)
+    l = np.minimum.reduceat(s, starts)
+    c = s[ends - 1]
+    tr = np.zeros(h.size)
+    tr[1:] = np.maximum(h[1:] - l[1:], np.maximum(np.abs(h[1:] - c[:-1]), np.abs(l[1:] - c[:-1])))
+    cs = np.cumsum(tr)  # cs[k] = sum tr[1..k]
+
+    k = np.cumsum(np.r_[0, (bar[1:] != bar[:-1]).astype(np.int64)])  # bar ordinal per tick
+    h_run = segment_running(s, bar, "max")
+    l_run = segment_running(s, bar, "min")
+    ok = k >= n  # needs n-1 closed TRs (bars 1..k-1) before the forming one
+    kk = k[ok]
+    pc = c[kk - 1]
+    tr_f = np.maximum(h_run[ok] - l_run[ok], np.maximum(np.abs(h_run[ok] - pc), np.abs(l_run[ok] - pc)))
+    closed_sum = cs[kk - 1] - cs[kk - n]
+    atr = (closed_sum + tr_f) / float(n)
+    out[ok] = np.where(s[ok] > 0, atr / s[ok] * 100.0, np.nan)
+    return out
+
+
+def level_rows(walls: np.ndarray, wall_rank_max: int) -> np.ndarray:
+    """Per snapshot: top-N walls, sorted ascending, de-duplicated (as LevelIndex), NaN padded."""
+    top = walls[:, :wall_rank_max].copy()
+    top.sort(axis=1)  # NaN last
+    dup = np.zeros(top.shape, dtype=bool)
+    dup[:, 1:] = top[:, 1:] == top[:, :-1]
+    top[dup] = np.nan
+    top.sort(axis=1)
+    return top
+
+
+# -------------------- engine --------------------
+def run_backtest(data: MarketData, bot: dict, max_trades: int = 100_000) -> dict:
+    t0 = time.perf_counter()
+    p = bot_params(bot)
+    ts = data.ts
+    s = data.spot(p["spot_src"])
+    n = s.size
+    blocks: dict[str, int] = {}
+    if n < 2 or not data.snap_ts.size:
+        return {"ok": False, "error": "no data", "ticks": int(n), "snapshots": int(data.snap_ts.size)}
+
+    # ---- stateless, over the whole time axis ----
+    si = np.searchsorted(data.snap_ts, ts, side="right") - 1
+    has_snap = si >= 0
+    si_c = np.maximum(si, 0)
+    prev = np.r_[s[0], s[:-1]]
+    rows = level_rows(data.walls, p["wall_rank_max"])
+    k0 = np.full(n, np.nan)
+    CH = 250_000
+    for a in range(0, n, CH):
+        b = min(n, a + CH)
+        k0[a:b] = touched_levels_matrix(rows[si_c[a:b]], prev[a:b], s[a:b])
+    touched = has_snap & ~np.isnan(k0)
+
+    win = trade_window_mask(p["trade_windows_utc"], ts)
+    near = near_flip_mask(s, data.flip[si_c], p["near_flip_pct"])
+    if p["atr_min_pct"] > 0:
+        atr = atr_pct_series(ts, s, tf_seconds(p["atr_tf"]), p["atr_n"])
+        atr_ok = ~np.isnan(atr) & (atr >= p["atr_min_pct"])
+        blocks["ATR_UNAVAILABLE"] = int((touched & win & near & np.isnan(atr)).sum())
+        blocks["ATR_TOO_LOW"] = int((touched & win & near & ~np.isnan(atr) & ~atr_ok).sum())
+    else:
+        atr_ok = np.ones(n, dtype=bool)
+    blocks["OUT_OF_WINDOW"] = int((touched & ~win).sum())
+    blocks["FAR_FROM_FLIP"] = int((touched & win & ~near).sum())
+    cand = np.flatnonzero(touched & win & near & atr_ok)
+    cand_ts = ts[cand]
+
+    # ---- path-dependent walk over candidate ticks ----
+    open_pos: list[dict] = []
+    closed: list[dict] = []
+    last_action_ms = 0
+    open_ver = 0
+    failed: set[tuple] = set()
+    c = 0
+    while c < cand.size and len(closed) + len(open_pos) < max_trades:
+        i = int(cand[c])
+        now_ms = int(ts[i])
+
+        # exits that happened before this tick free capacity
+        still = [q for q in open_pos if q["exit_i"] > i]
+        if len(still) != len(open_pos):
+            closed.extend(q for q in open_pos if q["exit_i"] <= i)
+            open_pos = still
+            open_ver += 1
+
+        if not cooldown_ok(last_action_ms, p["cooldown_sec"], now_ms):
+            nxt = int(np.searchsorted(cand_ts, last_action_ms + p["cooldown_sec"] * 1000.0, side="left"))
+            blocks["COOLDOWN"] = blocks.get("COOLDOWN", 0) + (nxt - c)
+            c = max(nxt, c + 1)
+            continue
+        total_risk = sum(q["entry_cost_usd"] for q in open_pos)
+        if len(open_pos) >= p["max_positions"] or total_risk >= p["max_risk_usd"]:
+            reason = "MAX_POSITIONS" if len(open_pos) >= p["max_positions"] else "MAX_RISK"
+            free_i = min(q["exit_i"] for q in open_pos)
+            nxt = int(np.searchsorted(cand, free_i, side="right"))
+            blocks[reason] = blocks.get(reason, 0) + (nxt - c)
+            c = max(nxt, c + 1)
+            continue
+
+        snap_i = int(si[i])
+        key = (snap_i, float(k0[i]), open_ver)
+        if key in failed:
+            blocks["NO_ENTRY_EXECUTED"] = blocks.get("NO_ENTRY_EXECUTED", 0) + 1
+            c += 1
+            continue
+
+        exp_ts = {data.exp_names[j]: int(data.exp_ms[j]) for j in np.flatnonzero(data.exp_avail[snap_i])}
+        expiries_exec = pick_expiries_by_dte(exp_ts, p["dte_ranges_exec"], now_ms, max_n=2)
+        if not expiries_exec:
+            blocks["NO_EXPIRIES_EXEC"] = blocks.get("NO_EXPIRIES_EXEC", 0) + 1
+            failed.add(key)
+            c += 1
+            continue
+
+        opened_any = False
+        for ex in expiries_exec:
+            total_risk = sum(q["entry_cost_usd"] for q in open_pos)
+            if len(open_pos) >= p["max_positions"] or total_risk >= p["max_risk_usd"]:
+                break
+            if any(q["expiry"] == ex and q["strike"] == float(k0[i]) for q in open_pos):
+                blocks["DUP_STRIKE"] = blocks.get("DUP_STRIKE", 0) + 1
+                continue
+            exp_i = data.exp_names.index(ex)
+            leg = data.leg(exp_i, float(k0[i]), snap_i)
+            if leg is None:
+                blocks["NO_CHAIN_ROW"] = blocks.get("NO_CHAIN_ROW", 0) + 1
+                continue
+            cost = (float(leg[1]) + float(leg[4])) * float(s[i]) * p["qty"]
+            if total_risk + cost > p["max_risk_usd"]:
+                blocks["RISK_WOULD_EXCEED"] = blocks.get("RISK_WOULD_EXCEED", 0) + 1
+                continue
+            q = _open_position(data, s, i, exp_i, ex, float(k0[i]), cost, p, len(closed) + len(open_pos))
+            open_pos.append(q)
+            open_ver += 1
+            opened_any = True
+
+        if opened_any:
+            last_action_ms = now_ms
+        else:
+            blocks["NO_ENTRY_EXECUTED"] = blocks.get("NO_ENTRY_EXECUTED", 0) + 1
+            failed.add(key)
+        c += 1
+
+    closed.extend(open_pos)
+    trades = sorted((_as_trade(q, data) for q in closed), key=lambda t: t["closed_ts"])
+    report = PaperReport()
+    report.rebuild(trades)
+    return {
+        "ok": True,
+        "currency": data.currency,
+        "params": p,
+        "ticks": int(n),
+        "snapshots": int(data.snap_ts.size),
+        "candidates": int(cand.size),
+        "blocks": {k: v for k, v in sorted(blocks.items()) if v},
+        "report": report.snapshot(),
+        "trades": trades,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+    }
+
+
+def _first_move(s: np.ndarray, i: int, entry: float, tp_pct: float, chunk: int = 86_400) -> int:
+    """First tick j > i with |s[j]/entry - 1|*100 >= tp_pct, scanning forward a chunk at a time; -1 if never."""
+    lo_px = entry * (1.0 - tp_pct / 100.0)
+    hi_px = entry * (1.0 + tp_pct / 100.0)
+    a = i + 1
+    while a < s.size:
+        b = min(s.size, a + chunk)
+        seg = s[a:b]
+        hit = np.flatnonzero((seg >= hi_px) | (seg <= lo_px))
+        if hit.size:
+            j = a + int(hit[0])
+            # the band test is the same inequality up to rounding; confirm with the live rule
+            if move_pct(float(s[j]), entry) >= tp_pct:
+                return j
+            a = j + 1
+            continue
+        a = b
+    return -1
+
+
+def _open_position(data: MarketData, s: np.ndarray, i: int, exp_i: int, expiry: str, strike: float, cost: float, p: dict, seq: int) -> dict:
+    ts = data.ts
+    entry = float(s[i])
+    qty = p["qty"]
+    j_tp = _first_move(s, i, entry, p["tp_move_pct"])
+    tp_ts = int(ts[j_tp]) if j_tp >= 0 else None
+
+    # SL on recorded marks: snapshots after entry (and up to the TP tick)
+    snap_idx, vals = data.leg_series(exp_i, strike)
+    sl_i, sl_val = -1, None
+    if snap_idx.size and cost > 0:
+        sts = data.snap_ts[snap_idx]
+        sel = sts > ts[i]
+        if tp_ts is not None:
+            sel &= sts <= tp_ts
+        if sel.any():
+            sts_sel, v_sel = sts[sel], vals[sel]
+            ti = np.searchsorted(ts, sts_sel, side="right") - 1
+            value = (v_sel[:, 2] + v_sel[:, 5]) * s[ti] * qty
+            pnl_pct = (value - cost) * 100.0 / cost
+            hit = np.flatnonzero(pnl_pct <= p["sl_pnl_pct"])
+            if hit.size:
+                sl_i, sl_val = int(ti[hit[0]]), float(value[hit[0]])
+
+    if sl_i >= 0:
+        exit_i, reason, value = sl_i, "STOP_PNL", sl_val
+    elif j_tp >= 0:
+        exit_i = j_tp
+        value = _value_at(data, exp_i, strike, exit_i, s, qty)
+        pnl_pct = ((value - cost) * 100.0 / cost) if (cost and value is not None) else 0.0
+        reason = exit_reason(pnl_pct, move_pct(float(s[exit_i]), entry), p["sl_pnl_pct"], p["tp_move_pct"]) or "TP_MOVE"
+    else:
+        exit_i = s.size - 1
+        value = _value_at(data, exp_i, strike, exit_i, s, qty)
+        reason = "END_OF_DATA"
+    return {
+        "seq": seq,
+        "i": i,
+        "exit_i": exit_i if reason != "END_OF_DATA" else s.size,  # END keeps capacity busy to the end
+        "exit_at": exit_i,
+        "expiry": expiry,
+        "strike": strike,
+        "qty": qty,
+        "entry_spot": entry,
+        "entry_cost_usd": cost,
+        "exit_spot": float(s[exit_i]),
+        "exit_value_usd": value,
+        "close_reason": reason,
+    }
+
+
+def _value_at(data: MarketData, exp_i: int, strike: float, i: int, s: np.ndarray, qty: float) -> Optional[float]:
+    """Straddle value with the latest recorded marks at or before tick i."""
+    snap_idx, vals = data.leg_series(exp_i, strike)
+    if not snap_idx.size:
+        return None
+    sts = data.snap_ts[snap_idx]
+    j = int(np.searchsorted(sts, data.ts[i], side="right")) - 1
+    if j < 0:
+        return None
+    return float((vals[j, 2] + vals[j, 5]) * s[i] * qty)
+
+
+def _as_trade(q: dict, data: MarketData) -> dict[str, Any]:
+    value = q["exit_value_usd"]
+    cost = q["entry_cost_usd"]
+    pnl = (value - cost) if value is not None else None
+    return {
+        "id": f"bt-{q['seq'] + 1}",
+        "src": "BACKTEST",
+        "setup": "WALL_TOUCH_STRADDLE",
+        "currency": data.currency,
+        "expiry": q["expiry"],
+        "strike": q["strike"],
+        "qty": q["qty"],
+        "entry_ts": int(data.ts[q["i"]]),
+        "entry_spot": q["entry_spot"],
+        "entry_cost_usd": cost,
+        "closed_ts": int(data.ts[q["exit_at"]]),
+        "exit_spot": q["exit_spot"],
+        "exit_value_usd": value,
+        "pnl_usd": pnl,
+        "pnl_pct": (pnl * 100.0 / cost) if (pnl is not None and cost) else None,
+        "close_reason": q["close_reason"],
+    }
@@ -0,0 +1,76 @@
+"""
+bot_pipeline.py — ordered gates/stages for the bot entry decision.
+
+Each stage declares its cost (cheap < io < heavy). The pipeline runs them
+cheapest-first (declaration order within the same cost), stops at the first
+stage that blocks and records the wall time of every stage it ran, so the
+audit trail shows where a decision spent its time.
+
+A stage is `fn(ctx) -> None | (reason, data)`: None lets the decision
+through, a tuple blocks it with that reason.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+CHEAP = "cheap"  # in-memory only
+IO = "io"        # cached upstream data (may miss and fetch)
+HEAVY = "heavy"  # always hits upstream (chain fetch / execution)
+
+COST_RANK = {CHEAP: 0, IO: 1, HEAVY: 2}
+
+Block = Optional[tuple[str, dict]]
+
+
+@dataclass
+class Stage:
+    name: str
+    cost: str
+    fn: Callable[[dict], Block]
+
+
+@dataclass
+class PipelineResult:
+    reason: Optional[str] = None
+    data: dict = field(default_factory=dict)
+    timing: dict[str, float] = field(default_factory=dict)
+    total_ms: float = 0.0
+
+    @property
+    def passed(self) -> bool:
+        return self.reason is None
+
+    def timing_rec(self) -> dict[str, Any]:
+        return {"timing_ms": {k: round(v, 2) for k, v in self.timing.items()}, "total_ms": round(self.total_ms, 2)}
+
+
+class Pipeline:
+    def __init__(self, stages: list[Stage]):
+        for st in stages:
+            if st.cost not in COST_RANK:
+                raise ValueError(f"stage {st.name}: unknown cost {st.cost!r}")
+        # stable sort: declaration order is kept inside each cost class
+        self.stages = sorted(stages, key=lambda st: COST_RANK[st.cost])
+
+    def describe(self) -> list[dict]:
+        return [{"name": st.name, "cost": st.cost} for st in self.stages]
+
+    def run(self, ctx: dict) -> PipelineResult:
+        res = PipelineResult()
+        t_all = time.perf_counter()
+        for st in self.stages:
+            t0 = time.perf_counter()
+            try:
+                out = st.fn(ctx)
+            except Exception as e:
+                out = ("STAGE_ERROR", {"stage": st.name, "error": f"{type(e).__name__}: {e}"})
+            res.timing[st.name] = (time.perf_counter() - t0) * 1000.0
+            if out is not None:
+                res.reason, res.data = out[0], dict(out[1] or {})
+                res.data.setdefault("stage", st.name)
+                break
+        res.total_ms = (time.perf_counter() - t_all) * 1000.0
+        return res
@@ -0,0 +1,207 @@
+"""
+bot_rules.py — the wall-touch straddle rules, free of I/O and wall clock.
+
+The live bot (main.py gates / manage pass) and the backtester (backtest.py)
+both call these, so a rule changes in one place. Every time-dependent rule
+takes the time explicitly; the *_mask variants evaluate the same rule over a
+whole time axis with NumPy.
+"""
+
+from __future__ import annotations
+
+import datetime
+from typing import Any, Optional
+
+import numpy as np
+
+
+# -------------------- config --------------------
+def bot_params(bot: dict) -> dict[str, Any]:
+    """Normalized strategy parameters (same fallbacks the live bot always used)."""
+    return {
+        "tp_move_pct": float(bot.get("tp_move_pct") or 1.5),
+        "sl_pnl_pct": float(bot.get("sl_pnl_pct") or -60.0),
+        "max_positions": max(1, int(bot.get("max_positions") or 3)),
+        "max_risk_usd": max(1.0, float(bot.get("max_risk_usd") or 500.0)),
+        "qty": float(bot.get("qty") or 0.0) or 1.0,
+        "cooldown_sec": float(bot.get("cooldown_sec") or 15),
+        "dte_ranges_exec": str(bot.get("dte_ranges_exec") or "1-2"),
+        "wall_rank_max": max(1, min(24, int(bot.get("wall_rank_max") or 8))),
+        "near_flip_pct": float(bot.get("near_flip_pct") or 0.0),
+        "atr_tf": str(bot.get("atr_tf") or "15"),
+        "atr_n": max(5, min(100, int(bot.get("atr_n") or 14))),
+        "atr_min_pct": float(bot.get("atr_min_pct") or 0.0),
+        "trade_windows_utc": list(bot.get("trade_windows_utc") or []),
+        "spot_src": str(bot.get("spot_src") or "index"),
+    }
+
+
+# -------------------- expiries --------------------
+def parse_ranges(s: str) -> list[tuple[int, int]]:
+    ranges: list[tuple[int, int]] = []
+    try:
+        s2 = (s or "").strip()
+        if s2:
+            for part in s2.split(","):
+                part = part.strip()
+                if not part:
+                    continue
+                if "-" in part:
+                    a, b = part.split("-", 1)
+                    ranges.append((int(float(a)), int(float(b))))
+                else:
+                    v = int(float(part))
+                    ranges.append((v, v))
+    except Exception:
+        ranges = []
+    return ranges
+
+
+def pick_expiries_by_dte(exp_ts: dict[str, int], dte_ranges: str, now_ms: int, max_n: int = 2) -> list[str]:
+    """exp_ts: expiry 'YYYY-MM-DD' -> expiration ms. Next expiries whose DTE falls in a range."""
+    max_n = max(1, min(8, int(max_n)))
+    ranges = parse_ranges(dte_ranges) or [(1, 2)]
+    out: list[str] = []
+    for ex, ts in sorted(exp_ts.items(), key=lambda kv: kv[1]):
+        dte = int(round((ts - now_ms) / (24 * 3600 * 1000)))
+        if any(a <= dte <= b for a, b in ranges):
+            out.append(ex)
+        if len(out) >= max_n:
+            break
+    return out
+
+
+# -------------------- trade window (UTC) --------------------
+def _parse_window(w: Any) -> Optional[tuple[datetime.time, datetime.time]]:
+    ww = str(w or "").strip()
+    if not ww or "-" not in ww:
+        return None
+    a, b = ww.split("-", 1)
+    ah, am = [int(x) for x in a.strip().split(":")]
+    bh, bm = [int(x) for x in b.strip().split(":")]
+    return datetime.time(hour=ah, minute=am), datetime.time(hour=bh, minute=bm)
+
+
+def in_trade_window(windows: list[str] | None, now: datetime.time) -> bool:
+    """windows: ['HH:MM-HH:MM', ...] in UTC. Empty => always."""
+    try:
+        if not windows:
+            return True
+        for w in windows:
+            ab = _parse_window(w)
+            if ab is None:
+                continue
+            ta, tb = ab
+            if ta <= tb:
+                if now >= ta and now <= tb:
+                    return True
+            else:
+                # wraps midnight
+                if now >= ta or now <= tb:
+                    return True
+        return False
+    except Exception:
+        return True
+
+
+def trade_window_mask(windows: list[str] | None, ts_ms: np.ndarray) -> np.ndarray:
+    """in_trade_window over an array of epoch ms."""
+    ts_ms = np.asarray(ts_ms)
+    try:
+        if not windows:
+            return np.ones(ts_ms.shape, dtype=bool)
+        sod = (ts_ms % 86_400_000) / 1000.0  # seconds of day (UTC), sub-second kept like time() compares
+        out = np.zeros(ts_ms.shape, dtype=bool)
+        for w in windows:
+            ab = _parse_window(w)
+            if ab is None:
+                continue
+            a = ab[0].hour * 3600 + ab[0].minute * 60
+            b = ab[1].hour * 3600 + ab[1].minute * 60
+            out |= ((sod >= a) & (sod <= b)) if a <= b else ((sod >= a) | (sod <= b))
+        return out
+    except Exception:
+        return np.ones(ts_ms.shape, dtype=bool)
+
+
+# -------------------- entry gates --------------------
+def cooldown_ok(last_action_ms: float, cooldown_sec: float, now_ms: float) -> bool:
+    return (float(now_ms) - float(last_action_ms or 0)) >= float(cooldown_sec) * 1000.0
+
+
+def near_flip_block(s_now: float, flip: Optional[float], near_flip_pct: float) -> Optional[dict]:
+    """Block data when spot is farther than near_flip_pct from the flip, else None."""
+    if flip and near_flip_pct and s_now:
+        dist_pct = abs(s_now - flip) / s_now * 100.0
+        if dist_pct > near_flip_pct:
+            return {"dist_pct": dist_pct, "near_flip_pct": near_flip_pct, "flip": flip}
+    return None
+
+
+def near_flip_mask(s: np.ndarray, flip: np.ndarray, near_flip_pct: float) -> np.ndarray:
+    s = np.asarray(s, dtype=float)
+    flip = np.asarray(flip, dtype=float)
+    if not near_flip_pct:
+        return np.ones(s.shape, dtype=bool)
+    active = (flip > 0) & (s > 0)
+    dist = np.divide(np.abs(s - flip) * 100.0, s, out=np.zeros_like(s), where=s > 0)
+    return ~active | (dist <= near_flip_pct)
+
+
+def atr_block(atr_pct: Optional[float], atr_min_pct: float) -> Optional[str]:
+    if atr_min_pct > 0:
+        if atr_pct is None:
+            return "ATR_UNAVAILABLE"
+        if float(atr_pct) < float(atr_min_pct):
+            return "ATR_TOO_LOW"
+    return None
+
+
+# -------------------- touch --------------------
+def touch_eps(s_now: float) -> float:
+    return max(1.0, float(s_now) * 0.00005)
+
+
+def touched_level(levels: np.ndarray, prev: float, now: float) -> Optional[float]:
+    """Wall touched/crossed on prev->now (nearest to now), else None. levels: sorted."""
+    eps = touch_eps(now)
+    lo = min(float(prev), float(now) - eps)
+    hi = max(float(prev), float(now) + eps)
+    i = int(np.searchsorted(levels, lo, side="left"))
+    j = int(np.searchsorted(levels, hi, side="right"))
+    if j <= i:
+        return None
+    cand = levels[i:j]
+    return float(cand[int(np.argmin(np.abs(cand - now)))])
+
+
+def touched_levels_matrix(levels: np.ndarray, prev: np.ndarray, now: np.ndarray) -> np.ndarray:
+    """touched_level per tick, each tick with its own sorted level row.
+
+    levels: (n, W) ascending rows padded with NaN; prev/now: (n,).
+    Returns (n,) with the touched level nearest to now (lower one on ties) or NaN.
+    """
+    prev = np.asarray(prev, dtype=float)
+    now = np.asarray(now, dtype=float)
+    eps = np.maximum(1.0, now * 0.00005)
+    lo = np.minimum(prev, now - eps)[:, None]
+    hi = np.maximum(prev, now + eps)[:, None]
+    with np.errstate(invalid="ignore"):
+        inside = (levels >= lo) & (levels <= hi)
+    dist = np.where(inside, np.abs(levels - now[:, None]), np.inf)
+    j = np.argmin(dist, axis=1)
+    out = levels[np.arange(levels.shape[0]), j]
+    return np.where(inside.any(axis=1), out, np.nan)
+
+
+# -------------------- exits --------------------
+def exit_reason(pnl_pct: float, move_pct: float, sl_pnl_pct: float, tp_move_pct: float) -> Optional[str]:
+    if pnl_pct <= sl_pnl_pct:
+        return "STOP_PNL"
+    if move_pct >= tp_move_pct:
+        return "TP_MOVE"
+    return None
+
+
+def move_pct(s_now: float, entry_spot: float) -> float:
+    return abs(s_now / entry_spot - 1.0) * 100.0 if entry_spot else 0.0
@@ -0,0 +1,156 @@
+"""
+bot_runner.py — N independent bot instances over one market-data layer.
+
+BotInstance: its own config/state dict (the shape of the old global _BOT),
+paper book, PaperDB, PaperReport, audit log, wall levels and lock. The first instance
+("main") wraps the module globals main.py always had, so /api/bot/* and
+/api/paper/* without ?bot= keep behaving as before.
+
+BotRunner: one spot stream per currency in use, fanned out to every enabled
+instance trading it (handlers run concurrently via gather). Upstream data
+(walls, instruments, chain, marks, candles) is already cached per currency
+in main.py / MtmEngine / IndicatorService, so an extra instance adds CPU,
+not requests.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import re
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from audit_log import AuditLog
+from paper_db import PaperDB
+from paper_report import PaperReport
+from spot_stream import LevelIndex, SpotTick
+from src.util import log_error
+
+_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+
+def valid_bot_id(bot_id: str) -> bool:
+    return bool(_ID_RE.match(str(bot_id or "")))
+
+
+class BotInstance:
+    def __init__(self, bot_id: str, bot: dict, paper: dict, db: PaperDB, report: PaperReport, state_path: str, audit: Optional[AuditLog] = None):
+        self.id = bot_id
+        self.bot = bot
+        self.paper = paper
+        self.db = db
+        self.report = report
+        self.state_path = state_path
+        self.audit = audit or AuditLog()
+        self.levels: dict[str, LevelIndex] = {}  # currency -> sorted wall levels (+flip)
+        self.lock = asyncio.Lock()  # serializes paper mutations between tick handler and manage pass
+
+    @property
+    def currency(self) -> str:
+        return str(self.bot.get("currency") or "BTC").upper()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.bot.get("enabled"))
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "enabled": self.enabled,
+            "auto_entry": bool(self.bot.get("auto_entry")),
+            "currency": self.currency,
+            "paper_open": len(self.paper.get("open") or []),
+            "last_block_reason": self.bot.get("last_block_reason"),
+            "last_action": self.bot.get("last_action"),
+            "last_spot": self.bot.get("last_spot"),
+        }
+
+
+class BotRunner:
+    """Keeps one spot stream per currency alive while any enabled instance trades it."""
+
+    def __init__(
+        self,
+        feed: Callable[[str], AsyncIterator[SpotTick]],
+        on_spot: Callable[[str, SpotTick], None],
+        on_tick: Callable[[BotInstance, SpotTick], Awaitable[None]],
+    ):
+        self.instances: dict[str, BotInstance] = {}
+        self._feed = feed
+        self._on_spot = on_spot
+        self._on_tick = on_tick
+        self._streams: dict[str, asyncio.Task] = {}
+        self._exhausted: set[str] = set()  # finite (replay) feeds that ran out
+
+    # ---------------- instances ----------------
+    def add(self, inst: BotInstance) -> BotInstance:
+        self.instances[inst.id] = inst
+        return inst
+
+    def remove(self, bot_id: str) -> Optional[BotInstance]:
+        return self.instances.pop(bot_id, None)
+
+    def get(self, bot_id: str) -> Optional[BotInstance]:
+        return self.instances.get(bot_id)
+
+    def all(self) -> list[BotInstance]:
+        return list(self.instances.values())
+
+    def enabled_for(self, cur: str) -> list[BotInstance]:
+        return [i for i in self.instances.values() if i.enabled and i.currency == cur]
+
+    def touch(self):
+        """Config changed: a finished replay may start over."""
+        self._exhausted.clear()
+
+    # ---------------- streams ----------------
+    async def _stream(self, cur: str):
+        async with contextlib.aclosing(self._feed(cur)) as ticks:
+            async for tick in ticks:
+                targets = self.enabled_for(cur)
+                if not targets:
+                    return
+                try:
+                    self._on_spot(cur, tick)
+                except Exception:
+                    pass
+                results = await asyncio.gather(*(self._on_tick(i, tick) for i in targets), return_exceptions=True)
+                for inst, res in zip(targets, results):
+                    if isinstance(res, BaseException):
+                        self._tick_failed(inst, res)
+        self._exhausted.add(cur)
+
+    def _tick_failed(self, inst: BotInstance, e: BaseException):
+        """A tick handler raised: keep streaming, but leave a trace (app log + the instance audit)."""
+        msg = f"{type(e).__name__}: {e}"
+        try:
+            log_error(f"bot {inst.id} tick handler failed: {msg}", module="bot_runner")
+            inst.audit.append({"ts": int(time.time() * 1000), "event": "TICK_ERROR", "error": msg[:500]})
+        except Exception:
+            pass
+
+    async def run(self, poll_sec: float = 1.0):
+        """Supervisor: start/stop per-currency streams as instances are enabled or switch currency."""
+        try:
+            while True:
+                wanted = {i.currency for i in self.instances.values() if i.enabled}
+                for cur, task in list(self._streams.items()):
+                    if task.done():
+                        self._streams.pop(cur, None)
+                        if not task.cancelled() and task.exception() is not None:
+                            await asyncio.sleep(2.0)  # keep bot alive; restart after a pause
+                    elif cur not in wanted:
+                        task.cancel()
+                        self._streams.pop(cur, None)
+                for cur in wanted:
+                    if cur not in self._streams and cur not in self._exhausted:
+                        self._streams[cur] = asyncio.create_task(self._stream(cur))
+                await asyncio.sleep(poll_sec)
+        finally:
+            for task in self._streams.values():
+                task.cancel()
+            self._streams.clear()
+
+    def streams(self) -> list[str]:
+        return sorted(c for c, t in self._streams.items() if not t.done())
@@ -0,0 +1,121 @@
+"""
+clock.py — time source for the bot loops (injectable, so replays can run on feed time).
+
+  - WallClock: time.time() / asyncio.sleep, what the live bot always used.
+  - SimClock: virtual time driven by the replay feed. advance_to(ts_ms) moves
+    the clock tick by tick; every clock.sleep() whose deadline falls inside
+    the step wakes in deadline order, and advance_to only returns once those
+    tasks are parked on the clock again (or finished). A day of ticks runs as
+    fast as the handlers do, and runs are repeatable.
+
+Idle/back-off waits that nothing drives (bot disabled, feed exhausted) should
+keep using asyncio.sleep: under SimClock they would never wake.
+
+Scope of a SimClock replay: only spot and bot time are simulated. Cooldowns,
+trade windows, DTE arithmetic and the levels-refresh cadence follow the
+clock, but walls/flip, ATR candles, the instrument list and option quotes
+still come from live Deribit, and the REST caches in main.py expire on wall
+time. A replay therefore gates recorded spot against today's structure and
+is not deterministic across runs; for a reproducible run over recorded
+structure use backtest.run_backtest (snapshots.jsonl).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import heapq
+import itertools
+import time
+from typing import Optional
+
+
+class WallClock:
+    sim = False
+
+    def time(self) -> float:
+        return time.time()
+
+    def now_ms(self) -> int:
+        return int(self.time() * 1000)
+
+    def utcnow(self) -> datetime.datetime:
+        """Naive UTC datetime (same shape as datetime.utcnow())."""
+        return datetime.datetime.fromtimestamp(self.time(), datetime.timezone.utc).replace(tzinfo=None)
+
+    async def sleep(self, sec: float):
+        await asyncio.sleep(max(0.0, float(sec)))
+
+    async def advance_to(self, ts_ms: int):
+        """Real time moves by itself."""
+        return None
+
+
+class SimClock(WallClock):
+    sim = True
+
+    def __init__(self, start_ms: Optional[int] = None, settle_timeout_sec: float = 30.0):
+        # unstarted: epoch 0 until the feed's first timestamp (nothing stamped before it can look "recent")
+        self._now_ms = int(start_ms or 0)
+        self._started = start_ms is not None
+        self._heap: list[tuple[int, int, asyncio.Future, Optional[asyncio.Task]]] = []
+        self._seq = itertools.count()
+        self._tasks: set[asyncio.Task] = set()  # tasks that sleep on this clock
+        self._parked: set[asyncio.Task] = set()  # ...and are parked right now
+        self.settle_timeout_sec = float(settle_timeout_sec)
+
+    def time(self) -> float:
+        return self._now_ms / 1000.0
+
+    def now_ms(self) -> int:
+        return self._now_ms
+
+    async def sleep(self, sec: float):
+        task = asyncio.current_task()
+        deadline = self._now_ms + int(max(0.0, float(sec)) * 1000)
+        if deadline <= self._now_ms:
+            await asyncio.sleep(0)
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (deadline, next(self._seq), fut, task))
+        if task is not None:
+            if task not in self._tasks:
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            self._parked.add(task)
+        try:
+            await fut
+        finally:
+            if task is not None:
+                self._parked.discard(task)
+
+    async def advance_to(self, ts_ms: int):
+        ts_ms = int(ts_ms)
+        if not self._started:
+            # first feed timestamp: re-base the sleeps queued before the replay started
+            delta = ts_ms - self._now_ms
+            self._heap = [(d + delta, s, f, t) for d, s, f, t in self._heap]
+            heapq.heapify(self._heap)
+            self._now_ms = ts_ms
+            self._started = True
+        while self._heap and self._heap[0][0] <= ts_ms:
+            deadline, _, fut, task = heapq.heappop(self._heap)
+            self._now_ms = max(self._now_ms, deadline)
+            if not fut.done():
+                fut.set_result(None)
+                self._parked.discard(task)  # busy until it sleeps again
+            await self._settle()
+        self._now_ms = max(self._now_ms, ts_ms)
+
+    async def _settle(self):
+        """Let woken tasks run until each one is parked on the clock again (or done)."""
+        me = asyncio.current_task()
+        t_end = time.monotonic() + self.settle_timeout_sec
+        spins = 0
+        while True:
+            busy = [t for t in self._tasks if t is not me and not t.done() and t not in self._parked]
+            if not busy or time.monotonic() > t_end:
+                return
+            spins += 1
+            # plain yields first; then give worker threads (to_thread) real time
+            await asyncio.sleep(0 if spins < 20 else 0.001)
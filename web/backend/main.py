@@ -7,8 +7,10 @@ import json
 import os
 import time
 import asyncio
+import copy
 from typing import Any, Dict, List, Optional
 
+import numpy as np
 import requests
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -24,10 +26,27 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parents[2]  # .../Sistema_Cripto
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+HERE = Path(__file__).resolve().parent  # sibling backend modules
+if str(HERE) not in sys.path:
+    sys.path.insert(0, str(HERE))
 
 from src.deribit_api import DeribitPublicClient  # noqa
 from src.gex import compute_gex_rows, aggregate_by_strike, gamma_flip, top_walls, regime_text  # noqa
 from src.testdata import gen_ohlc  # noqa
+from paper_db import PaperDB  # noqa
+from paper_report import PaperReport  # noqa
+from mtm import MtmEngine  # noqa
+from bot_pipeline import CHEAP, HEAVY, IO, Pipeline, Stage  # noqa
+from audit_log import AuditLog  # noqa
+from bot_runner import BotInstance, BotRunner, valid_bot_id  # noqa
+from clock import SimClock, WallClock  # noqa
+from spot_stream import LevelIndex, SpotTick, feed_name, spot_ticks  # noqa
+from backtest import MarketData, Recorder, run_backtest, snapshot_record  # noqa
+from sweep import PARAMS as SWEEP_PARAMS, run_sweep  # noqa
+from bot_rules import atr_block, cooldown_ok, exit_reason, in_trade_window, move_pct, near_flip_block, pick_expiries_by_dte, touched_level  # noqa
+from src.candles import CandleStore, norm_tf, rows_to_ohlc, tf_seconds  # noqa
+from src.downsample import downsample  # noqa
+from src.indicators import IndicatorService  # noqa
 
 
 APP_NAME = "Cripto Desk Web"
@@ -206,6 +225,28 @@ def binance_klines(symbol: str, tf: str, limit: int = 300) -> dict:
 
     return {"t": t, "o": o, "h": h, "l": l, "c": c, "v": v}
 
+def binance_kline_rows(symbol: str, tf: str, start_ms: int, end_ms: int) -> np.ndarray:
+    """Klines in [start_ms, end_ms] as (n, 6) rows (t sec, o, h, l, c, v); pages of 1000 (CandleStore fetcher)."""
+    interval = BINANCE_TF.get(tf, "1m")
+    out: list[list[float]] = []
+    a = int(start_ms)
+    while a <= int(end_ms):
+        params = {"symbol": symbol, "interval": interval, "startTime": a, "endTime": int(end_ms), "limit": 1000}
+        try:
+            r = requests.get(BINANCE_BASE + "/api/v3/klines", params=params, timeout=10)
+            r.raise_for_status()
+        except Exception:
+            r = requests.get(BINANCE_BASE_FALLBACK + "/api/v3/klines", params=params, timeout=10)
+            r.raise_for_status()
+        page = r.json() or []
+        for k in page:
+            out.append([float(int(k[0]) // 1000), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5])])
+        if len(page) < 1000:
+            break
+        a = int(page[-1][0]) + 1
+    return np.asarray(out, dtype=float).reshape(-1, 6)
+
+
 # -------------------- Simple auth --------------------
 # NOTE: Diego asked for Myfriend/Cripto. We keep them configurable via env.
 AUTH_USER = os.environ.get("CRYPT_USER", "Myfriend")
@@ -307,62 +348,80 @@ async def login(req: Request):
 
 
 # -------------------- Paper (server-side) API --------------------
+def _bot_inst(bot_id: str) -> BotInstance:
+    """Bot instance by id ("main" = the original single bot and its paper book)."""
+    inst = _RUNNER.get(str(bot_id or "main"))
+    if inst is None:
+        raise HTTPException(status_code=404, detail="bot not found")
+    return inst
+
+
 @app.get("/api/paper/open")
-def paper_open(user: dict = Depends(get_user)):
-    return {"ok": True, "open": _PAPER.get("open") or [], "ts": int(time.time() * 1000)}
+def paper_open(bot: str = "main", user: dict = Depends(get_user)):
+    return {"ok": True, "open": _bot_inst(bot).paper.get("open") or [], "ts": int(time.time() * 1000)}
 
 
 @app.get("/api/paper/open_enriched")
-def paper_open_enriched(limit: int = 12, user: dict = Depends(get_user)):
+def paper_open_enriched(limit: int = 12, bot: str = "main", user: dict = Depends(get_user)):
     limit = max(1, min(30, int(limit)))
-    opens = list(_PAPER.get("open") or [])[:limit]
-
-    # spot from perp
-    cur = "BTC"
-    try:
-        if opens and opens[0].get("currency"):
-            cur = str(opens[0].get("currency") or "BTC").upper()
-    except Exception:
-        cur = "BTC"
-    perp = f"{cur}-PERPETUAL"
-    pt, _ = DeribitPublicClient(timeout=6.0).get_ticker(perp)
-    spot = float((pt or {}).get("index_price") or (pt or {}).get("last_price") or 0.0)
+    inst = _bot_inst(bot)
+    all_open = list(inst.paper.get("open") or [])
+    opens = all_open[:limit]
 
-    client = DeribitPublicClient(timeout=6.0)
+    snap = _MTM.snapshot(all_open, spot_src=str(inst.bot.get("spot_src") or "index"))
+    pos = snap.get("positions") or {}
     out = []
     for t in opens:
-        try:
-            cn = str(t.get("callName") or "")
-            pn = str(t.get("putName") or "")
-            ct, _ = client.get_ticker(cn) if cn else ({}, 0)
-            pt2, _ = client.get_ticker(pn) if pn else ({}, 0)
-            qty = float(t.get("qty") or 1.0)
-            call_usd = float((ct.get("mark_price") or 0.0)) * spot * qty
-            put_usd = float((pt2.get("mark_price") or 0.0)) * spot * qty
-            value = call_usd + put_usd
-            cost = float(t.get("entry_cost_usd") or 0.0)
-            pnl = value - cost
-            pnl_pct = (pnl / cost * 100.0) if cost else 0.0
-            out.append({
-                **t,
-                "mtm": {
-                    "spot": spot,
-                    "value_usd": value,
-                    "pnl_usd": pnl,
-                    "pnl_pct": pnl_pct,
-                    "ts": _now_ms(),
-                },
-            })
-        except Exception:
+        p = pos.get(str(t.get("id")))
+        if not p:
             out.append({**t, "mtm": None})
+            continue
+        out.append({
+            **t,
+            "mtm": {
+                "spot": p["spot"],
+                "value_usd": p["value_usd"],
+                "pnl_usd": p["pnl_usd"],
+                "pnl_pct": p["pnl_pct"],
+                "ts": p["ts"],
+            },
+        })
 
     return {"ok": True, "open": out, "ts": _now_ms()}
 
 
 @app.get("/api/paper/history")
-def paper_history(limit: int = 500, user: dict = Depends(get_user)):
+def paper_history(
+    limit: int = 500,
+    cursor: str = "",
+    currency: str = "",
+    expiry: str = "",
+    strike: float = 0.0,
+    src: str = "",
+    since_ms: int = 0,
+    until_ms: int = 0,
+    bot: str = "main",
+    user: dict = Depends(get_user),
+):
+    """Closed trades, newest first. Pass `next_cursor` back as `cursor` for the next page."""
     limit = max(1, min(2000, int(limit)))
-    return {"ok": True, "history": (_PAPER.get("history") or [])[:limit], "ts": int(time.time() * 1000)}
+    rows, nxt = _bot_inst(bot).db.history_page(
+        limit=limit,
+        cursor=(cursor or "").strip(),
+        currency=(currency or "").strip(),
+        expiry=(expiry or "").strip(),
+        strike=float(strike or 0.0) or None,
+        src=(src or "").strip(),
+        since_ms=int(since_ms or 0),
+        until_ms=int(until_ms or 0),
+    )
+    return {"ok": True, "history": rows, "next_cursor": nxt, "ts": int(time.time() * 1000)}
+
+
+@app.get("/api/paper/report")
+def paper_report(bot: str = "main", user: dict = Depends(get_user)):
+    """Rolling performance aggregates (maintained on every close, not recomputed here)."""
+    return {"ok": True, "report": _bot_inst(bot).report.snapshot(), "ts": int(time.time() * 1000)}
 
 
 @app.post("/api/paper/entry")
@@ -385,98 +444,91 @@ async def paper_entry(req: Request, user: dict = Depends(get_user)):
     if not expiry or not strike or not qty or not call_name or not put_name:
         raise HTTPException(status_code=400, detail="expiry/strike/qty/callName/putName required")
 
-    # Rule A1: one open trade per (expiry,strike)
-    for t in (_PAPER.get("open") or []):
-        try:
-            if str(t.get("expiry")) == expiry and float(t.get("strike") or 0.0) == float(strike):
-                raise HTTPException(status_code=409, detail="trade already open for expiry+strike")
-        except HTTPException:
-            raise
-        except Exception:
-            continue
+    inst = _bot_inst(str(body.get("bot") or "main"))
+    # under the bot lock: a manage/entry pass rewrites paper["open"] from its own copy
+    async with inst.lock:
+        # Rule A1: one open trade per (expiry,strike)
+        for t in (inst.paper.get("open") or []):
+            try:
+                if str(t.get("expiry")) == expiry and float(t.get("strike") or 0.0) == float(strike):
+                    raise HTTPException(status_code=409, detail="trade already open for expiry+strike")
+            except HTTPException:
+                raise
+            except Exception:
+                continue
 
-    trade = {
-        "id": f"manual-{_now_ms()}",
-        "src": "MANUAL",
-        "currency": cur,
-        "expiry": expiry,
-        "strike": strike,
-        "qty": qty,
-        "entry_ts": _now_ms(),
-        "entry_spot": entry_spot,
-        "entry_spot_index": entry_spot_index,
-        "entry_spot_last": entry_spot_last,
-        "callName": call_name,
-        "putName": put_name,
-        "entry_cost_usd": entry_cost_usd,
-        "entry_cost_ask": entry_cost_ask,
-        "entry_cost_mid": entry_cost_mid,
-        "entry_cost_mark": entry_cost_mark,
-        "entry_call": body.get("entry_call") or {},
-        "entry_put": body.get("entry_put") or {},
-        "vol": body.get("vol") or {},
-    }
+        trade = {
+            "id": f"manual-{_now_ms()}",
+            "src": "MANUAL",
+            "setup": str(body.get("setup") or "MANUAL"),
+            "currency": cur,
+            "expiry": expiry,
+            "strike": strike,
+            "qty": qty,
+            "entry_ts": _now_ms(),
+            "entry_spot": entry_spot,
+            "entry_spot_index": entry_spot_index,
+            "entry_spot_last": entry_spot_last,
+            "callName": call_name,
+            "putName": put_name,
+            "entry_cost_usd": entry_cost_usd,
+            "entry_cost_ask": entry_cost_ask,
+            "entry_cost_mid": entry_cost_mid,
+            "entry_cost_mark": entry_cost_mark,
+            "entry_call": body.get("entry_call") or {},
+            "entry_put": body.get("entry_put") or {},
+            "vol": body.get("vol") or {},
+        }
 
-    _PAPER["open"] = [trade] + list(_PAPER.get("open") or [])
-    _paper_save()
+        _paper_add_open(trade, inst)
     return {"ok": True, "trade": trade}
 
 
 @app.get("/api/paper/mtm")
-def paper_mtm(id: str, user: dict = Depends(get_user)):
+def paper_mtm(id: str = "", currency: str = "", bot: str = "main", user: dict = Depends(get_user)):
+    """MTM for one trade (id), or totals over open trades (optionally one currency)."""
     tid = str(id or "")
+    inst = _bot_inst(bot)
+    opens = list(inst.paper.get("open") or [])
+    snap = _MTM.snapshot(opens, spot_src=str(inst.bot.get("spot_src") or "index"))
+    pos = snap.get("positions") or {}
+
     if not tid:
-        raise HTTPException(status_code=400, detail="id required")
-    t = None
-    for x in (_PAPER.get("open") or []):
-        if str(x.get("id")) == tid:
-            t = x
-            break
-    if not t:
-        raise HTTPException(status_code=404, detail="trade not found")
+        cur = (currency or "").upper().strip()
+        rows = [p for p in pos.values() if not cur or p.get("currency") == cur]
+        value = sum(float(p["value_usd"]) for p in rows)
+        pnl = sum(float(p["pnl_usd"]) for p in rows)
+        cost = value - pnl
+        return {
+            "ok": True,
+            "currency": cur or "ALL",
+            "n": len(rows),
+            "value_usd": value,
+            "pnl_usd": pnl,
+            "pnl_pct": (pnl / cost * 100.0) if cost else 0.0,
+            "ts": snap.get("ts") or _now_ms(),
+        }
 
-    cur = str(t.get("currency") or "BTC").upper()
-    perp = f"{cur}-PERPETUAL"
-    pt, _ = DeribitPublicClient(timeout=6.0).get_ticker(perp)
-    spot_index = float((pt or {}).get("index_price") or 0.0)
-    spot_last = float((pt or {}).get("last_price") or 0.0)
-    spot = float((pt or {}).get("index_price") or (pt or {}).get("last_price") or 0.0)
-
-    cn = str(t.get("callName") or "")
-    pn = str(t.get("putName") or "")
-    ct = {}
-    pt2 = {}
-    if cn:
-        ct, _ = DeribitPublicClient(timeout=6.0).get_ticker(cn)
-    if pn:
-        pt2, _ = DeribitPublicClient(timeout=6.0).get_ticker(pn)
-
-    def _prem_usd(tkr: dict) -> float:
-        m = float((tkr or {}).get("mark_price") or 0.0)
-        return m * float(spot or 0.0)
-
-    qty = float(t.get("qty") or 1.0)
-    call_usd = _prem_usd(ct) * qty
-    put_usd = _prem_usd(pt2) * qty
-    value = call_usd + put_usd
-    cost = float(t.get("entry_cost_usd") or 0.0)
-    pnl = value - cost
-    pnl_pct = (pnl / cost * 100.0) if cost else 0.0
+    if not any(str(x.get("id")) == tid for x in opens):
+        raise HTTPException(status_code=404, detail="trade not found")
+    p = pos.get(tid)
+    if not p:
+        raise HTTPException(status_code=502, detail="mtm unavailable")
 
     return {
         "ok": True,
         "id": tid,
-        "spot": spot,
-        "spot_index": spot_index,
-        "spot_last": spot_last,
-        "call": ct,
-        "put": pt2,
-        "call_usd": call_usd,
-        "put_usd": put_usd,
-        "value_usd": value,
-        "pnl_usd": pnl,
-        "pnl_pct": pnl_pct,
-        "ts": _now_ms(),
+        "spot": p["spot"],
+        "spot_index": p["spot_index"],
+        "spot_last": p["spot_last"],
+        "call": p["call"],
+        "put": p["put"],
+        "call_usd": p["call_usd"],
+        "put_usd": p["put_usd"],
+        "value_usd": p["value_usd"],
+        "pnl_usd": p["pnl_usd"],
+        "pnl_pct": p["pnl_pct"],
+        "ts": p["ts"],
     }
 
 
@@ -487,55 +539,228 @@ async def paper_close(req: Request, user: dict = Depends(get_user)):
     reason = str(body.get("reason") or "manual")
     if not tid:
         raise HTTPException(status_code=400, detail="id required")
-    # move from open -> history
-    opens = list(_PAPER.get("open") or [])
-    keep = []
-    closed = None
-    for t in opens:
-        if str(t.get("id")) == tid:
-            closed = dict(t)
-        else:
-            keep.append(t)
-    if not closed:
-        raise HTTPException(status_code=404, detail="trade not found")
-    closed["closed_ts"] = int(time.time() * 1000)
-    closed["close_reason"] = reason
-    _PAPER["open"] = keep
-    _PAPER.setdefault("history", []).insert(0, closed)
-    _PAPER["history"] = (_PAPER.get("history") or [])[:2000]
-    _paper_save()
+    inst = _bot_inst(str(body.get("bot") or "main"))
+    # under the bot lock: a manage/entry pass rewrites paper["open"] from its own copy
+    async with inst.lock:
+        # move from open -> history
+        opens = list(inst.paper.get("open") or [])
+        keep = []
+        closed = None
+        for t in opens:
+            if str(t.get("id")) == tid:
+                closed = dict(t)
+            else:
+                keep.append(t)
+        if not closed:
+            raise HTTPException(status_code=404, detail="trade not found")
+        closed["closed_ts"] = int(time.time() * 1000)
+        closed["close_reason"] = reason
+        # exit marks come from the shared MTM snapshot (client-sent PnL is ignored); they feed the report
+        try:
+            snap = await asyncio.to_thread(_MTM.snapshot, [closed], spot_src=str(inst.bot.get("spot_src") or "index"))
+            p = (snap.get("positions") or {}).get(tid)
+        except Exception:
+            p = None
+        if p:
+            closed["exit_spot"] = float(p["spot"])
+            closed["exit_value_usd"] = float(p["value_usd"])
+            closed["pnl_usd"] = float(p["pnl_usd"])
+            closed["pnl_pct"] = float(p["pnl_pct"])
+        inst.paper["open"] = keep
+        _paper_record_close(closed, inst)
     return {"ok": True, "closed": closed}
 
 
 # -------------------- BOT control API (paper server-side) --------------------
 @app.get("/api/bot/status")
-def bot_status(user: dict = Depends(get_user)):
-    return {"ok": True, "bot": _BOT, "paper_open": len(_PAPER.get("open") or []), "ts": int(time.time() * 1000)}
+def bot_status(bot: str = "main", user: dict = Depends(get_user)):
+    inst = _bot_inst(bot)
+    return {
+        "ok": True,
+        "id": inst.id,
+        "bot": inst.bot,
+        "paper_open": len(inst.paper.get("open") or []),
+        "pipeline": _ENTRY_PIPELINE.describe(),
+        "instances": [i.summary() for i in _RUNNER.all()],
+        "streams": _RUNNER.streams(),
+        "ts": int(time.time() * 1000),
+    }
 
 
 @app.get("/api/bot/audit")
-def bot_audit(limit: int = 50, user: dict = Depends(get_user)):
-    limit = max(1, min(200, int(limit or 50)))
-    rows = list(_BOT.get("audit") or [])[:limit]
+def bot_audit(
+    limit: int = 50,
+    bot: str = "main",
+    since_ms: int = 0,
+    until_ms: int = 0,
+    event: str = "",
+    reason: str = "",
+    stats: int = 0,
+    bucket: str = "day",
+    user: dict = Depends(get_user),
+):
+    """Audit events, newest first. No filters: the in-memory ring. With since_ms/until_ms/event/reason
+    (comma lists ok) the on-disk log is searched too; stats=1 returns counts per reason (or event) per day|hour."""
+    audit = _bot_inst(bot).audit
+    if stats:
+        return {"ok": True, "stats": audit.stats(since_ms=int(since_ms or 0), until_ms=int(until_ms or 0), event=event or "BLOCK", bucket=bucket), "ts": int(time.time() * 1000)}
+    if not (since_ms or until_ms or event or reason):
+        limit = max(1, min(200, int(limit or 50)))
+        return {"ok": True, "rows": audit.recent(limit), "ts": int(time.time() * 1000)}
+    limit = max(1, min(10000, int(limit or 500)))
+    rows = audit.query(since_ms=int(since_ms or 0), until_ms=int(until_ms or 0), event=event, reason=reason, limit=limit)
     return {"ok": True, "rows": rows, "ts": int(time.time() * 1000)}
 
 
+def _record_file(name: Any, default: str) -> str:
+    """File in BOT_RECORD_DIR by name; anything resolving outside it is rejected."""
+    if not BOT_RECORD_DIR:
+        raise HTTPException(status_code=400, detail="BOT_RECORD_DIR not set")
+    root = os.path.realpath(BOT_RECORD_DIR)
+    path = os.path.realpath(os.path.join(root, str(name or default)))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise HTTPException(status_code=400, detail="ticks/snapshots not found")
+    return path
+
+
+@app.post("/api/bot/backtest")
+async def bot_backtest(req: Request, user: dict = Depends(get_user)):
+    """Replay recorded ticks + snapshots through the bot rules.
+
+    body: {"ticks": file, "snapshots": file (names inside BOT_RECORD_DIR; default ticks.csv / snapshots.jsonl),
+           "config": {overrides on the live bot}, "trades": max rows returned}
+    """
+    body = await req.json()
+    ticks = _record_file(body.get("ticks"), "ticks.csv")
+    snaps = _record_file(body.get("snapshots"), "snapshots.jsonl")
+    if _RECORDER is not None:
+        _RECORDER.flush()
+    cfg = {**_bot_inst(str(body.get("bot") or "main")).bot, **dict(body.get("config") or {})}
+    n_trades = max(0, min(5000, int(body.get("trades") or 500)))
+
+    def _run() -> dict:
+        t0 = time.perf_counter()
+        data = MarketData.load(ticks, snaps)
+        load_ms = (time.perf_counter() - t0) * 1000.0
+        res = run_backtest(data, cfg)
+        res["load_ms"] = round(load_ms, 1)
+        return res
+
+    res = await asyncio.to_thread(_run)
+    trades = list(res.pop("trades", []) or [])
+    res["trades_n"] = len(trades)
+    res["trades"] = trades[-n_trades:] if n_trades else []
+    return res
+
+
+@app.post("/api/bot/sweep")
+async def bot_sweep(req: Request, user: dict = Depends(get_user)):
+    """Parameter sweep over recorded data, ranked.
+
+    body: {"ticks", "snapshots" (as /api/bot/backtest), "space": {param: [..] | {min,max,step}},
+           "mode": grid|random|refine, "n", "objective": pnl_usd|pnl_dd|profit_factor|win_rate,
+           "workers" (0 = all cores, capped at the core count), "top", "curve_points", "seed", "config": base overrides}
+    """
+    body = await req.json()
+    ticks = _record_file(body.get("ticks"), "ticks.csv")
+    snaps = _record_file(body.get("snapshots"), "snapshots.jsonl")
+    if _RECORDER is not None:
+        _RECORDER.flush()
+    # only strategy params travel to the workers
+    base = {k: v for k, v in {**_bot_inst(str(body.get("bot") or "main")).bot, **dict(body.get("config") or {})}.items() if k not in ("last_block", "last_action", "last_timing", "expiries")}
+
+    def _run() -> dict:
+        data = MarketData.load(ticks, snaps)
+        return run_sweep(
+            data,
+            base,
+            space=body.get("space") or None,
+            mode=str(body.get("mode") or "grid"),
+            n=int(body.get("n") or 64),
+            objective=str(body.get("objective") or "pnl_usd"),
+            workers=max(0, min(os.cpu_count() or 1, int(body.get("workers") or 0))),
+            top=int(body.get("top") or 50),
+            curve_points=int(body.get("curve_points") or 200),
+            seed=body.get("seed"),
+        )
+
+    res = await asyncio.to_thread(_run)
+    res["params"] = list(SWEEP_PARAMS)
+    return res
+
+
+@app.get("/api/bot/instances")
+def bot_instances(user: dict = Depends(get_user)):
+    return {"ok": True, "instances": [i.summary() for i in _RUNNER.all()], "streams": _RUNNER.streams(), "ts": int(time.time() * 1000)}
+
+
+@app.post("/api/bot/instances")
+async def bot_instance_create(req: Request, user: dict = Depends(get_user)):
+    """body: {"id", "clone": source id (copies its config, not its book), "config": {...} (as /api/bot/config)}. Starts disabled."""
+    body = await req.json()
+    bot_id = str(body.get("id") or "").strip()
+    if not valid_bot_id(bot_id):
+        raise HTTPException(status_code=400, detail="id: 1-32 chars [A-Za-z0-9_-]")
+    if _RUNNER.get(bot_id) is not None:
+        raise HTTPException(status_code=409, detail="bot already exists")
+    bot = copy.deepcopy(_BOT_DEFAULTS)
+    if body.get("clone"):
+        src = _bot_inst(str(body.get("clone")))
+        bot.update({k: copy.deepcopy(v) for k, v in src.bot.items() if k in _BOT_DEFAULTS and not k.startswith("last_")})
+    for k, v in dict(body.get("config") or {}).items():
+        if k in _BOT_DEFAULTS and not k.startswith("last_"):
+            bot[k] = v
+    bot["enabled"] = False
+    bot["currency"] = str(bot.get("currency") or "BTC").upper()
+    inst = _RUNNER.add(_bot_instance_new(bot_id, bot))
+    _paper_load(inst)
+    _bot_save(inst)
+    _bot_instances_save()
+    _bot_audit("CREATED", {"clone": body.get("clone") or None}, inst=inst)
+    return {"ok": True, "id": inst.id, "bot": inst.bot}
+
+
+@app.post("/api/bot/instances/delete")
+async def bot_instance_delete(req: Request, user: dict = Depends(get_user)):
+    """Stops and unregisters an instance; its state file and paper db stay on disk."""
+    body = await req.json()
+    inst = _bot_inst(str(body.get("id") or ""))
+    if inst is _MAIN_BOT:
+        raise HTTPException(status_code=400, detail="main bot cannot be deleted")
+    inst.bot["enabled"] = False
+    async with inst.lock:
+        _RUNNER.remove(inst.id)
+    _bot_save(inst)
+    inst.audit.flush()
+    try:
+        inst.db.close()
+    except Exception:
+        pass
+    _bot_instances_save()
+    return {"ok": True, "id": inst.id}
+
+
 @app.post("/api/bot/toggle")
 async def bot_toggle(req: Request, user: dict = Depends(get_user)):
     body = await req.json()
+    inst = _bot_inst(str(body.get("bot") or "main"))
+    bot = inst.bot
     if "enabled" in body:
-        _BOT["enabled"] = bool(body.get("enabled"))
+        bot["enabled"] = bool(body.get("enabled"))
     if "auto_entry" in body:
-        _BOT["auto_entry"] = bool(body.get("auto_entry"))
-    _BOT["last_action_ms"] = int(time.time() * 1000)
-    _bot_save()
-    return {"ok": True, "bot": _BOT}
+        bot["auto_entry"] = bool(body.get("auto_entry"))
+    bot["last_action_ms"] = _now_ms()
+    _bot_save(inst)
+    _RUNNER.touch()
+    return {"ok": True, "id": inst.id, "bot": bot}
 
 
 @app.post("/api/bot/config")
 async def bot_config(req: Request, user: dict = Depends(get_user)):
     body = await req.json()
-    cur = str(body.get("currency") or _BOT.get("currency") or "BTC").upper()
+    inst = _bot_inst(str(body.get("bot") or "main"))
+    bot = inst.bot
+    cur = str(body.get("currency") or bot.get("currency") or "BTC").upper()
 
     expiries = body.get("expiries") or []
     if not isinstance(expiries, list):
@@ -543,43 +768,44 @@ async def bot_config(req: Request, user: dict = Depends(get_user)):
     expiries = [str(x) for x in expiries if x]
     expiries = sorted(set(expiries))
 
-    _BOT["currency"] = cur
-    _BOT["expiries"] = expiries
+    bot["currency"] = cur
+    bot["expiries"] = expiries
 
     # Core bot params
-    _BOT["strike_range_pct"] = float(body.get("strike_range_pct") or _BOT.get("strike_range_pct") or 8.0)
-    _BOT["walls_n"] = int(body.get("walls_n") or _BOT.get("walls_n") or 18)
-    _BOT["tp_move_pct"] = float(body.get("tp_move_pct") or _BOT.get("tp_move_pct") or 1.5)
-    _BOT["sl_pnl_pct"] = float(body.get("sl_pnl_pct") or _BOT.get("sl_pnl_pct") or -60.0)
-    _BOT["max_positions"] = int(body.get("max_positions") or _BOT.get("max_positions") or 3)
-    _BOT["max_risk_usd"] = float(body.get("max_risk_usd") or _BOT.get("max_risk_usd") or 500.0)
-    _BOT["qty"] = float(body.get("qty") or _BOT.get("qty") or 0.0)
-    _BOT["spot_src"] = str(body.get("spot_src") or _BOT.get("spot_src") or "index")
-    _BOT["cooldown_sec"] = float(body.get("cooldown_sec") or _BOT.get("cooldown_sec") or 15)
+    bot["strike_range_pct"] = float(body.get("strike_range_pct") or bot.get("strike_range_pct") or 8.0)
+    bot["walls_n"] = int(body.get("walls_n") or bot.get("walls_n") or 18)
+    bot["tp_move_pct"] = float(body.get("tp_move_pct") or bot.get("tp_move_pct") or 1.5)
+    bot["sl_pnl_pct"] = float(body.get("sl_pnl_pct") or bot.get("sl_pnl_pct") or -60.0)
+    bot["max_positions"] = int(body.get("max_positions") or bot.get("max_positions") or 3)
+    bot["max_risk_usd"] = float(body.get("max_risk_usd") or bot.get("max_risk_usd") or 500.0)
+    bot["qty"] = float(body.get("qty") or bot.get("qty") or 0.0)
+    bot["spot_src"] = str(body.get("spot_src") or bot.get("spot_src") or "index")
+    bot["cooldown_sec"] = float(body.get("cooldown_sec") or bot.get("cooldown_sec") or 15)
 
     # Operacional / Edge gates
     if "dte_ranges_exec" in body:
-        _BOT["dte_ranges_exec"] = str(body.get("dte_ranges_exec") or "").strip() or _BOT.get("dte_ranges_exec") or "1-2"
+        bot["dte_ranges_exec"] = str(body.get("dte_ranges_exec") or "").strip() or bot.get("dte_ranges_exec") or "1-2"
     if "wall_rank_max" in body:
-        _BOT["wall_rank_max"] = int(body.get("wall_rank_max") or _BOT.get("wall_rank_max") or 8)
+        bot["wall_rank_max"] = int(body.get("wall_rank_max") or bot.get("wall_rank_max") or 8)
     if "near_flip_pct" in body:
-        _BOT["near_flip_pct"] = float(body.get("near_flip_pct") or _BOT.get("near_flip_pct") or 1.2)
+        bot["near_flip_pct"] = float(body.get("near_flip_pct") or bot.get("near_flip_pct") or 1.2)
     if "atr_tf" in body:
-        _BOT["atr_tf"] = str(body.get("atr_tf") or _BOT.get("atr_tf") or "15")
+        bot["atr_tf"] = str(body.get("atr_tf") or bot.get("atr_tf") or "15")
     if "atr_n" in body:
-        _BOT["atr_n"] = int(body.get("atr_n") or _BOT.get("atr_n") or 14)
+        bot["atr_n"] = int(body.get("atr_n") or bot.get("atr_n") or 14)
     if "atr_min_pct" in body:
-        _BOT["atr_min_pct"] = float(body.get("atr_min_pct") or _BOT.get("atr_min_pct") or 0.35)
+        bot["atr_min_pct"] = float(body.get("atr_min_pct") or bot.get("atr_min_pct") or 0.35)
     if "trade_windows_utc" in body:
         tw = body.get("trade_windows_utc") or []
         if not isinstance(tw, list):
             tw = []
-        _BOT["trade_windows_utc"] = [str(x) for x in tw if str(x).strip()]
+        bot["trade_windows_utc"] = [str(x) for x in tw if str(x).strip()]
 
-    _BOT["last_action_ms"] = int(time.time() * 1000)
-    _bot_audit("CONFIG", {"currency": cur, "expiries_n": len(expiries)})
-    _bot_save()
-    return {"ok": True, "bot": _BOT}
+    bot["last_action_ms"] = _now_ms()
+    _bot_audit("CONFIG", {"currency": cur, "expiries_n": len(expiries)}, inst=inst)
+    _bot_save(inst)
+    _RUNNER.touch()
+    return {"ok": True, "id": inst.id, "bot": bot}
 
 
 @app.get("/api/desk/ohlc")
@@ -587,57 +813,50 @@ def desk_ohlc(
     instrument: str = "BTC-PERPETUAL",
     tf: str = "60",
     candles: int = 900,
+    indicators: int = 0,
+    since: float = 0.0,
+    max_points: int = 0,
+    ds: str = "ohlc",
     user: dict = Depends(get_user),
 ):
     """Return OHLC for desk instrument.
 
     For now uses Deribit TradingView chart data for BTC/ETH perpetual.
+    indicators=1 adds the rolling ATR/EMA/RSI/RV snapshot for the same (instrument, tf).
+    since=<t sec> returns only bars with t >= since (the client's forming bar + new ones).
+    max_points=<n> downsamples to at most n points: ds=ohlc (time-aligned min/max
+    buckets, default) or ds=lttb; 0 = full resolution.
     """
     candles = max(120, min(3000, int(candles)))
-
-    client = DeribitPublicClient(timeout=7.0)
-
-    # compute span from candles+tf
-    tf_sec = 60
-    if tf == "1":
-        tf_sec = 60
-    elif tf == "5":
-        tf_sec = 5 * 60
-    elif tf == "15":
-        tf_sec = 15 * 60
-    elif tf == "60":
-        tf_sec = 60 * 60
-    elif tf == "240":
-        tf_sec = 4 * 60 * 60
-    else:
-        tf = "1D"
-        tf_sec = 24 * 60 * 60
-
-    now_ms = int(time.time() * 1000)
-    start_ms = now_ms - int(candles * tf_sec * 1000)
-
-    chart, _ = client.get_tradingview_chart_data(instrument, tf, start_ms, now_ms)
-
-    t = chart.get("ticks") or chart.get("t") or []
-    o = chart.get("open") or chart.get("o") or []
-    h = chart.get("high") or chart.get("h") or []
-    l = chart.get("low") or chart.get("l") or []
-    c = chart.get("close") or chart.get("c") or []
-    v = chart.get("volume") or chart.get("v") or []
-
-    # normalize ms->sec
-    try:
-        if t and float(t[-1]) > 1e11:
-            t = [float(x) / 1000.0 for x in t]
-    except Exception:
-        pass
+    tf = norm_tf(tf)
+
+    # incremental store: only bars since the last closed one are fetched
+    rows = _CANDLES.rows(instrument, tf, candles)
+    bars_per_point = 1
+    if max_points and int(max_points) > 0:
+        rows, bars_per_point = downsample(rows, max(16, int(max_points)), tf_seconds(tf), mode=ds)
+    if since:
+        # applied after downsampling: buckets are time-aligned, so the client's last bucket is re-sent
+        rows = rows[rows[:, 0] >= float(since)]
+    ohlc = rows_to_ohlc(rows)
+
+    ind = None
+    if indicators:
+        try:
+            ind = _INDICATORS.snapshot(instrument, tf)
+        except Exception:
+            ind = None
 
     return {
         "ok": True,
         "instrument": instrument,
         "tf": tf,
         "candles": candles,
-        "ohlc": {"t": t, "o": o, "h": h, "l": l, "c": c, "v": v},
+        "since": since or None,
+        "max_points": int(max_points or 0),
+        "bars_per_point": bars_per_point,
+        "ohlc": ohlc,
+        "indicators": ind,
         "user": user.get("u"),
     }
 
@@ -806,12 +1025,12 @@ def desk_chain(currency: str = "BTC", expiry: str = "", strike_range_pct: float
 _WALLS_CACHE: dict[str, Any] = {}
 
 # -------------------- Paper (server-side) + BOT state --------------------
-PAPER_STATE_PATH = os.environ.get("PAPER_STATE_PATH", "./paper_state.json")
+PAPER_STATE_PATH = os.environ.get("PAPER_STATE_PATH", "./paper_state.json")  # legacy, migrated into the db
+PAPER_DB_PATH = os.environ.get("PAPER_DB_PATH", "./paper_state.db")
 BOT_STATE_PATH = os.environ.get("BOT_STATE_PATH", "./bot_state.json")
 
 _PAPER: dict[str, Any] = {
-    "open": [],  # list[dict]
-    "history": [],  # list[dict]
+    "open": [],  # list[dict]; closed trades live only in _PAPER_DB (history table)
     "ts": int(time.time() * 1000),
 }
 
@@ -847,30 +1066,72 @@ _BOT: dict[str, Any] = {
     "last_action": None,
     "last_block_reason": None,
     "last_block": None,
-    "audit": [],  # últimos eventos
 }
 
-_BOT_TASK: Optional[asyncio.Task] = None
-
-
-def _paper_load():
+_BOT_DEFAULTS = copy.deepcopy(_BOT)  # template for extra instances
+_BOT_TASKS: list[asyncio.Task] = []
+# extra bot instances (ids); each keeps bot_state.<id>.json + paper_state.<id>.db
+BOT_INSTANCES_PATH = os.environ.get("BOT_INSTANCES_PATH", "./bot_instances.json")
+# audit spill: <dir>/<bot id>/audit-YYYY-MM-DD.jsonl.gz; empty -> memory ring only
+BOT_AUDIT_DIR = os.environ.get("BOT_AUDIT_DIR", "./bot_audit")
+BOT_AUDIT_RETENTION_DAYS = int(os.environ.get("BOT_AUDIT_RETENTION_DAYS", "14") or 0)  # 0 -> keep all day files
+# heartbeat blocks (every manage pass) stay in the memory ring only
+BOT_AUDIT_RING_ONLY = [r.strip() for r in os.environ.get("BOT_AUDIT_RING_ONLY", "DISABLED,AUTO_ENTRY_OFF").split(",") if r.strip()]
+
+# spot feed: ws (Deribit WebSocket) | poll (REST) | replay (CSV ts_ms,index,last)
+BOT_SPOT_FEED = os.environ.get("BOT_SPOT_FEED", "ws")
+BOT_SPOT_REPLAY = os.environ.get("BOT_SPOT_REPLAY", "")
+BOT_SPOT_REPLAY_SPEED = float(os.environ.get("BOT_SPOT_REPLAY_SPEED", "0") or 0.0)
+BOT_LEVELS_REFRESH_SEC = float(os.environ.get("BOT_LEVELS_REFRESH_SEC", "10") or 10.0)
+# bot time source: wall | sim (virtual time driven by the replay feed; needs BOT_SPOT_FEED=replay).
+# sim replays spot only: levels, ATR, instruments and quotes stay live (see clock.py)
+BOT_CLOCK = os.environ.get("BOT_CLOCK", "wall").lower()
+_CLOCK: WallClock = SimClock() if (BOT_CLOCK == "sim" and BOT_SPOT_FEED == "replay") else WallClock()
+
+# recording for backtests (ticks.csv + snapshots.jsonl); empty -> off
+BOT_RECORD_DIR = os.environ.get("BOT_RECORD_DIR", "")
+BOT_RECORD_SNAP_SEC = float(os.environ.get("BOT_RECORD_SNAP_SEC", "60") or 60.0)
+
+# memmapped candle cache (warm restarts); empty -> memory only
+CANDLE_CACHE_DIR = os.environ.get("CANDLE_CACHE_DIR", str(HERE / "candle_cache"))
+
+_PAPER_DB = PaperDB(PAPER_DB_PATH)
+_PAPER_REPORT = PaperReport()
+def _bot_audit_log(bot_id: str) -> AuditLog:
+    return AuditLog(
+        os.path.join(BOT_AUDIT_DIR, bot_id) if BOT_AUDIT_DIR else "",
+        retention_days=BOT_AUDIT_RETENTION_DAYS,
+        ring_only=BOT_AUDIT_RING_ONLY,
+    )
+
+
+_MAIN_BOT = BotInstance("main", _BOT, _PAPER, _PAPER_DB, _PAPER_REPORT, BOT_STATE_PATH, _bot_audit_log("main"))  # the globals above
+_MTM = MtmEngine()
+_RECORDER = Recorder(BOT_RECORD_DIR, snap_every_sec=BOT_RECORD_SNAP_SEC) if BOT_RECORD_DIR else None
+_CANDLES = CandleStore(DeribitPublicClient(timeout=7.0), data_dir=CANDLE_CACHE_DIR or None)  # tail-only OHLC per (instrument, tf)
+_ALT_CANDLES = CandleStore(fetcher=binance_kline_rows, min_refresh_sec=5.0, resample="warm")  # Binance spot: native first load, resampled once a 1m base is warm
+_INDICATORS = IndicatorService(_CANDLES)  # rolling ATR/EMA/RSI/RV per (instrument, tf), shared by bot + desk
+
+
+def _paper_load(inst: BotInstance | None = None):
+    inst = inst or _MAIN_BOT
     try:
-        if not os.path.exists(PAPER_STATE_PATH):
-            return
-        with open(PAPER_STATE_PATH, "r", encoding="utf-8") as f:
-            obj = json.load(f) or {}
-        if isinstance(obj, dict):
-            _PAPER["open"] = list(obj.get("open") or [])
-            _PAPER["history"] = list(obj.get("history") or [])
+        inst.db.open()
+        if inst is _MAIN_BOT:
+            inst.db.migrate_json(PAPER_STATE_PATH)
+        inst.paper["open"] = inst.db.load_open()
+        inst.report.rebuild(inst.db.iter_history())
     except Exception:
         pass
 
 
-def _bot_load():
+def _bot_load(inst: BotInstance | None = None):
+    inst = inst or _MAIN_BOT
+    bot = inst.bot
     try:
-        if not os.path.exists(BOT_STATE_PATH):
+        if not os.path.exists(inst.state_path):
             return
-        with open(BOT_STATE_PATH, "r", encoding="utf-8") as f:
+        with open(inst.state_path, "r", encoding="utf-8") as f:
             obj = json.load(f) or {}
         if not isinstance(obj, dict):
             return
@@ -900,79 +1161,92 @@ def _bot_load():
         }
         for k in allow:
             if k in obj:
-                _BOT[k] = obj[k]
+                bot[k] = obj[k]
 
         # normalize types
-        _BOT["enabled"] = bool(_BOT.get("enabled"))
-        _BOT["auto_entry"] = bool(_BOT.get("auto_entry"))
-        _BOT["currency"] = str(_BOT.get("currency") or "BTC").upper()
-        ex = _BOT.get("expiries") or []
+        bot["enabled"] = bool(bot.get("enabled"))
+        bot["auto_entry"] = bool(bot.get("auto_entry"))
+        bot["currency"] = str(bot.get("currency") or "BTC").upper()
+        ex = bot.get("expiries") or []
         if not isinstance(ex, list):
             ex = []
-        _BOT["expiries"] = sorted({str(x) for x in ex if x})
+        bot["expiries"] = sorted({str(x) for x in ex if x})
 
     except Exception:
         pass
 
 
-def _bot_save():
+def _bot_save(inst: BotInstance | None = None):
+    inst = inst or _MAIN_BOT
+    bot = inst.bot
     try:
         obj = {
-            "enabled": bool(_BOT.get("enabled")),
-            "auto_entry": bool(_BOT.get("auto_entry")),
-            "currency": str(_BOT.get("currency") or "BTC").upper(),
-            "expiries": list(_BOT.get("expiries") or []),
-            "strike_range_pct": float(_BOT.get("strike_range_pct") or 8.0),
-            "walls_n": int(_BOT.get("walls_n") or 18),
-            "tp_move_pct": float(_BOT.get("tp_move_pct") or 1.5),
-            "sl_pnl_pct": float(_BOT.get("sl_pnl_pct") or -60.0),
-            "max_positions": int(_BOT.get("max_positions") or 3),
-            "max_risk_usd": float(_BOT.get("max_risk_usd") or 500.0),
-            "qty": float(_BOT.get("qty") or 0.0),
-            "spot_src": str(_BOT.get("spot_src") or "index"),
-            "cooldown_sec": float(_BOT.get("cooldown_sec") or 15),
-            "dte_ranges_exec": str(_BOT.get("dte_ranges_exec") or "1-2"),
-            "wall_rank_max": int(_BOT.get("wall_rank_max") or 8),
-            "near_flip_pct": float(_BOT.get("near_flip_pct") or 1.2),
-            "atr_tf": str(_BOT.get("atr_tf") or "15"),
-            "atr_n": int(_BOT.get("atr_n") or 14),
-            "atr_min_pct": float(_BOT.get("atr_min_pct") or 0.35),
-            "trade_windows_utc": list(_BOT.get("trade_windows_utc") or []),
+            "enabled": bool(bot.get("enabled")),
+            "auto_entry": bool(bot.get("auto_entry")),
+            "currency": str(bot.get("currency") or "BTC").upper(),
+            "expiries": list(bot.get("expiries") or []),
+            "strike_range_pct": float(bot.get("strike_range_pct") or 8.0),
+            "walls_n": int(bot.get("walls_n") or 18),
+            "tp_move_pct": float(bot.get("tp_move_pct") or 1.5),
+            "sl_pnl_pct": float(bot.get("sl_pnl_pct") or -60.0),
+            "max_positions": int(bot.get("max_positions") or 3),
+            "max_risk_usd": float(bot.get("max_risk_usd") or 500.0),
+            "qty": float(bot.get("qty") or 0.0),
+            "spot_src": str(bot.get("spot_src") or "index"),
+            "cooldown_sec": float(bot.get("cooldown_sec") or 15),
+            "dte_ranges_exec": str(bot.get("dte_ranges_exec") or "1-2"),
+            "wall_rank_max": int(bot.get("wall_rank_max") or 8),
+            "near_flip_pct": float(bot.get("near_flip_pct") or 1.2),
+            "atr_tf": str(bot.get("atr_tf") or "15"),
+            "atr_n": int(bot.get("atr_n") or 14),
+            "atr_min_pct": float(bot.get("atr_min_pct") or 0.35),
+            "trade_windows_utc": list(bot.get("trade_windows_utc") or []),
             "ts": int(time.time() * 1000),
         }
-        with open(BOT_STATE_PATH, "w", encoding="utf-8") as f:
+        with open(inst.state_path, "w", encoding="utf-8") as f:
             json.dump(obj, f)
     except Exception:
         pass
 
 
-def _paper_save():
+def _paper_add_open(trade: dict, inst: BotInstance | None = None):
+    inst = inst or _MAIN_BOT
+    inst.paper["open"] = [trade] + list(inst.paper.get("open") or [])
+    inst.paper["ts"] = _now_ms()
     try:
-        obj = {"open": _PAPER.get("open") or [], "history": _PAPER.get("history") or [], "ts": int(time.time() * 1000)}
-        with open(PAPER_STATE_PATH, "w", encoding="utf-8") as f:
-            json.dump(obj, f)
+        inst.db.put_open(trade)
+    except Exception:
+        pass
+
+
+def _paper_record_close(closed: dict, inst: BotInstance | None = None):
+    """Caller already removed the trade from inst.paper["open"]."""
+    inst = inst or _MAIN_BOT
+    inst.paper["ts"] = _now_ms()
+    inst.report.add(closed)
+    try:
+        inst.db.close_trade(closed)
     except Exception:
         pass
 
 
-def _bot_audit(event: str, data: dict | None = None):
-    """Append evento de auditoria em memória (para UI/diagnóstico)."""
+def _bot_audit(event: str, data: dict | None = None, inst: BotInstance | None = None):
+    """Append evento de auditoria: ring em memória (UI) + spill gzip JSONL por dia, com retenção (ver audit_log.py)."""
+    inst = inst or _MAIN_BOT
     try:
-        now = int(time.time() * 1000)
-        rec = {"ts": now, "event": str(event), **(data or {})}
-        _BOT["last_touch_ms"] = now
-        _BOT.setdefault("audit", [])
-        _BOT["audit"].insert(0, rec)
-        _BOT["audit"] = (_BOT.get("audit") or [])[:200]
+        now = _now_ms()
+        inst.bot["last_touch_ms"] = now
+        inst.audit.append({"ts": now, "event": str(event), **(data or {})})
     except Exception:
         pass
 
 
-def _bot_block(reason: str, data: dict | None = None):
+def _bot_block(reason: str, data: dict | None = None, inst: BotInstance | None = None):
+    bot = (inst or _MAIN_BOT).bot
     try:
-        _BOT["last_block_reason"] = str(reason)
-        _BOT["last_block"] = {"ts": int(time.time() * 1000), "reason": str(reason), **(data or {})}
-        _bot_audit("BLOCK", {"reason": str(reason), **(data or {})})
+        bot["last_block_reason"] = str(reason)
+        bot["last_block"] = {"ts": _now_ms(), "reason": str(reason), **(data or {})}
+        _bot_audit("BLOCK", {"reason": str(reason), **(data or {})}, inst=inst)
     except Exception:
         pass
 
@@ -1291,7 +1565,8 @@ def alt_ohlc(symbol: str = "SOLUSDT", tf: str = "15", candles: int = 300, user:
     candles = max(120, min(1500, int(candles)))
     sym = (symbol or "SOLUSDT").upper().strip()
     try:
-        ohlc = binance_klines(symbol=sym, tf=tf, limit=candles)
+        # first load is one native request; higher TFs come from the 1m base only once it is warm
+        ohlc = _ALT_CANDLES.ohlc(sym, tf, candles)
         return {"ok": True, "exchange": "binance", "symbol": sym, "tf": tf, "candles": candles, "ohlc": ohlc}
     except Exception as e1:
         # fallback to Bybit spot
@@ -1388,7 +1663,7 @@ async def any_exc(_, exc: Exception):
 # -------------------- BOT background loop --------------------
 
 def _now_ms() -> int:
-    return int(time.time() * 1000)
+    return _CLOCK.now_ms()
 
 
 def _spot_from_ticker(tkr: dict, src: str = "index") -> float:
@@ -1400,16 +1675,6 @@ def _spot_from_ticker(tkr: dict, src: str = "index") -> float:
         return 0.0
 
 
-def _touched(prev_s: float, s: float, k: float, eps: float) -> bool:
-    try:
-        if abs(s - k) <= eps:
-            return True
-        # cross
-        return (prev_s - k) * (s - k) <= 0
-    except Exception:
-        return False
-
-
 def _compute_walls_for_expiries(currency: str, expiries: list[str], strike_range_pct: float, walls_n: int) -> list[float]:
     # Combine strike nets across expiries (simple sum) and rank by abs(gex).
     agg: dict[float, float] = {}
@@ -1442,35 +1707,11 @@ def _open_trade_exists(currency: str, expiry: str, strike: float) -> bool:
     return False
 
 
-def _parse_ranges(s: str) -> list[tuple[int, int]]:
-    ranges: list[tuple[int, int]] = []
-    try:
-        s2 = (s or "").strip()
-        if s2:
-            for part in s2.split(","):
-                part = part.strip()
-                if not part:
-                    continue
-                if "-" in part:
-                    a, b = part.split("-", 1)
-                    ranges.append((int(float(a)), int(float(b))))
-                else:
-                    v = int(float(part))
-                    ranges.append((v, v))
-    except Exception:
-        ranges = []
-    return ranges
-
-
 def _pick_expiries_by_dte(currency: str, dte_ranges: str, max_n: int = 2) -> list[str]:
     """Pick next expiries matching a DTE range string like '1-2' (days)."""
     try:
-        max_n = max(1, min(8, int(max_n)))
-        ranges = _parse_ranges(dte_ranges)
-        if not ranges:
-            ranges = [(1, 2)]
-        inst = deribit_get("/public/get_instruments", {"currency": currency, "kind": "option", "expired": "false"}) or []
-        now_ms = int(time.time() * 1000)
+        inst = _option_instruments(currency)
+        now_ms = _now_ms()
         exp_ts: dict[str, int] = {}
         for x in inst:
             try:
@@ -1483,391 +1724,514 @@ def _pick_expiries_by_dte(currency: str, dte_ranges: str, max_n: int = 2) -> lis
                 exp_ts[ex] = min(int(exp_ts.get(ex) or ts), ts)
             except Exception:
                 continue
-        expiries = sorted(exp_ts.items(), key=lambda kv: kv[1])
-        out: list[str] = []
-        for ex, ts in expiries:
-            dte = int(round((ts - now_ms) / (24 * 3600 * 1000)))
-            ok = False
-            for a, b in ranges:
-                if dte >= a and dte <= b:
-                    ok = True
-                    break
-            if ok:
-                out.append(ex)
-            if len(out) >= max_n:
-                break
-        return out
+        return pick_expiries_by_dte(exp_ts, dte_ranges, now_ms, max_n=max_n)
     except Exception:
         return []
 
 
 def _in_trade_window_utc(windows: list[str] | None) -> bool:
     """windows: ['HH:MM-HH:MM', ...] in UTC. Empty => always."""
-    try:
-        if not windows:
-            return True
-        now = datetime.datetime.utcnow().time()
-        for w in windows:
-            ww = str(w or "").strip()
-            if not ww or "-" not in ww:
-                continue
-            a, b = ww.split("-", 1)
-            ah, am = [int(x) for x in a.strip().split(":")]
-            bh, bm = [int(x) for x in b.strip().split(":")]
-            ta = datetime.time(hour=ah, minute=am)
-            tb = datetime.time(hour=bh, minute=bm)
-            if ta <= tb:
-                if now >= ta and now <= tb:
-                    return True
-            else:
-                # wraps midnight
-                if now >= ta or now <= tb:
-                    return True
-        return False
-    except Exception:
-        return True
+    return in_trade_window(windows, _CLOCK.utcnow().time())
 
 
 def _atr_pct_for_perp(currency: str, tf: str, n: int) -> float | None:
+    # rolling ATR from the shared indicator service (tail-only candle fetch, O(1) per new bar)
     try:
         n = max(5, min(100, int(n)))
-        instrument = f"{currency}-PERPETUAL"
-        client = DeribitPublicClient(timeout=7.0)
-        # reuse logic similar to desk_ohlc
-        tf_sec = 60
-        if tf == "1":
-            tf_sec = 60
-        elif tf == "5":
-            tf_sec = 5 * 60
-        elif tf == "15":
-            tf_sec = 15 * 60
-        elif tf == "60":
-            tf_sec = 60 * 60
-        elif tf == "240":
-            tf_sec = 4 * 60 * 60
-        else:
-            tf = "1D"
-            tf_sec = 24 * 60 * 60
-        candles = max(120, n + 50)
-        now_ms = int(time.time() * 1000)
-        start_ms = now_ms - int(candles * tf_sec * 1000)
-        chart, _ = client.get_tradingview_chart_data(instrument, tf, start_ms, now_ms)
-        h = chart.get("high") or chart.get("h") or []
-        l = chart.get("low") or chart.get("l") or []
-        c = chart.get("close") or chart.get("c") or []
-        if len(c) < n + 2:
-            return None
-        # compute TR
-        tr: list[float] = []
-        for i in range(1, len(c)):
-            hi = float(h[i] or 0.0)
-            lo = float(l[i] or 0.0)
-            pc = float(c[i - 1] or 0.0)
-            tr.append(max(hi - lo, abs(hi - pc), abs(lo - pc)))
-        if len(tr) < n:
-            return None
-        atr = sum(tr[-n:]) / float(n)
-        last = float(c[-1] or 0.0)
-        if last <= 0:
-            return None
-        return (atr / last) * 100.0
+        snap = _INDICATORS.snapshot(f"{currency}-PERPETUAL", tf, atr_n=n)
+        atr_pct = snap.get("atr_pct")
+        return float(atr_pct) if atr_pct is not None and atr_pct > 0 else None
     except Exception:
         return None
 
 
-async def _bot_loop():
-    while True:
-        await asyncio.sleep(2.0)
+def _bot_refresh_levels(inst: BotInstance, cur: str):
+    """Rebuild the sorted wall-level index the tick handler checks against."""
+    bot = inst.bot
+    dte_ranges_exec = str(bot.get("dte_ranges_exec") or "1-2")
+    walls_resp = desk_walls(currency=cur, mode="all", strike_range_pct=float(bot.get("strike_range_pct") or 8.0), dte_ranges=dte_ranges_exec, max_expiries=0, expiries_csv="", user={"u": "bot"})
+    walls_list = list((walls_resp or {}).get("walls") or [])
+    if _RECORDER is not None and _RECORDER.snapshot_due():
+        _bot_record_snapshot(cur, walls_list, float((walls_resp or {}).get("flip") or 0.0))
+
+    # wall_rank_max: only keep top-N walls
+    wall_rank_max = int(bot.get("wall_rank_max") or 8)
+    walls_list = walls_list[: max(1, min(24, wall_rank_max))]
+    walls = [float(w.get("strike") or 0.0) for w in walls_list if float(w.get("strike") or 0.0) > 0]
+    if not walls:
+        inst.levels.pop(cur, None)
+        _bot_block("NO_WALLS", inst=inst)
+        return
+    inst.levels[cur] = LevelIndex(walls, flip=float((walls_resp or {}).get("flip") or 0.0))
+
+
+def _bot_record_snapshot(cur: str, walls_list: list[dict], flip: float):
+    """Ranked walls (all 24, so wall_rank_max can be swept) + near-expiry marks for those strikes."""
+    try:
+        walls = [float(w.get("strike") or 0.0) for w in walls_list if float(w.get("strike") or 0.0) > 0]
+        rows, _ = DeribitPublicClient(timeout=8.0).get_book_summary_by_currency(currency=cur, kind="option")
+        rec = snapshot_record(_now_ms(), cur, walls, flip, _option_instruments(cur), rows or [], _expiry_str_from_ts_ms)
+        _RECORDER.snapshot(rec)
+    except Exception:
+        pass
+
+
+def _bot_manage_open(inst: BotInstance, s_now: float):
+    """Manage ALL open trades: TP/SL only (no forced close on touching new wall; strategy accumulates)."""
+    bot = inst.bot
+    opens = list(inst.paper.get("open") or [])
+    if not opens:
+        return
+    pos = (_MTM.snapshot(opens, spot_src=str(bot.get("spot_src") or "index")).get("positions") or {})
+    still_open: list[dict] = []
+    closed_now: list[dict] = []
+    for t in opens:
         try:
-            _BOT["last_touch_ms"] = int(time.time() * 1000)
-            if not _BOT.get("enabled"):
-                _bot_block("DISABLED")
+            p = pos.get(str(t.get("id")))
+            if not p:
+                still_open.append(t)
                 continue
-
-            cur = str(_BOT.get("currency") or "BTC").upper()
-            expiries = list(_BOT.get("expiries") or [])
-            if not expiries:
-                _bot_block("NO_EXPIRIES")
+            entry_spot = float(t.get("entry_spot") or 0.0) or s_now
+            value = float(p["value_usd"])
+            pnl = float(p["pnl_usd"])
+            pnl_pct = float(p["pnl_pct"])
+
+            # Stop first, then TP (spot move)
+            reason = exit_reason(pnl_pct, move_pct(s_now, entry_spot), float(bot.get("sl_pnl_pct") or -60.0), float(bot.get("tp_move_pct") or 1.5))
+            if reason is None:
+                still_open.append(t)
                 continue
+            t["close_reason"] = reason
+
+            t["closed_ts"] = _now_ms()
+            t["exit_spot"] = s_now
+            t["exit_value_usd"] = value
+            t["pnl_usd"] = pnl
+            t["pnl_pct"] = pnl_pct
+            closed_now.append(t)
+        except Exception:
+            still_open.append(t)
 
-            perp = f"{cur}-PERPETUAL"
-            tkr, _ = DeribitPublicClient(timeout=6.0).get_ticker(perp)
-            s_now = _spot_from_ticker(tkr or {}, src=str(_BOT.get("spot_src") or "index"))
-            s_last = float((tkr or {}).get("last_price") or 0.0)
-            s_index = float((tkr or {}).get("index_price") or 0.0)
-            if not s_now:
-                _bot_block("NO_SPOT", {"perp": perp})
-                continue
+    if closed_now:
+        inst.paper["open"] = still_open
+        for t in closed_now:
+            _paper_record_close(t, inst)
 
-            prev = float(_BOT.get("last_spot") or s_now)
-            _BOT["last_spot"] = float(s_now)
-
-            # Manage ALL open trades: TP/SL only (no forced close on touching new wall; strategy accumulates)
-            opens = list(_PAPER.get("open") or [])
-            if opens:
-                client = DeribitPublicClient(timeout=6.0)
-                still_open: list[dict] = []
-                for t in opens:
-                    try:
-                        entry_spot = float(t.get("entry_spot") or 0.0) or s_now
-                        move_pct = abs(s_now / entry_spot - 1.0) * 100.0 if entry_spot else 0.0
-                        cn = str(t.get("callName") or "")
-                        pn = str(t.get("putName") or "")
-                        ct = {}
-                        pt2 = {}
-                        if cn:
-                            ct, _ = client.get_ticker(cn)
-                        if pn:
-                            pt2, _ = client.get_ticker(pn)
-                        qty = float(t.get("qty") or 1.0)
-                        call_usd = float((ct.get("mark_price") or 0.0)) * s_now * qty
-                        put_usd = float((pt2.get("mark_price") or 0.0)) * s_now * qty
-                        value = call_usd + put_usd
-                        cost = float(t.get("entry_cost_usd") or 0.0)
-                        pnl = value - cost
-                        pnl_pct = (pnl / cost * 100.0) if cost else 0.0
-
-                        # Stop
-                        if pnl_pct <= float(_BOT.get("sl_pnl_pct") or -60.0):
-                            t["close_reason"] = "STOP_PNL"
-                            t["closed_ts"] = _now_ms()
-                            t["exit_spot"] = s_now
-                            t["exit_value_usd"] = value
-                            t["pnl_usd"] = pnl
-                            t["pnl_pct"] = pnl_pct
-                            _PAPER.setdefault("history", []).insert(0, t)
-                            continue
-
-                        # TP
-                        if move_pct >= float(_BOT.get("tp_move_pct") or 1.5):
-                            t["close_reason"] = "TP_MOVE"
-                            t["closed_ts"] = _now_ms()
-                            t["exit_spot"] = s_now
-                            t["exit_value_usd"] = value
-                            t["pnl_usd"] = pnl
-                            t["pnl_pct"] = pnl_pct
-                            _PAPER.setdefault("history", []).insert(0, t)
-                            continue
-
-                        still_open.append(t)
-                    except Exception:
-                        still_open.append(t)
-
-                _PAPER["open"] = still_open
-                _PAPER["history"] = (_PAPER.get("history") or [])[:2000]
-                _paper_save()
-
-            # Entry
-            if not _BOT.get("auto_entry"):
-                _bot_block("AUTO_ENTRY_OFF")
-                continue
 
-            # Trade window gate (UTC)
-            if not _in_trade_window_utc(list(_BOT.get("trade_windows_utc") or [])):
-                _bot_block("OUT_OF_WINDOW")
+def _tp_reached(inst: BotInstance, s_now: float) -> bool:
+    """Cheap per-tick check (no HTTP): has any open trade reached its TP move?"""
+    tp = float(inst.bot.get("tp_move_pct") or 1.5)
+    for t in (inst.paper.get("open") or []):
+        try:
+            entry_spot = float(t.get("entry_spot") or 0.0)
+            if entry_spot and move_pct(s_now, entry_spot) >= tp:
+                return True
+        except Exception:
+            continue
+    return False
+
+
+def _option_instruments(currency: str) -> list[dict]:
+    """get_instruments(kind=option), cached: it changes a few times per day."""
+    key = f"instruments:{currency}:option"
+    cached = _cache_get(key)
+    if cached:
+        return cached
+    inst = deribit_get("/public/get_instruments", {"currency": currency, "kind": "option", "expired": "false"}) or []
+    _cache_set(key, inst, ttl=120.0)
+    return inst
+
+
+def _bot_chain(cur: str, expiry: str, strike_range_pct: float) -> dict:
+    """desk_chain for the entry stage, cached briefly so instances touching the same wall share one fetch."""
+    key = f"bot_chain:{cur}:{expiry}:{strike_range_pct}"
+    cached = _cache_get(key)
+    if cached:
+        return cached
+    ch = desk_chain(currency=cur, expiry=expiry, strike_range_pct=strike_range_pct, user={"u": "bot"})
+    _cache_set(key, ch, ttl=2.0)
+    return ch
+
+
+# -------------------- BOT entry pipeline (cheap gates first) --------------------
+def _open_risk(book: dict) -> tuple[int, float]:
+    open_list = list(book.get("open") or [])
+    total_risk = 0.0
+    for tt in open_list:
+        try:
+            total_risk += float(tt.get("entry_cost_usd") or 0.0)
+        except Exception:
+            pass
+    return len(open_list), total_risk
+
+
+def _gate_window(ctx: dict):
+    # Trade window gate (UTC)
+    if not _in_trade_window_utc(list(ctx["bot"].get("trade_windows_utc") or [])):
+        return ("OUT_OF_WINDOW", {})
+    return None
+
+
+def _gate_cooldown(ctx: dict):
+    bot = ctx["bot"]
+    if not cooldown_ok(float(bot.get("last_action_ms") or 0), float(bot.get("cooldown_sec") or 15), _now_ms()):
+        return ("COOLDOWN", {})
+    return None
+
+
+def _gate_max_positions(ctx: dict):
+    n_open, _ = _open_risk(ctx["book"])
+    if n_open >= int(ctx["bot"].get("max_positions") or 3):
+        return ("MAX_POSITIONS", {"open": n_open})
+    return None
+
+
+def _gate_max_risk(ctx: dict):
+    _, total_risk = _open_risk(ctx["book"])
+    max_risk = float(ctx["bot"].get("max_risk_usd") or 500.0)
+    if total_risk >= max_risk:
+        return ("MAX_RISK", {"risk": total_risk, "max": max_risk})
+    return None
+
+
+def _gate_near_flip(ctx: dict):
+    s_now = float(ctx["s_now"])
+    flip = float(ctx["levels"].flip or 0.0)
+    near_flip_pct = float(ctx["bot"].get("near_flip_pct") or 0.0)
+    blk = near_flip_block(s_now, flip, near_flip_pct)
+    if blk is not None:
+        return ("FAR_FROM_FLIP", blk)
+    return None
+
+
+def _gate_atr(ctx: dict):
+    # ATR gate (perp)
+    bot = ctx["bot"]
+    atr_tf = str(bot.get("atr_tf") or "15")
+    atr_n = int(bot.get("atr_n") or 14)
+    atr_min_pct = float(bot.get("atr_min_pct") or 0.0)
+    if atr_min_pct > 0:
+        atr_pct = _atr_pct_for_perp(ctx["cur"], atr_tf, atr_n)
+        reason = atr_block(atr_pct, atr_min_pct)
+        if reason == "ATR_UNAVAILABLE":
+            return (reason, {})
+        if reason:
+            return (reason, {"atr_pct": float(atr_pct), "min": float(atr_min_pct), "tf": atr_tf, "n": atr_n})
+    return None
+
+
+def _stage_expiries_exec(ctx: dict):
+    # Expiries to execute (D1+D2 by DTE ranges)
+    bot = ctx["bot"]
+    expiries = list(bot.get("expiries") or [])
+    dte_ranges_exec = str(bot.get("dte_ranges_exec") or "1-2")
+    ctx["expiries_exec"] = _pick_expiries_by_dte(ctx["cur"], dte_ranges_exec, max_n=2) or list(expiries[:2])
+    if not ctx["expiries_exec"]:
+        return ("NO_EXPIRIES_EXEC", {})
+    return None
+
+
+def _stage_execute(ctx: dict):
+    inst = ctx["inst"]
+    bot = ctx["bot"]
+    cur = ctx["cur"]
+    k0 = float(ctx["k0"])
+    s_now = float(ctx["s_now"])
+    expiries = list(bot.get("expiries") or [])
+    expiries_exec = list(ctx.get("expiries_exec") or expiries[:2])
+    max_risk = float(bot.get("max_risk_usd") or 500.0)
+    opened_any = False
+
+    for idx, expiry_exec in enumerate(expiries_exec):
+        try:
+            # Capacity check (we may open up to 2 positions)
+            open_list = list(ctx["book"].get("open") or [])
+            n_open, total_risk = _open_risk(ctx["book"])
+            if n_open >= int(bot.get("max_positions") or 3):
+                _bot_block("MAX_POSITIONS", {"open": n_open}, inst=inst)
+                break
+            if total_risk >= max_risk:
+                _bot_block("MAX_RISK", {"risk": total_risk, "max": max_risk}, inst=inst)
+                break
+
+            # Do not re-enter same strike+expiry
+            if any(str(tt.get("expiry")) == str(expiry_exec) and float(tt.get("strike") or 0.0) == k0 for tt in open_list):
+                _bot_block("DUP_STRIKE", {"expiry": expiry_exec, "strike": k0}, inst=inst)
                 continue
 
-            if not ((time.time() * 1000) - float(_BOT.get("last_action_ms") or 0) >= float(_BOT.get("cooldown_sec") or 15) * 1000.0):
-                _bot_block("COOLDOWN")
+            # Resolve instruments from chain for this expiry
+            ch = _bot_chain(cur, expiry_exec, float(bot.get("strike_range_pct") or 8.0))
+            row = None
+            for rr in (ch.get("per_strike") or []):
+                if float(rr.get("strike") or 0.0) == k0:
+                    row = rr
+                    break
+            if not row:
+                _bot_block("NO_CHAIN_ROW", {"expiry": expiry_exec, "strike": k0}, inst=inst)
                 continue
 
-            # Build walls using DTE ranges (D1+D2 by default) + wall rank
-            dte_ranges_exec = str(_BOT.get("dte_ranges_exec") or "1-2")
-            walls_resp = desk_walls(currency=cur, mode="all", strike_range_pct=float(_BOT.get("strike_range_pct") or 8.0), dte_ranges=dte_ranges_exec, max_expiries=0, expiries_csv="", user={"u": "bot"})
-            walls_list = list((walls_resp or {}).get("walls") or [])
-            if not walls_list:
-                _bot_block("NO_WALLS")
+            call = (row.get("call") or {})
+            put = (row.get("put") or {})
+            call_name = str(call.get("instrument_name") or "")
+            put_name = str(put.get("instrument_name") or "")
+            if not call_name or not put_name:
+                _bot_block("NO_INSTRUMENTS", {"expiry": expiry_exec, "strike": k0}, inst=inst)
                 continue
 
-            # wall_rank_max: only keep top-N walls
-            wall_rank_max = int(_BOT.get("wall_rank_max") or 8)
-            walls_list = walls_list[: max(1, min(24, wall_rank_max))]
-            walls = [float(w.get("strike") or 0.0) for w in walls_list if float(w.get("strike") or 0.0) > 0]
-            if not walls:
-                _bot_block("NO_WALLS")
+            qty = float(bot.get("qty") or 0.0) or 1.0
+
+            ask_call = float(call.get("ask_price") or 0.0)
+            ask_put = float(put.get("ask_price") or 0.0)
+            mid_call = float(call.get("bid_price") or 0.0) * 0.5 + float(call.get("ask_price") or 0.0) * 0.5
+            mid_put = float(put.get("bid_price") or 0.0) * 0.5 + float(put.get("ask_price") or 0.0) * 0.5
+            mark_call = float(call.get("mark_price") or 0.0)
+            mark_put = float(put.get("mark_price") or 0.0)
+
+            entry_cost_ask = (ask_call + ask_put) * s_now * qty
+            entry_cost_mid = (mid_call + mid_put) * s_now * qty
+            entry_cost_mark = (mark_call + mark_put) * s_now * qty
+
+            # If this trade would exceed max risk, skip
+            if (total_risk + float(entry_cost_ask)) > max_risk:
+                _bot_block(
+                    "RISK_WOULD_EXCEED",
+                    {"risk": total_risk, "entry_cost": float(entry_cost_ask), "max": max_risk, "expiry": expiry_exec},
+                    inst=inst,
+                )
                 continue
 
-            flip = float((walls_resp or {}).get("flip") or 0.0)
-            near_flip_pct = float(_BOT.get("near_flip_pct") or 0.0)
-            if flip and near_flip_pct and s_now:
-                dist_pct = abs(float(s_now) - float(flip)) / float(s_now) * 100.0
-                if dist_pct > near_flip_pct:
-                    _bot_block("FAR_FROM_FLIP", {"dist_pct": dist_pct, "near_flip_pct": near_flip_pct, "flip": flip})
-                    continue
+            trade = {
+                "id": f"bot-{_now_ms()}-{idx+1}" if inst is _MAIN_BOT else f"bot-{inst.id}-{_now_ms()}-{idx+1}",
+                "src": "BOT",
+                "bot": inst.id,
+                "setup": "WALL_TOUCH_STRADDLE",
+                "currency": cur,
+                "expiry": expiry_exec,
+                "expiries_used": expiries,
+                "strike": k0,
+                "qty": qty,
+                "entry_ts": _now_ms(),
+                "entry_spot": s_now,
+                "entry_spot_index": float(ctx.get("s_index") or 0.0),
+                "entry_spot_last": float(ctx.get("s_last") or 0.0),
+                "callName": call_name,
+                "putName": put_name,
+                "entry_cost_usd": float(entry_cost_ask),
+                "entry_cost_ask": float(entry_cost_ask),
+                "entry_cost_mid": float(entry_cost_mid),
+                "entry_cost_mark": float(entry_cost_mark),
+                "entry_call": {"bid": float(call.get("bid_price") or 0.0), "ask": ask_call, "mark": mark_call, "iv": float(call.get("mark_iv") or 0.0)},
+                "entry_put": {"bid": float(put.get("bid_price") or 0.0), "ask": ask_put, "mark": mark_put, "iv": float(put.get("mark_iv") or 0.0)},
+            }
 
-            # ATR gate (perp)
-            atr_tf = str(_BOT.get("atr_tf") or "15")
-            atr_n = int(_BOT.get("atr_n") or 14)
-            atr_min_pct = float(_BOT.get("atr_min_pct") or 0.0)
-            if atr_min_pct > 0:
-                atr_pct = _atr_pct_for_perp(cur, atr_tf, atr_n)
-                if atr_pct is None:
-                    _bot_block("ATR_UNAVAILABLE")
-                    continue
-                if float(atr_pct) < float(atr_min_pct):
-                    _bot_block("ATR_TOO_LOW", {"atr_pct": float(atr_pct), "min": float(atr_min_pct), "tf": atr_tf, "n": atr_n})
-                    continue
+            _paper_add_open(trade, inst)
+            opened_any = True
+            bot["last_action"] = "ENTRY_OPEN"
+            _bot_audit("ENTRY_OPEN", {"currency": cur, "expiry": expiry_exec, "strike": k0, "cost": float(entry_cost_ask)}, inst=inst)
 
-            eps = max(1.0, float(s_now) * 0.00005)
-            touched = [k for k in walls if _touched(prev, s_now, float(k), eps)]
-            if not touched:
-                _bot_block("NO_TOUCH", {"prev": prev, "now": s_now, "eps": eps, "walls_n": len(walls)})
-                continue
-            k0 = min(touched, key=lambda kk: abs(float(kk) - float(s_now)))
+        except Exception:
+            continue
 
-            # Expiries to execute (D1+D2 by DTE ranges)
-            expiries_exec = _pick_expiries_by_dte(cur, dte_ranges_exec, max_n=2) or list(expiries[:2])
-            if not expiries_exec:
-                _bot_block("NO_EXPIRIES_EXEC")
-                continue
+    if not opened_any:
+        return ("NO_ENTRY_EXECUTED", {"strike": k0, "expiries": expiries_exec})
+    bot["last_action_ms"] = _now_ms()
+    return None
+
+
+_ENTRY_PIPELINE = Pipeline([
+    Stage("window", CHEAP, _gate_window),
+    Stage("cooldown", CHEAP, _gate_cooldown),
+    Stage("max_positions", CHEAP, _gate_max_positions),
+    Stage("max_risk", CHEAP, _gate_max_risk),
+    Stage("near_flip", CHEAP, _gate_near_flip),
+    Stage("atr", IO, _gate_atr),
+    Stage("expiries_exec", IO, _stage_expiries_exec),
+    Stage("execute", HEAVY, _stage_execute),
+])
+
+
+def _bot_try_entry(inst: BotInstance, cur: str, k0: float, s_now: float, s_index: float, s_last: float, levels: LevelIndex):
+    """Run the entry pipeline for a touched wall k0 (off the event loop)."""
+    ctx = {"inst": inst, "bot": inst.bot, "book": inst.paper, "cur": cur, "k0": float(k0), "s_now": float(s_now), "s_index": s_index, "s_last": s_last, "levels": levels}
+    res = _ENTRY_PIPELINE.run(ctx)
+    inst.bot["last_timing"] = res.timing_rec()
+    if res.passed:
+        _bot_audit("ENTRY_DECISION", {"strike": float(k0), **res.timing_rec()}, inst=inst)
+    else:
+        _bot_block(res.reason or "BLOCKED", {**res.data, **res.timing_rec()}, inst=inst)
 
-            # Risk limits
-            open_list = list(_PAPER.get("open") or [])
-            if len(open_list) >= int(_BOT.get("max_positions") or 3):
-                _bot_block("MAX_POSITIONS", {"open": len(open_list)})
-                continue
-            total_risk = 0.0
-            for tt in open_list:
-                try:
-                    total_risk += float(tt.get("entry_cost_usd") or 0.0)
-                except Exception:
-                    pass
-            if total_risk >= float(_BOT.get("max_risk_usd") or 500.0):
-                _bot_block("MAX_RISK", {"risk": total_risk, "max": float(_BOT.get("max_risk_usd") or 500.0)})
+
+def _bot_on_spot(cur: str, tick: SpotTick):
+    """Once per tick and currency, whatever the number of instances."""
+    _MTM.push_spot(cur, tick.index, tick.last)
+    if _RECORDER is not None:
+        _RECORDER.tick(tick.ts_ms, tick.index, tick.last)
+
+
+async def _bot_tick(inst: BotInstance, tick: SpotTick):
+    bot = inst.bot
+    cur = inst.currency
+    s_now = tick.spot(str(bot.get("spot_src") or "index"))
+    if not s_now:
+        return
+    prev = float(bot.get("last_spot") or s_now)
+    bot["last_spot"] = float(s_now)
+    bot["last_tick_ms"] = int(tick.ts_ms)
+
+    if not bot.get("expiries"):
+        return
+
+    # TP is a pure spot move: act on the tick instead of waiting for the next manage pass
+    if _tp_reached(inst, s_now):
+        async with inst.lock:
+            await asyncio.to_thread(_bot_manage_open, inst, s_now)
+
+    if not bot.get("auto_entry"):
+        return
+    levels = inst.levels.get(cur)
+    if levels is None or not len(levels):
+        return
+    k0 = touched_level(levels.levels, prev, s_now)
+    if k0 is None:
+        return  # far from every wall: nothing to do on this tick
+    bot["last_touch_level"] = k0
+    async with inst.lock:
+        await asyncio.to_thread(_bot_try_entry, inst, cur, k0, s_now, tick.index, tick.last, levels)
+
+
+def _bot_feed(cur: str):
+    """Spot stream for one currency (BOT_SPOT_REPLAY may contain {cur})."""
+    for inst in _RUNNER.enabled_for(cur):
+        inst.bot["spot_feed"] = feed_name(BOT_SPOT_FEED)
+    return spot_ticks(cur, source=BOT_SPOT_FEED, replay_path=BOT_SPOT_REPLAY.replace("{cur}", cur), replay_speed=BOT_SPOT_REPLAY_SPEED, clock=_CLOCK)
+
+
+_RUNNER = BotRunner(_bot_feed, _bot_on_spot, _bot_tick)
+_RUNNER.add(_MAIN_BOT)
+
+
+async def _bot_manage_loop():
+    """Periodic pass over every instance: status/blocks + SL (needs option marks) for open trades."""
+    while True:
+        await _CLOCK.sleep(2.0)
+        spots: dict[tuple[str, str], float] = {}  # (currency, src) -> spot, one ticker per pass at most
+        for inst in _RUNNER.all():
+            try:
+                await _bot_manage_pass(inst, spots)
+            except Exception:
                 continue
 
-            # choose expiries for execution: D1 + D2 (as requested)
-            # NOTE: expiries_exec already computed above by DTE range; keep a fallback here for safety.
-            expiries_exec = list(expiries_exec or expiries[:2])
-            opened_any = False
-
-            for idx, expiry_exec in enumerate(expiries_exec):
-                try:
-                    # Capacity check (we may open up to 2 positions)
-                    open_list = list(_PAPER.get("open") or [])
-                    if len(open_list) >= int(_BOT.get("max_positions") or 3):
-                        _bot_block("MAX_POSITIONS", {"open": len(open_list)})
-                        break
 
-                    total_risk = 0.0
-                    for tt in open_list:
-                        try:
-                            total_risk += float(tt.get("entry_cost_usd") or 0.0)
-                        except Exception:
-                            pass
-                    if total_risk >= float(_BOT.get("max_risk_usd") or 500.0):
-                        _bot_block("MAX_RISK", {"risk": total_risk, "max": float(_BOT.get("max_risk_usd") or 500.0)})
-                        break
+async def _bot_manage_pass(inst: BotInstance, spots: dict[tuple[str, str], float]):
+    bot = inst.bot
+    bot["last_touch_ms"] = _now_ms()
+    if not bot.get("enabled"):
+        _bot_block("DISABLED", inst=inst)
+        return
+
+    cur = inst.currency
+    expiries = list(bot.get("expiries") or [])
+    if not expiries:
+        _bot_block("NO_EXPIRIES", inst=inst)
+        return
+
+    s_now = float(bot.get("last_spot") or 0.0)
+    if not s_now or (_now_ms() - int(bot.get("last_tick_ms") or 0)) > 5000:
+        src = str(bot.get("spot_src") or "index")
+        perp = f"{cur}-PERPETUAL"
+        if (cur, src) not in spots:
+            tkr, _ = await asyncio.to_thread(DeribitPublicClient(timeout=6.0).get_ticker, perp)
+            spots[(cur, src)] = _spot_from_ticker(tkr or {}, src=src)
+        s_now = spots[(cur, src)]
+        if not s_now:
+            _bot_block("NO_SPOT", {"perp": perp}, inst=inst)
+            return
 
-                    # Do not re-enter same strike+expiry
-                    if any(str(tt.get("expiry")) == str(expiry_exec) and float(tt.get("strike") or 0.0) == float(k0) for tt in open_list):
-                        _bot_block("DUP_STRIKE", {"expiry": expiry_exec, "strike": float(k0)})
-                        continue
-
-                    # Resolve instruments from chain for this expiry
-                    ch = desk_chain(currency=cur, expiry=expiry_exec, strike_range_pct=float(_BOT.get("strike_range_pct") or 8.0), user={"u": "bot"})
-                    row = None
-                    for rr in (ch.get("per_strike") or []):
-                        if float(rr.get("strike") or 0.0) == float(k0):
-                            row = rr
-                            break
-                    if not row:
-                        _bot_block("NO_CHAIN_ROW", {"expiry": expiry_exec, "strike": float(k0)})
-                        continue
-
-                    call = (row.get("call") or {})
-                    put = (row.get("put") or {})
-                    call_name = str(call.get("instrument_name") or "")
-                    put_name = str(put.get("instrument_name") or "")
-                    if not call_name or not put_name:
-                        _bot_block("NO_INSTRUMENTS", {"expiry": expiry_exec, "strike": float(k0)})
-                        continue
-
-                    qty = float(_BOT.get("qty") or 0.0) or 1.0
-
-                    ask_call = float(call.get("ask_price") or 0.0)
-                    ask_put = float(put.get("ask_price") or 0.0)
-                    mid_call = float(call.get("bid_price") or 0.0) * 0.5 + float(call.get("ask_price") or 0.0) * 0.5
-                    mid_put = float(put.get("bid_price") or 0.0) * 0.5 + float(put.get("ask_price") or 0.0) * 0.5
-                    mark_call = float(call.get("mark_price") or 0.0)
-                    mark_put = float(put.get("mark_price") or 0.0)
-
-                    entry_cost_ask = (ask_call + ask_put) * s_now * qty
-                    entry_cost_mid = (mid_call + mid_put) * s_now * qty
-                    entry_cost_mark = (mark_call + mark_put) * s_now * qty
-
-                    # If this trade would exceed max risk, skip
-                    if (total_risk + float(entry_cost_ask)) > float(_BOT.get("max_risk_usd") or 500.0):
-                        _bot_block(
-                            "RISK_WOULD_EXCEED",
-                            {"risk": total_risk, "entry_cost": float(entry_cost_ask), "max": float(_BOT.get("max_risk_usd") or 500.0), "expiry": expiry_exec},
-                        )
-                        continue
-
-                    trade = {
-                        "id": f"bot-{_now_ms()}-{idx+1}",
-                        "src": "BOT",
-                        "currency": cur,
-                        "expiry": expiry_exec,
-                        "expiries_used": expiries,
-                        "strike": float(k0),
-                        "qty": qty,
-                        "entry_ts": _now_ms(),
-                        "entry_spot": float(s_now),
-                        "entry_spot_index": s_index,
-                        "entry_spot_last": s_last,
-                        "callName": call_name,
-                        "putName": put_name,
-                        "entry_cost_usd": float(entry_cost_ask),
-                        "entry_cost_ask": float(entry_cost_ask),
-                        "entry_cost_mid": float(entry_cost_mid),
-                        "entry_cost_mark": float(entry_cost_mark),
-                        "entry_call": {"bid": float(call.get("bid_price") or 0.0), "ask": ask_call, "mark": mark_call, "iv": float(call.get("mark_iv") or 0.0)},
-                        "entry_put": {"bid": float(put.get("bid_price") or 0.0), "ask": ask_put, "mark": mark_put, "iv": float(put.get("mark_iv") or 0.0)},
-                    }
-
-                    _PAPER["open"] = [trade] + open_list
-                    opened_any = True
-                    _BOT["last_action"] = "ENTRY_OPEN"
-                    _bot_audit("ENTRY_OPEN", {"currency": cur, "expiry": expiry_exec, "strike": float(k0), "cost": float(entry_cost_ask)})
-                    _paper_save()
-
-                except Exception:
-                    continue
+    if inst.paper.get("open"):
+        async with inst.lock:
+            await asyncio.to_thread(_bot_manage_open, inst, s_now)
 
-            if opened_any:
-                _BOT["last_action_ms"] = _now_ms()
-            else:
-                _bot_block("NO_ENTRY_EXECUTED", {"strike": float(k0), "expiries": expiries_exec})
+    if not bot.get("auto_entry"):
+        _bot_block("AUTO_ENTRY_OFF", inst=inst)
+        return
+    if cur not in inst.levels:
+        _bot_block("NO_WALLS", inst=inst)
 
-        except Exception:
-            # keep bot alive
-            continue
+
+async def _bot_levels_loop():
+    while True:
+        for inst in _RUNNER.all():
+            try:
+                if inst.enabled and inst.bot.get("auto_entry"):
+                    # desk_walls is cached per (currency, range, dte): instances with the same inputs share it
+                    await asyncio.to_thread(_bot_refresh_levels, inst, inst.currency)
+            except Exception:
+                pass
+        await _CLOCK.sleep(BOT_LEVELS_REFRESH_SEC)
 
 
-@app.on_event("startup")
-async def _startup():
-    global _BOT_TASK
-    _paper_load()
-    _bot_load()
-    if not _BOT_TASK:
-        _BOT_TASK = asyncio.create_task(_bot_loop())
+def _bot_instance_new(bot_id: str, bot: dict | None = None) -> BotInstance:
+    """Extra instance: own state file + paper db next to the main ones (bot_state.<id>.json, paper_state.<id>.db)."""
+    st_base, st_ext = os.path.splitext(BOT_STATE_PATH)
+    db_base, db_ext = os.path.splitext(PAPER_DB_PATH)
+    bot = bot if bot is not None else copy.deepcopy(_BOT_DEFAULTS)
+    paper: dict[str, Any] = {"open": [], "ts": _now_ms()}
+    return BotInstance(bot_id, bot, paper, PaperDB(f"{db_base}.{bot_id}{db_ext or '.db'}"), PaperReport(), f"{st_base}.{bot_id}{st_ext or '.json'}", _bot_audit_log(bot_id))
 
 
-@app.on_event("shutdown")
-async def _shutdown():
-    global _BOT_TASK
+def _bot_instances_load():
     try:
-        _paper_save()
+        if not os.path.exists(BOT_INSTANCES_PATH):
+            return
+        with open(BOT_INSTANCES_PATH, "r", encoding="utf-8") as f:
+            ids = json.load(f) or []
+        for bot_id in ids if isinstance(ids, list) else []:
+            bot_id = str(bot_id)
+            if not valid_bot_id(bot_id) or _RUNNER.get(bot_id) is not None:
+                continue
+            inst = _RUNNER.add(_bot_instance_new(bot_id))
+            _paper_load(inst)
+            _bot_load(inst)
     except Exception:
         pass
+
+
+def _bot_instances_save():
     try:
-        _bot_save()
+        with open(BOT_INSTANCES_PATH, "w", encoding="utf-8") as f:
+            json.dump([i.id for i in _RUNNER.all() if i is not _MAIN_BOT], f)
     except Exception:
         pass
-    if _BOT_TASK:
+
+
+@app.on_event("startup")
+async def _startup():
+    _paper_load()
+    _bot_load()
+    _bot_instances_load()
+    if not _BOT_TASKS:
+        _BOT_TASKS.extend([
+            asyncio.create_task(_RUNNER.run()),
+            asyncio.create_task(_bot_manage_loop()),
+            asyncio.create_task(_bot_levels_loop()),
+        ])
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    for inst in _RUNNER.all():
+        try:
+            inst.db.close()
+        except Exception:
+            pass
+        try:
+            _bot_save(inst)
+            inst.audit.flush()
+        except Exception:
+            pass
+    for task in _BOT_TASKS:
         try:
-            _BOT_TASK.cancel()
+            task.cancel()
         except Exception:
             pass
-    _BOT_TASK = None
+    _BOT_TASKS.clear()
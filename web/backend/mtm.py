@@ -0,0 +1,185 @@
+"""
+mtm.py — shared mark-to-market snapshot for all open paper positions.
+
+Instead of 2 ticker calls per trade per consumer, the engine:
+  1. collects every leg (callName/putName) across open trades, de-duplicated;
+  2. pulls marks for a whole currency with ONE get_book_summary_by_currency
+     call (ticker only for legs missing from the summary);
+  3. takes spot from the bot's spot stream when fresh (push_spot), else one
+     perp ticker per currency; positions are valued at the caller's spot_src
+     ("index" or "last", the other one as fallback), the same price the bot
+     runs its TP/SL on;
+  4. computes value / PnL / PnL% for all positions as NumPy vectors.
+
+A position whose spot or one of whose legs could not be priced is left out
+of "positions" and listed under "stale": consumers skip it (the TP/SL pass
+keeps it open) instead of valuing the missing leg at 0.
+
+The bot TP/SL pass, /api/paper/open_enriched and /api/paper/mtm all read the
+same cached snapshot.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from src.deribit_api import DeribitPublicClient
+
+
+def _leg_from_summary(row: dict) -> dict:
+    """Book-summary row -> ticker-shaped dict (what the UI already reads)."""
+    return {
+        "instrument_name": row.get("instrument_name"),
+        "mark_price": float(row.get("mark_price") or 0.0),
+        "best_bid_price": float(row.get("bid_price") or 0.0),
+        "best_ask_price": float(row.get("ask_price") or 0.0),
+        "mark_iv": float(row.get("mark_iv") or 0.0),
+        "open_interest": float(row.get("open_interest") or 0.0),
+        "underlying_price": float(row.get("underlying_price") or 0.0),
+        "creation_timestamp": row.get("creation_timestamp"),
+    }
+
+
+class MtmEngine:
+    def __init__(
+        self,
+        client_factory: Callable[[], DeribitPublicClient] = lambda: DeribitPublicClient(timeout=6.0),
+        ttl_sec: float = 1.0,
+        spot_fresh_sec: float = 5.0,
+    ):
+        self.client_factory = client_factory
+        self.ttl_sec = float(ttl_sec)
+        self.spot_fresh_sec = float(spot_fresh_sec)
+        self._lock = threading.Lock()
+        self._client: Optional[DeribitPublicClient] = None
+        self._spot: dict[str, dict] = {}    # cur -> {"index","last","ts"} (monotonic ts)
+        self._marks: dict[str, dict] = {}   # cur -> {"ts", "legs": {name: leg}}
+        self._snap: Optional[dict] = None
+        self._snap_key: Optional[tuple] = None
+        self._snap_ts = 0.0
+
+    @property
+    def client(self) -> DeribitPublicClient:
+        if self._client is None:
+            self._client = self.client_factory()
+        return self._client
+
+    # ---------------- inputs ----------------
+    def push_spot(self, currency: str, index: float, last: float):
+        self._spot[currency.upper()] = {"index": float(index or 0.0), "last": float(last or 0.0), "ts": time.monotonic()}
+
+    def _spot_for(self, cur: str) -> dict:
+        sp = self._spot.get(cur)
+        if sp and (time.monotonic() - sp["ts"]) <= self.spot_fresh_sec:
+            return sp
+        tkr, _ = self.client.get_ticker(f"{cur}-PERPETUAL")
+        sp = {"index": float((tkr or {}).get("index_price") or 0.0), "last": float((tkr or {}).get("last_price") or 0.0), "ts": time.monotonic()}
+        if sp["index"] or sp["last"]:
+            self._spot[cur] = sp  # a zero spot is not cached: the next snapshot asks again
+        return sp
+
+    def _legs_for(self, cur: str, names: set[str]) -> dict[str, dict]:
+        book = self._marks.get(cur)
+        if not book or (time.monotonic() - book["ts"]) > self.ttl_sec:
+            rows, _ = self.client.get_book_summary_by_currency(currency=cur, kind="option")
+            book = {"ts": time.monotonic(), "legs": {str(r.get("instrument_name")): _leg_from_summary(r) for r in (rows or []) if r.get("instrument_name")}}
+            self._marks[cur] = book
+        legs = book["legs"]
+        for name in names:
+            if name not in legs:
+                # not in the summary (just listed / expired): single ticker as fallback
+                # (a failure is not cached: the leg stays missing and is retried next time)
+                try:
+                    t, _ = self.client.get_ticker(name)
+                except Exception:
+                    continue
+                if t and t.get("mark_price") is not None:
+                    legs[name] = dict(t)
+        return legs
+
+    # ---------------- snapshot ----------------
+    def snapshot(self, opens: list[dict], force: bool = False, spot_src: str = "index") -> dict:
+        """{"ts", "spot": {cur: {...}}, "positions": {trade_id: {...}}, "stale": [trade_id]}, cached for ttl_sec."""
+        spot_src = "last" if spot_src == "last" else "index"
+        key = (spot_src,) + tuple(sorted(str(t.get("id")) for t in opens))
+        with self._lock:
+            if (not force) and self._snap is not None and key == self._snap_key and (time.monotonic() - self._snap_ts) <= self.ttl_sec:
+                return self._snap
+            snap = self._compute(opens, spot_src)
+            self._snap, self._snap_key, self._snap_ts = snap, key, time.monotonic()
+            return snap
+
+    def _compute(self, opens: list[dict], spot_src: str = "index") -> dict:
+        now_ms = int(time.time() * 1000)
+        if not opens:
+            return {"ts": now_ms, "spot": {}, "positions": {}, "stale": []}
+
+        curs = [str(t.get("currency") or "BTC").upper() for t in opens]
+        names_by_cur: dict[str, set[str]] = {}
+        for cur, t in zip(curs, opens):
+            s = names_by_cur.setdefault(cur, set())
+            for k in ("callName", "putName"):
+                if t.get(k):
+                    s.add(str(t.get(k)))
+
+        spots: dict[str, dict] = {}
+        legs: dict[str, dict[str, dict]] = {}
+        for cur, names in names_by_cur.items():
+            try:
+                sp = self._spot_for(cur)
+            except Exception:
+                sp = {"index": 0.0, "last": 0.0}
+            main = (sp["last"] or sp["index"]) if spot_src == "last" else (sp["index"] or sp["last"])
+            spots[cur] = {"index": sp["index"], "last": sp["last"], "spot": main}
+            try:
+                legs[cur] = self._legs_for(cur, names)
+            except Exception:
+                legs[cur] = {}
+
+        def _mark(cur: str, name: Any) -> float:
+            if not name:
+                return 0.0
+            return float((legs[cur].get(str(name)) or {}).get("mark_price") or 0.0)
+
+        def _priced(cur: str, t: dict) -> bool:
+            if not spots[cur]["spot"]:
+                return False
+            return all(str(t.get(k)) in legs[cur] for k in ("callName", "putName") if t.get(k))
+
+        spot = np.array([spots[c]["spot"] for c in curs], dtype=float)
+        cm = np.array([_mark(c, t.get("callName")) for c, t in zip(curs, opens)], dtype=float)
+        pm = np.array([_mark(c, t.get("putName")) for c, t in zip(curs, opens)], dtype=float)
+        qty = np.array([float(t.get("qty") or 1.0) for t in opens], dtype=float)
+        cost = np.array([float(t.get("entry_cost_usd") or 0.0) for t in opens], dtype=float)
+
+        call_usd = cm * spot * qty
+        put_usd = pm * spot * qty
+        value = call_usd + put_usd
+        pnl = value - cost
+        pnl_pct = np.divide(pnl * 100.0, cost, out=np.zeros_like(pnl), where=cost != 0)
+
+        positions: dict[str, dict] = {}
+        stale: list[str] = []
+        for i, (cur, t) in enumerate(zip(curs, opens)):
+            if not _priced(cur, t):
+                stale.append(str(t.get("id")))
+                continue
+            positions[str(t.get("id"))] = {
+                "currency": cur,
+                "spot": float(spot[i]),
+                "spot_index": spots[cur]["index"],
+                "spot_last": spots[cur]["last"],
+                "call": legs[cur].get(str(t.get("callName") or "")) or {},
+                "put": legs[cur].get(str(t.get("putName") or "")) or {},
+                "call_usd": float(call_usd[i]),
+                "put_usd": float(put_usd[i]),
+                "value_usd": float(value[i]),
+                "pnl_usd": float(pnl[i]),
+                "pnl_pct": float(pnl_pct[i]),
+                "ts": now_ms,
+            }
+        return {"ts": now_ms, "spot": spots, "positions": positions, "stale": stale}
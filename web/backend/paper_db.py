@@ -0,0 +1,319 @@
+"""
+paper_db.py — SQLite (WAL) storage engine for the paper book.
+
+Each trade is one row, so an entry/close writes only that trade instead of
+rewriting the whole book. WAL mode keeps readers (API) and the writer (bot)
+out of each other's way and makes the file crash-safe: an interrupted write
+is rolled back on the next open.
+
+Layout:
+  open_trades(id, entry_ts, data)
+  history(id, closed_ts, entry_ts, currency, expiry, strike, src, close_reason, pnl_usd, data)
+
+`data` always holds the full trade dict as JSON; the other columns are
+copies used for ordering/filtering.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS open_trades (
+    id TEXT PRIMARY KEY,
+    entry_ts INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    id TEXT PRIMARY KEY,
+    closed_ts INTEGER NOT NULL DEFAULT 0,
+    entry_ts INTEGER NOT NULL DEFAULT 0,
+    currency TEXT NOT NULL DEFAULT '',
+    expiry TEXT NOT NULL DEFAULT '',
+    strike REAL NOT NULL DEFAULT 0,
+    src TEXT NOT NULL DEFAULT '',
+    close_reason TEXT NOT NULL DEFAULT '',
+    pnl_usd REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_history_closed ON history(closed_ts, id);
+CREATE INDEX IF NOT EXISTS ix_history_currency ON history(currency, closed_ts, id);
+CREATE INDEX IF NOT EXISTS ix_history_expiry ON history(expiry, closed_ts, id);
+CREATE INDEX IF NOT EXISTS ix_history_strike ON history(strike, closed_ts, id);
+CREATE INDEX IF NOT EXISTS ix_history_src ON history(src, closed_ts, id);
+"""
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), default=str)
+
+
+def encode_cursor(closed_ts: int, trade_id: str) -> str:
+    raw = f"{int(closed_ts)}:{trade_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("utf-8").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[tuple[int, str]]:
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode((cursor + pad).encode("utf-8")).decode("utf-8")
+        ts, tid = raw.split(":", 1)
+        return int(ts), tid
+    except Exception:
+        return None
+
+
+def _loads(s: str) -> dict:
+    try:
+        obj = json.loads(s)
+        return obj if isinstance(obj, dict) else {}
+    except Exception:
+        return {}
+
+
+class PaperDB:
+    def __init__(self, path: str, compact_every_sec: float = 600.0):
+        self.path = path
+        self.compact_every_sec = float(compact_every_sec)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._last_compact = time.time()
+
+    # ---------------- lifecycle ----------------
+    def open(self) -> "PaperDB":
+        with self._lock:
+            if self._conn is not None:
+                return self
+            d = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(d, exist_ok=True)
+            try:
+                conn: Optional[sqlite3.Connection] = self._connect()
+            except sqlite3.DatabaseError:
+                conn = None  # not a database at all (garbage / truncated header)
+            if conn is None or not self._healthy(conn):
+                # corrupted file: keep it aside for inspection and start a new book
+                if conn is not None:
+                    conn.close()
+                os.replace(self.path, f"{self.path}.corrupt-{int(time.time())}")
+                for ext in ("-wal", "-shm"):
+                    try:
+                        os.remove(self.path + ext)
+                    except OSError:
+                        pass
+                conn = self._connect()
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            return self
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.DatabaseError:
+            conn.close()
+            raise
+        return conn
+
+    @staticmethod
+    def _healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            row = conn.execute("PRAGMA quick_check").fetchone()
+            return bool(row) and str(row[0]).lower() == "ok"
+        except sqlite3.DatabaseError:
+            return False
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                self.compact()
+            finally:
+                self._conn.close()
+                self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.open()
+        return self._conn  # type: ignore[return-value]
+
+    # ---------------- legacy JSON ----------------
+    def migrate_json(self, json_path: str) -> int:
+        """Import a legacy paper_state.json once, then rename it to *.migrated."""
+        if not json_path or not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                obj = json.load(f) or {}
+        except Exception:
+            return 0
+        if not isinstance(obj, dict):
+            return 0
+        opens = [x for x in (obj.get("open") or []) if isinstance(x, dict)]
+        hist = [x for x in (obj.get("history") or []) if isinstance(x, dict)]
+        with self._lock:
+            c = self.conn
+            c.execute("BEGIN")
+            try:
+                for t in opens:
+                    self._put_open(c, t)
+                for t in hist:
+                    self._put_history(c, t)
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
+        os.replace(json_path, json_path + ".migrated")
+        return len(opens) + len(hist)
+
+    # ---------------- writes ----------------
+    @staticmethod
+    def _put_open(c: sqlite3.Connection, t: dict):
+        c.execute(
+            "INSERT OR REPLACE INTO open_trades(id, entry_ts, data) VALUES (?, ?, ?)",
+            (str(t.get("id") or ""), int(t.get("entry_ts") or 0), _dumps(t)),
+        )
+
+    @staticmethod
+    def _put_history(c: sqlite3.Connection, t: dict):
+        pnl = t.get("pnl_usd")
+        try:
+            pnl = float(pnl) if pnl is not None else None
+        except (TypeError, ValueError):
+            pnl = None
+        c.execute(
+            "INSERT OR REPLACE INTO history(id, closed_ts, entry_ts, currency, expiry, strike, src, close_reason, pnl_usd, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(t.get("id") or ""),
+                int(t.get("closed_ts") or 0),
+                int(t.get("entry_ts") or 0),
+                str(t.get("currency") or "").upper(),
+                str(t.get("expiry") or ""),
+                float(t.get("strike") or 0.0),
+                str(t.get("src") or "").upper(),
+                str(t.get("close_reason") or ""),
+                pnl,
+                _dumps(t),
+            ),
+        )
+
+    def put_open(self, trade: dict):
+        with self._lock:
+            self._put_open(self.conn, trade)
+        self.maybe_compact()
+
+    def close_trade(self, closed: dict):
+        """Move a trade open -> history atomically."""
+        with self._lock:
+            c = self.conn
+            c.execute("BEGIN")
+            try:
+                c.execute("DELETE FROM open_trades WHERE id = ?", (str(closed.get("id") or ""),))
+                self._put_history(c, closed)
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
+        self.maybe_compact()
+
+    # ---------------- reads ----------------
+    def load_open(self) -> list[dict]:
+        with self._lock:
+            rows = self.conn.execute("SELECT data FROM open_trades ORDER BY entry_ts DESC, id DESC").fetchall()
+        return [_loads(r[0]) for r in rows]
+
+    def history_page(
+        self,
+        limit: int = 500,
+        cursor: str = "",
+        currency: str = "",
+        expiry: str = "",
+        strike: Optional[float] = None,
+        src: str = "",
+        since_ms: int = 0,
+        until_ms: int = 0,
+    ) -> tuple[list[dict], Optional[str]]:
+        """Newest-first page of closed trades + cursor for the next page.
+
+        Keyset paging on (closed_ts, id): each page is an index range scan, so
+        its cost does not depend on how deep into the history it is.
+        """
+        where: list[str] = []
+        args: list[Any] = []
+        if currency:
+            where.append("currency = ?")
+            args.append(str(currency).upper())
+        if expiry:
+            where.append("expiry = ?")
+            args.append(str(expiry))
+        if strike:
+            where.append("strike = ?")
+            args.append(float(strike))
+        if src:
+            where.append("src = ?")
+            args.append(str(src).upper())
+        if since_ms:
+            where.append("closed_ts >= ?")
+            args.append(int(since_ms))
+        if until_ms:
+            where.append("closed_ts <= ?")
+            args.append(int(until_ms))
+        cur = decode_cursor(cursor) if cursor else None
+        if cur:
+            where.append("(closed_ts < ? OR (closed_ts = ? AND id < ?))")
+            args.extend([cur[0], cur[0], cur[1]])
+        limit = max(1, int(limit))
+        sql = "SELECT closed_ts, id, data FROM history"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY closed_ts DESC, id DESC LIMIT ?"
+        args.append(limit + 1)
+        with self._lock:
+            rows = self.conn.execute(sql, args).fetchall()
+        nxt = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            nxt = encode_cursor(rows[-1][0], rows[-1][1])
+        return [_loads(r[2]) for r in rows], nxt
+
+    def iter_history(self, batch: int = 1000):
+        """Stream every closed trade oldest -> newest, `batch` rows at a time."""
+        last_ts, last_id = -1, ""
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT closed_ts, id, data FROM history WHERE (closed_ts > ? OR (closed_ts = ? AND id > ?)) "
+                    "ORDER BY closed_ts, id LIMIT ?",
+                    (last_ts, last_ts, last_id, max(1, int(batch))),
+                ).fetchall()
+            if not rows:
+                return
+            for r in rows:
+                yield _loads(r[2])
+            last_ts, last_id = rows[-1][0], rows[-1][1]
+
+    # ---------------- compaction ----------------
+    def maybe_compact(self):
+        if (time.time() - self._last_compact) >= self.compact_every_sec:
+            try:
+                self.compact()
+            except Exception:
+                pass
+
+    def compact(self, vacuum: bool = False):
+        """Fold the WAL back into the main file (and optionally VACUUM)."""
+        with self._lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            if vacuum:
+                self.conn.execute("VACUUM")
+            self._last_compact = time.time()
@@ -0,0 +1,185 @@
+"""
+paper_report.py — performance aggregates for the paper book, updated per close.
+
+PaperReport.add(trade) is O(1); snapshot() only reads the running state, so
+/api/paper/report never scans the history. On startup the report is rebuilt
+by streaming the history table once (oldest -> newest).
+"""
+
+from __future__ import annotations
+
+import datetime
+import threading
+from typing import Any, Iterable, Optional
+
+
+def _f(x: Any) -> Optional[float]:
+    try:
+        return float(x) if x is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def dte_at_entry(trade: dict) -> Optional[int]:
+    """Days from entry to expiry (Deribit expiries settle 08:00 UTC)."""
+    try:
+        ex = datetime.datetime.strptime(str(trade.get("expiry") or ""), "%Y-%m-%d")
+        ex = ex.replace(hour=8, tzinfo=datetime.timezone.utc)
+        entry_ms = int(trade.get("entry_ts") or 0)
+        if not entry_ms:
+            return None
+        return max(0, int((ex.timestamp() * 1000 - entry_ms) // (24 * 3600 * 1000)))
+    except Exception:
+        return None
+
+
+def _dte_bucket(trade: dict) -> str:
+    d = dte_at_entry(trade)
+    if d is None:
+        return "?"
+    return str(d) if d < 7 else "7+"
+
+
+class _Bucket:
+    __slots__ = ("n", "wins", "losses", "pnl", "gross_win", "gross_loss", "best", "worst", "no_pnl")
+
+    def __init__(self):
+        self.n = 0
+        self.wins = 0
+        self.losses = 0
+        self.pnl = 0.0
+        self.gross_win = 0.0
+        self.gross_loss = 0.0
+        self.best: Optional[float] = None
+        self.worst: Optional[float] = None
+        self.no_pnl = 0
+
+    def add(self, pnl: Optional[float]):
+        self.n += 1
+        if pnl is None:
+            self.no_pnl += 1
+            return
+        self.pnl += pnl
+        if pnl > 0:
+            self.wins += 1
+            self.gross_win += pnl
+        elif pnl < 0:
+            self.losses += 1
+            self.gross_loss += -pnl
+        self.best = pnl if self.best is None else max(self.best, pnl)
+        self.worst = pnl if self.worst is None else min(self.worst, pnl)
+
+    def as_dict(self) -> dict:
+        scored = self.n - self.no_pnl
+        return {
+            "n": self.n,
+            "wins": self.wins,
+            "losses": self.losses,
+            "win_rate": (self.wins / scored * 100.0) if scored else 0.0,
+            "pnl_usd": self.pnl,
+            "avg_pnl_usd": (self.pnl / scored) if scored else 0.0,
+            "profit_factor": (self.gross_win / self.gross_loss) if self.gross_loss else None,
+            "best_usd": self.best,
+            "worst_usd": self.worst,
+            "no_pnl": self.no_pnl,
+        }
+
+
+class PaperReport:
+    # group name -> key function
+    GROUPS = {
+        "by_setup": lambda t: str(t.get("setup") or t.get("src") or "?"),
+        "by_src": lambda t: str(t.get("src") or "?").upper(),
+        "by_currency": lambda t: str(t.get("currency") or "?").upper(),
+        "by_expiry": lambda t: str(t.get("expiry") or "?"),
+        "by_dte": _dte_bucket,
+        "by_reason": lambda t: str(t.get("close_reason") or "?"),
+    }
+
+    def __init__(self, curve_max: int = 2000):
+        self.curve_max = max(16, int(curve_max))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._snap: Optional[dict] = None
+        self.total = _Bucket()
+        self.groups: dict[str, dict[str, _Bucket]] = {g: {} for g in self.GROUPS}
+        self.equity = 0.0
+        self.peak = 0.0
+        self.max_dd = 0.0
+        self.max_dd_ts = 0
+        self.last_ts = 0
+        # equity curve, decimated x2 whenever it hits curve_max (amortized O(1) per add)
+        self.curve: list[list[float]] = []
+        self._curve_stride = 1
+        self._curve_skip = 0
+
+    def add(self, trade: dict):
+        with self._lock:
+            self._snap = None
+            self._add(trade)
+
+    def _add(self, trade: dict):
+        pnl = _f(trade.get("pnl_usd"))
+        self.total.add(pnl)
+        for g, keyfn in self.GROUPS.items():
+            try:
+                k = keyfn(trade)
+            except Exception:
+                k = "?"
+            b = self.groups[g].get(k)
+            if b is None:
+                b = self.groups[g][k] = _Bucket()
+            b.add(pnl)
+
+        ts = int(trade.get("closed_ts") or 0)
+        self.last_ts = max(self.last_ts, ts)
+        if pnl is None:
+            return
+        self.equity += pnl
+        self.peak = max(self.peak, self.equity)
+        dd = self.peak - self.equity
+        if dd > self.max_dd:
+            self.max_dd = dd
+            self.max_dd_ts = ts
+
+        self._curve_skip += 1
+        if self._curve_skip >= self._curve_stride:
+            self._curve_skip = 0
+            self.curve.append([ts, self.equity])
+            if len(self.curve) >= self.curve_max:
+                self.curve = self.curve[1::2]
+                self._curve_stride *= 2
+
+    def rebuild(self, trades: Iterable[dict]):
+        """trades must come oldest -> newest (closed_ts ASC)."""
+        with self._lock:
+            self.reset()
+            for t in trades:
+                self._add(t)
+
+    def snapshot(self) -> dict:
+        """Cached until the next add()."""
+        with self._lock:
+            if self._snap is None:
+                self._snap = self._build_snapshot()
+            return self._snap
+
+    def _build_snapshot(self) -> dict:
+        curve = list(self.curve)
+        if curve and self.last_ts and curve[-1][0] != self.last_ts:
+            curve.append([self.last_ts, self.equity])
+        return {
+            "summary": {
+                **self.total.as_dict(),
+                "equity_usd": self.equity,
+                "peak_usd": self.peak,
+                "drawdown_usd": self.peak - self.equity,
+                "max_drawdown_usd": self.max_dd,
+                "max_drawdown_ts": self.max_dd_ts,
+                "last_close_ts": self.last_ts,
+            },
+            "curve": curve,
+            **{g: {k: b.as_dict() for k, b in sorted(d.items())} for g, d in self.groups.items()},
+        }
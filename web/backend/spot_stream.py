@@ -0,0 +1,149 @@
+"""
+spot_stream.py — spot/index tick feeds for the bot + sorted wall-level index.
+
+Feeds (async generators of SpotTick):
+  - deribit_ws_ticks: Deribit WebSocket `ticker.<PERP>.100ms` (needs `websockets`,
+    shipped with uvicorn[standard]); reconnects with backoff.
+  - poll_ticks: REST /public/ticker fallback, emits only when the price moves.
+  - replay_ticks: CSV `ts_ms,index,last` stand-in for local runs.
+
+LevelIndex keeps wall strikes in a sorted array so each tick checks for a
+touch/cross (bot_rules.touched_level) with two binary searches instead of
+scanning every wall.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+import random
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, Optional
+
+import numpy as np
+
+from src.deribit_api import DeribitPublicClient
+
+try:  # optional: shipped with uvicorn[standard]
+    import websockets
+except Exception:  # pragma: no cover
+    websockets = None
+
+DERIBIT_WS_URL = "wss://www.deribit.com/ws/api/v2"
+
+
+@dataclass(frozen=True)
+class SpotTick:
+    ts_ms: int
+    index: float
+    last: float
+
+    def spot(self, src: str = "index") -> float:
+        if src == "last":
+            return float(self.last or self.index or 0.0)
+        return float(self.index or self.last or 0.0)
+
+
+class LevelIndex:
+    def __init__(self, levels: Iterable[float], flip: Optional[float] = None):
+        arr = np.asarray([float(x) for x in levels if float(x) > 0], dtype=float)
+        self.levels = np.unique(arr)  # sorted, de-duplicated
+        self.flip = float(flip) if flip else None
+        self.ts_ms = int(time.time() * 1000)
+
+    def __len__(self) -> int:
+        return int(self.levels.size)
+
+
+# -------------------- feeds --------------------
+async def deribit_ws_ticks(currency: str) -> AsyncIterator[SpotTick]:
+    if websockets is None:
+        raise RuntimeError("websockets not installed")
+    channel = f"ticker.{currency.upper()}-PERPETUAL.100ms"
+    backoff = 1.0
+    while True:
+        try:
+            async with websockets.connect(DERIBIT_WS_URL, ping_interval=20, ping_timeout=20) as ws:
+                await ws.send(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "public/subscribe", "params": {"channels": [channel]}}))
+                backoff = 1.0
+                async for raw in ws:
+                    msg = json.loads(raw)
+                    params = msg.get("params") or {}
+                    if msg.get("method") != "subscription" or params.get("channel") != channel:
+                        continue
+                    d = params.get("data") or {}
+                    yield SpotTick(
+                        ts_ms=int(d.get("timestamp") or time.time() * 1000),
+                        index=float(d.get("index_price") or 0.0),
+                        last=float(d.get("last_price") or 0.0),
+                    )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await asyncio.sleep(backoff + random.random())
+            backoff = min(30.0, backoff * 2.0)
+
+
+async def poll_ticks(currency: str, interval: float = 0.5) -> AsyncIterator[SpotTick]:
+    perp = f"{currency.upper()}-PERPETUAL"
+    client = DeribitPublicClient(timeout=6.0)
+    last_key = None
+    while True:
+        try:
+            tkr, _ = await asyncio.to_thread(client.get_ticker, perp)
+            tick = SpotTick(
+                ts_ms=int((tkr or {}).get("timestamp") or time.time() * 1000),
+                index=float((tkr or {}).get("index_price") or 0.0),
+                last=float((tkr or {}).get("last_price") or 0.0),
+            )
+            key = (tick.index, tick.last)
+            if key != last_key:
+                last_key = key
+                yield tick
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        await asyncio.sleep(interval)
+
+
+async def replay_ticks(path: str, speed: float = 0.0, clock=None) -> AsyncIterator[SpotTick]:
+    """Replay `ts_ms,index,last` rows. speed=0 -> as fast as possible, 1 -> real time.
+
+    With a simulated clock (clock.sim) the feed drives it: each tick first
+    advances the clock to its ts_ms (waking timers due before it), speed is ignored.
+    """
+    sim = bool(getattr(clock, "sim", False))
+    prev_ts = None
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            try:
+                ts, idx, last = int(float(row[0])), float(row[1]), float(row[2] if len(row) > 2 else row[1])
+            except (ValueError, IndexError):
+                continue  # header / junk
+            if sim:
+                await clock.advance_to(ts)
+            elif speed > 0 and prev_ts is not None and ts > prev_ts:
+                await asyncio.sleep((ts - prev_ts) / 1000.0 / speed)
+            else:
+                await asyncio.sleep(0)
+            prev_ts = ts
+            yield SpotTick(ts_ms=ts, index=idx, last=last)
+
+
+def spot_ticks(currency: str, source: str = "ws", replay_path: str = "", replay_speed: float = 0.0, clock=None) -> AsyncIterator[SpotTick]:
+    source = (source or "ws").lower()
+    if source == "replay" and replay_path:
+        return replay_ticks(replay_path, speed=replay_speed, clock=clock)
+    if source == "ws" and websockets is not None:
+        return deribit_ws_ticks(currency)
+    return poll_ticks(currency)
+
+
+def feed_name(source: str) -> str:
+    source = (source or "ws").lower()
+    if source == "ws" and websockets is None:
+        return "poll"
+    return source
@@ -0,0 +1,291 @@
+"""
+sweep.py — parameter sweeps of the straddle bot over recorded data (backtest.py).
+
+  - the compiled MarketData arrays go into ONE shared-memory block; pool
+    workers map them read-only (no pickling of the market per task);
+  - samplers: grid (cartesian product), random, refine (random start, then
+    rounds of perturbations around the best configs with a shrinking radius);
+  - each config runs in a worker and comes back as a compact row (params,
+    summary, blocks, equity curve cut to curve_points with LTTB), ranked by
+    the objective.
+
+space: {param: [choices]} or {param: {"min", "max", "step"?}}; unknown params
+are ignored. Defaults cover the knobs in /api/bot/config.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import multiprocessing as mp
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Optional
+
+import numpy as np
+
+from backtest import MarketData, run_backtest
+from src.downsample import lttb_indices
+
+PARAMS = ("tp_move_pct", "sl_pnl_pct", "wall_rank_max", "near_flip_pct", "atr_min_pct", "dte_ranges_exec", "cooldown_sec")
+INT_PARAMS = {"wall_rank_max", "cooldown_sec"}
+
+DEFAULT_SPACE: dict[str, Any] = {
+    "tp_move_pct": {"min": 0.5, "max": 3.0, "step": 0.25},
+    "sl_pnl_pct": {"min": -90.0, "max": -20.0, "step": 10.0},
+    "wall_rank_max": {"min": 2, "max": 16, "step": 2},
+    "near_flip_pct": {"min": 0.4, "max": 3.0, "step": 0.2},
+    "atr_min_pct": {"min": 0.0, "max": 0.8, "step": 0.05},
+    "dte_ranges_exec": ["0-1", "1-2", "1-3", "2-4"],
+    "cooldown_sec": [5, 15, 30, 60, 120],
+}
+
+OBJECTIVES = {
+    "pnl_usd": lambda s: float(s.get("pnl_usd") or 0.0),
+    "profit_factor": lambda s: float(s.get("profit_factor") or 0.0),
+    "win_rate": lambda s: float(s.get("win_rate") or 0.0),
+    # PnL per unit of max drawdown (return/risk)
+    "pnl_dd": lambda s: float(s.get("pnl_usd") or 0.0) / max(1.0, float(s.get("max_drawdown_usd") or 0.0)),
+}
+
+
+# -------------------- parameter space --------------------
+def normalize_space(space: Optional[dict]) -> dict[str, Any]:
+    out: dict[str, Any] = {}
+    for k, v in (space or DEFAULT_SPACE).items():
+        if k not in PARAMS:
+            continue
+        if isinstance(v, dict):
+            lo, hi = float(v.get("min")), float(v.get("max"))
+            out[k] = {"min": min(lo, hi), "max": max(lo, hi), "step": float(v.get("step") or 0.0)}
+        elif isinstance(v, (list, tuple)) and v:
+            out[k] = list(v)
+        else:
+            out[k] = [v]
+    return out
+
+
+def _values(name: str, spec: Any) -> list:
+    """Grid values of one dimension (range -> stepped, or ~8 points without a step)."""
+    if isinstance(spec, list):
+        return spec
+    lo, hi, step = spec["min"], spec["max"], spec["step"]
+    if step <= 0:
+        xs = [float(x) for x in np.linspace(lo, hi, 8)]
+    else:
+        n = int(math.floor((hi - lo) / step + 1e-9)) + 1
+        xs = [round(lo + i * step, 10) for i in range(n)]
+    if name in INT_PARAMS:
+        return sorted({int(round(x)) for x in xs})
+    return xs
+
+
+def _snap(name: str, spec: Any, x: float) -> Any:
+    if isinstance(spec, list):
+        return x
+    x = min(spec["max"], max(spec["min"], x))
+    if spec["step"] > 0:
+        x = spec["min"] + round((x - spec["min"]) / spec["step"]) * spec["step"]
+        x = round(x, 10)
+    return int(round(x)) if name in INT_PARAMS else float(x)
+
+
+def _key(params: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in params.items()))
+
+
+def grid(space: dict, max_configs: int = 0, rng: Optional[random.Random] = None) -> list[dict]:
+    """Full product of the dimension values; above max_configs, a uniform sample of it.
+
+    The sample draws flat indices into the product and decodes them digit by
+    digit, so a space of millions of combinations is never materialized.
+    """
+    names = list(space)
+    vals = [_values(k, space[k]) for k in names]
+    total = math.prod(len(v) for v in vals)
+    if not max_configs or total <= max_configs:
+        return [dict(zip(names, combo)) for combo in itertools.product(*vals)]
+    out: list[dict] = []
+    for flat in sorted((rng or random.Random()).sample(range(total), max_configs)):
+        combo = []
+        for v in reversed(vals):
+            flat, j = divmod(flat, len(v))
+            combo.append(v[j])
+        out.append(dict(zip(names, reversed(combo))))
+    return out
+
+
+def random_samples(space: dict, n: int, rng: random.Random) -> list[dict]:
+    out: list[dict] = []
+    for _ in range(n):
+        p: dict[str, Any] = {}
+        for k, spec in space.items():
+            p[k] = rng.choice(spec) if isinstance(spec, list) else _snap(k, spec, rng.uniform(spec["min"], spec["max"]))
+        out.append(p)
+    return out
+
+
+def perturb(params: dict, space: dict, radius: float, rng: random.Random) -> dict:
+    """Neighbour of params: numeric dims move by N(0, radius * range); choices switch with p=radius."""
+    p = dict(params)
+    for k, spec in space.items():
+        if isinstance(spec, list):
+            if len(spec) > 1 and rng.random() < radius:
+                p[k] = rng.choice(spec)
+        else:
+            span = spec["max"] - spec["min"]
+            p[k] = _snap(k, spec, float(p.get(k, spec["min"])) + rng.gauss(0.0, radius * span))
+    return p
+
+
+# -------------------- shared market --------------------
+class SharedMarket:
+    """MarketData arrays copied into one shared-memory block; desc() is all a worker needs to map them."""
+
+    ALIGN = 64
+
+    def __init__(self, data: MarketData):
+        arrays = data.arrays()
+        layout: list[tuple[str, int, tuple, str]] = []
+        off = 0
+        for k, a in arrays.items():
+            a = np.ascontiguousarray(a)
+            layout.append((k, off, a.shape, a.dtype.str))
+            off += -(-max(1, a.nbytes) // self.ALIGN) * self.ALIGN
+        self.shm = shared_memory.SharedMemory(create=True, size=max(off, self.ALIGN))
+        for k, o, shape, dt in layout:
+            a = np.ascontiguousarray(arrays[k])
+            np.ndarray(shape, dtype=dt, buffer=self.shm.buf, offset=o)[...] = a
+        self.layout = layout
+        self.exp_names = list(data.exp_names)
+        self.currency = data.currency
+
+    def desc(self) -> dict:
+        return {"name": self.shm.name, "layout": self.layout, "exp_names": self.exp_names, "currency": self.currency}
+
+    def close(self):
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except Exception:
+            pass
+
+
+_W: dict[str, Any] = {}  # per-worker: shm handle + MarketData view
+
+
+def _attach(desc: dict):
+    # spawn children share the parent's resource tracker: the parent alone unlinks the block
+    shm = shared_memory.SharedMemory(name=desc["name"])
+    arrays = {}
+    for k, o, shape, dt in desc["layout"]:
+        a = np.ndarray(tuple(shape), dtype=dt, buffer=shm.buf, offset=o)
+        a.flags.writeable = False
+        arrays[k] = a
+    _W["shm"] = shm
+    _W["data"] = MarketData(arrays, desc["exp_names"], currency=desc["currency"])
+
+
+def _curve_points(curve: list, n: int) -> list:
+    if n <= 0 or len(curve) <= n:
+        return curve
+    arr = np.asarray(curve, dtype=float)
+    return arr[lttb_indices(arr[:, 0], arr[:, 1], n)].tolist()
+
+
+def _evaluate(base: dict, params: dict, objective: str, curve_points: int) -> dict:
+    data: MarketData = _W["data"]
+    res = run_backtest(data, {**base, **params})
+    rep = res.get("report") or {}
+    summary = dict(rep.get("summary") or {})
+    return {
+        "params": params,
+        "score": OBJECTIVES.get(objective, OBJECTIVES["pnl_usd"])(summary),
+        "summary": summary,
+        "blocks": res.get("blocks") or {},
+        "by_reason": rep.get("by_reason") or {},
+        "curve": _curve_points(list(rep.get("curve") or []), curve_points),
+        "elapsed_ms": res.get("elapsed_ms"),
+    }
+
+
+# -------------------- runner --------------------
+def run_sweep(
+    data: MarketData,
+    base: dict,
+    space: Optional[dict] = None,
+    mode: str = "grid",
+    n: int = 64,
+    objective: str = "pnl_usd",
+    workers: int = 0,
+    top: int = 50,
+    curve_points: int = 200,
+    rounds: int = 4,
+    seed: Optional[int] = None,
+    max_configs: int = 5000,
+) -> dict:
+    """Evaluate configs of `space` on `data`; rows ranked by objective (best first)."""
+    t0 = time.perf_counter()
+    space = normalize_space(space)
+    mode = (mode or "grid").lower()
+    objective = objective if objective in OBJECTIVES else "pnl_usd"
+    rng = random.Random(seed)
+    n = max(1, min(max_configs, int(n)))
+    cores = os.cpu_count() or 1
+    workers = max(1, min(cores, int(workers or cores)))
+
+    shared = SharedMarket(data)
+    rows: list[dict] = []
+    seen: set[tuple] = set()
+    try:
+        ctx = mp.get_context("spawn")  # the server is multi-threaded: no fork
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_attach, initargs=(shared.desc(),)) as pool:
+
+            def _run(batch: list[dict]):
+                batch = [p for p in batch if _key(p) not in seen]
+                for p in batch:
+                    seen.add(_key(p))
+                futs = [(p, pool.submit(_evaluate, base, p, objective, curve_points)) for p in batch]
+                for p, f in futs:
+                    try:
+                        rows.append(f.result())
+                    except Exception as e:
+                        rows.append({"params": p, "score": None, "error": str(e)})
+
+            if mode == "grid":
+                _run(grid(space, max_configs, rng))
+            elif mode == "refine":
+                n0 = max(workers, n // 2)
+                _run(random_samples(space, n0, rng))
+                left = n - n0
+                per_round = max(1, -(-left // max(1, rounds)))
+                radius = 0.25
+                while left > 0:
+                    best = sorted((r for r in rows if r["score"] is not None), key=lambda r: r["score"], reverse=True)[: max(2, workers // 2)]
+                    if not best:
+                        break
+                    batch = [perturb(best[i % len(best)]["params"], space, radius, rng) for i in range(min(per_round, left))]
+                    _run(batch)
+                    left -= len(batch)
+                    radius *= 0.6
+            else:
+                _run(random_samples(space, n, rng))
+    finally:
+        shared.close()
+
+    rows.sort(key=lambda r: (r["score"] is not None, r["score"] or 0.0), reverse=True)
+    for i, r in enumerate(rows):
+        r["rank"] = i + 1
+    return {
+        "ok": True,
+        "mode": mode,
+        "objective": objective,
+        "space": space,
+        "workers": workers,
+        "evaluated": len(rows),
+        "rows": rows[: max(1, int(top))],
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+    }
@@ -0,0 +1,28 @@
+"""
+test_paper_db.py — PaperDB recovery from a damaged book file.
+
+Run from web/backend:  python -m pytest -q test_paper_db.py
+"""
+
+from __future__ import annotations
+
+import os
+
+from paper_db import PaperDB
+
+
+def test_open_recovers_from_non_sqlite_file(tmp_path):
+    path = tmp_path / "paper.db"
+    path.write_bytes(b"this is not a sqlite database\x00" * 200)
+
+    db = PaperDB(str(path)).open()
+    try:
+        assert db.load_open() == []
+        db.put_open({"id": "t1", "entry_ts": 1, "currency": "BTC"})
+        assert [t["id"] for t in db.load_open()] == ["t1"]
+    finally:
+        db.close()
+
+    moved = [n for n in os.listdir(tmp_path) if n.startswith("paper.db.corrupt-")]
+    assert len(moved) == 1
+    assert (tmp_path / moved[0]).read_bytes().startswith(b"this is not a sqlite database")
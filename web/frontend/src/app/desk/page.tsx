@@ -1,6 +1,6 @@
 'use client';
 
-import { useEffect, useMemo, useState } from 'react';
+import { useEffect, useMemo, useRef, useState } from 'react';
 import { useRouter } from 'next/navigation';
 
 import CandlesChart, { type Ohlc } from '@/components/CandlesChart';
@@ -19,6 +19,15 @@ const API_BASE = process.env.NEXT_PUBLIC_API_BASE || 'http://localhost:8000';
 
 type OhlcWithVol = Ohlc & { v?: number[] };
 
+// Merge a since= delta (client's last bar + newer ones) into the held series, keeping the last `keep` bars.
+function mergeOhlc(prev: OhlcWithVol, delta: OhlcWithVol, keep: number): OhlcWithVol {
+  const since = delta.t.length ? Number(delta.t[0]) : Infinity;
+  let cut = prev.t.length;
+  while (cut > 0 && Number(prev.t[cut - 1]) >= since) cut--;
+  const join = (a: number[] | undefined, b: number[] | undefined) => [...(a || []).slice(0, cut), ...(b || [])].slice(-keep);
+  return { t: join(prev.t, delta.t), o: join(prev.o, delta.o), h: join(prev.h, delta.h), l: join(prev.l, delta.l), c: join(prev.c, delta.c), v: join(prev.v, delta.v) };
+}
+
 async function apiGet(path: string, timeoutMs: number = 12000) {
   const tok = localStorage.getItem('token') || '';
   const ctl = new AbortController();
@@ -49,6 +58,11 @@ export default function DeskPage() {
   const [liveSec, setLiveSec] = useState<number>(8);
   const [chartCfgOpen, setChartCfgOpen] = useState<boolean>(false);
   const [ohlc, setOhlc] = useState<OhlcWithVol | null>(null);
+  const ohlcRef = useRef<{ key: string; ohlc: OhlcWithVol } | null>(null);
+  // server-side downsampling: ~1 candle per plot pixel until the user zooms in (then full resolution)
+  const [chartPx, setChartPx] = useState<number>(0);
+  const [fullRes, setFullRes] = useState<boolean>(false);
+  const maxPoints = fullRes || !chartPx ? 0 : Math.max(200, chartPx);
   const [err, setErr] = useState<string | null>(null);
   const [bootLoading, setBootLoading] = useState<boolean>(true);
   const [bootMsg, setBootMsg] = useState<string>('Carregando…');
@@ -95,10 +109,17 @@ export default function DeskPage() {
         setBootMsg('Carregando gráfico…');
         setBootPct(20);
       }
+      // incremental refresh: same series -> ask only for bars from our last (forming) bar onward
+      const key = `${instrument}|${tf}|${candles}|${maxPoints}`;
+      const held = ohlcRef.current && ohlcRef.current.key === key && ohlcRef.current.ohlc.t.length ? ohlcRef.current.ohlc : null;
+      const since = held ? `&since=${encodeURIComponent(String(held.t[held.t.length - 1]))}` : '';
+      const mp = maxPoints > 0 && maxPoints < candles ? `&max_points=${maxPoints}` : '';
       const data = await apiGet(
-        `/api/desk/ohlc?instrument=${encodeURIComponent(instrument)}&tf=${encodeURIComponent(tf)}&candles=${candles}`
+        `/api/desk/ohlc?instrument=${encodeURIComponent(instrument)}&tf=${encodeURIComponent(tf)}&candles=${candles}${mp}${since}`
       );
-      setOhlc(data.ohlc);
+      const next = held ? mergeOhlc(held, data.ohlc, candles) : (data.ohlc as OhlcWithVol);
+      ohlcRef.current = { key, ohlc: next };
+      setOhlc(next);
     } catch (e: any) {
       const msg = String(e?.message || e);
       setErr(msg);
@@ -200,6 +221,11 @@ export default function DeskPage() {
   useEffect(() => {
     refresh();
     // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [instrument, tf, candles, fullRes]);
+
+  // new series -> back to downsampled until the user zooms in again
+  useEffect(() => {
+    setFullRes(false);
   }, [instrument, tf, candles]);
 
   // ESC closes config panel
@@ -437,6 +463,10 @@ export default function DeskPage() {
             <CandlesChart
               className="w-full h-[560px]"
               ohlc={ohlc}
+              onWidth={(px) => setChartPx((cur) => (Math.abs(cur - px) > 40 ? px : cur))}
+              onZoomIn={() => {
+                if (!fullRes && maxPoints > 0 && maxPoints < candles) setFullRes(true);
+              }}
               levels={
                 gexOn
                   ? [
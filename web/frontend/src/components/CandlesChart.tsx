@@ -28,11 +28,17 @@ export default function CandlesChart({
   ohlc,
   levels,
   onPickPrice,
+  onWidth,
+  onZoomIn,
   className,
 }: {
   ohlc: Ohlc | null;
   levels?: GexLevel[];
   onPickPrice?: (price: number) => void;
+  // plot width in px (parent sizes max_points from it)
+  onWidth?: (px: number) => void;
+  // user zoomed into < 1/4 of the loaded bars (parent can switch to full resolution)
+  onZoomIn?: () => void;
   className?: string;
 }) {
   const ref = useRef<HTMLDivElement | null>(null);
@@ -41,6 +47,11 @@ export default function CandlesChart({
   const linesRef = useRef<any[]>([]);
   const overlayRef = useRef<any[]>([]);
   const fittedRef = useRef<boolean>(false);
+  const lenRef = useRef<number>(0);
+  const onWidthRef = useRef(onWidth);
+  const onZoomInRef = useRef(onZoomIn);
+  onWidthRef.current = onWidth;
+  onZoomInRef.current = onZoomIn;
 
   const data = useMemo(() => (ohlc ? toCandles(ohlc) : []), [ohlc]);
 
@@ -102,12 +113,21 @@ export default function CandlesChart({
     const ro = new ResizeObserver(() => {
       const { width, height } = el.getBoundingClientRect();
       chart.applyOptions({ width: Math.floor(width), height: Math.floor(height) });
+      onWidthRef.current?.(Math.floor(width));
     });
     ro.observe(el);
 
     // initial size
     const { width, height } = el.getBoundingClientRect();
     chart.applyOptions({ width: Math.floor(width), height: Math.floor(height) });
+    onWidthRef.current?.(Math.floor(width));
+
+    const onRange = (r: any) => {
+      const n = lenRef.current;
+      if (!r || !n) return;
+      if (Number(r.to) - Number(r.from) < n / 4) onZoomInRef.current?.();
+    };
+    chart.timeScale().subscribeVisibleLogicalRangeChange(onRange);
 
     // Some layouts (grid/resize) finalize after paint; apply size again to avoid "stuck" interactions.
     const reapply = () => {
@@ -123,7 +143,10 @@ export default function CandlesChart({
     // also reapply after first user interaction edge-cases
     setTimeout(reapply, 450);
 
-    return () => ro.disconnect();
+    return () => {
+      ro.disconnect();
+      chart.timeScale().unsubscribeVisibleLogicalRangeChange(onRange);
+    };
   }, []);
 
   useEffect(() => {
@@ -149,6 +172,17 @@ export default function CandlesChart({
     // Heuristic: if user is at the right edge, keep following real-time; otherwise preserve the manual viewport.
     const followRealTime = rightOffset != null && rightOffset <= 2;
 
+    // Resolution change (downsampled <-> full): bar indices no longer match, keep the visible time span instead.
+    let timeRange: any = null;
+    if (lenRef.current && Math.abs(data.length - lenRef.current) > 2) {
+      try {
+        timeRange = chart.timeScale().getVisibleRange();
+      } catch {
+        timeRange = null;
+      }
+    }
+    lenRef.current = data.length;
+
     series.setData(data);
 
     if (!fittedRef.current) {
@@ -166,6 +200,15 @@ export default function CandlesChart({
       }
     }
 
+    if (timeRange) {
+      try {
+        chart.timeScale().setVisibleRange(timeRange);
+        return;
+      } catch {
+        // ignore
+      }
+    }
+
     if (logical) {
       try {
         // @ts-ignore
@@ -19,6 +19,7 @@ export default function ReportMiniCard({ currency }: { currency: 'BTC' | 'ETH' }
   const [bot, setBot] = useState<any>(null);
   const [mtm, setMtm] = useState<any>(null);
   const [open, setOpen] = useState<any[]>([]);
+  const [report, setReport] = useState<any>(null);
   const [err, setErr] = useState<string | null>(null);
   const [ts, setTs] = useState<number>(0);
 
@@ -29,16 +30,18 @@ export default function ReportMiniCard({ currency }: { currency: 'BTC' | 'ETH' }
     async function tick() {
       try {
         setErr(null);
-        const [b, m, o, a] = await Promise.all([
+        const [b, m, o, a, r] = await Promise.all([
           apiGet('/api/bot/status'),
           apiGet(`/api/paper/mtm?currency=${encodeURIComponent(currency)}`),
           apiGet(`/api/paper/open_enriched?currency=${encodeURIComponent(currency)}`),
           apiGet('/api/bot/audit?limit=8'),
+          apiGet('/api/paper/report'),
         ]);
         if (!alive) return;
         setBot(b);
         setMtm(m);
         setOpen(o?.positions || o?.open || []);
+        setReport(r?.report?.summary || null);
         // attach audit to bot object for display
         (b as any).audit_rows = a?.rows || [];
         setTs(Date.now());
@@ -75,6 +78,9 @@ export default function ReportMiniCard({ currency }: { currency: 'BTC' | 'ETH' }
           <div className="text-[11px] text-slate-400">MTM / PnL</div>
           <div className="text-sm font-semibold text-slate-200">{(mtm?.pnl_usd ?? mtm?.pnl ?? '—').toString()}</div>
           <div className="text-[11px] text-slate-500">open={open?.length ?? 0}</div>
+          <div className="text-[11px] text-slate-500">
+            closed={report?.n ?? 0} · WR={report ? `${Number(report.win_rate || 0).toFixed(0)}%` : '—'} · DD={report ? Number(report.max_drawdown_usd || 0).toFixed(2) : '—'}
+          </div>
         </div>
         <div className="bg-slate-950/40 border border-slate-800 rounded-xl p-2">
           <div className="text-[11px] text-slate-400">Último bloqueio</div>